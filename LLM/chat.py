@@ -1,13 +1,21 @@
+from utils.session import PerSession
+
+
 class Chat:
     """
     Handles the chat using to avoid OOM issues.
+    In multi-session mode, each session has its own history while sharing the initial chat message.
     """
 
     def __init__(self, size):
         self.size = size
         self.init_chat_message = None
         # maxlen is necessary pair, since a each new step we add an prompt and assitant answer
-        self.buffer = []
+        self.buffers = PerSession(list)
+
+    @property
+    def buffer(self):
+        return self.buffers.get()
 
     def append(self, item):
         self.buffer.append(item)
@@ -3,15 +3,16 @@ from transformers import (
     AutoModelForCausalLM,
     AutoTokenizer,
     pipeline,
+    StoppingCriteriaList,
     TextIteratorStreamer,
 )
 import torch
 
 from LLM.chat import Chat
+from LLM.sentences import SentenceSplitter
 from baseHandler import BaseHandler
 from rich.console import Console
 import logging
-from nltk import sent_tokenize
 
 logger = logging.getLogger(__name__)
 
@@ -126,27 +127,48 @@ class LanguageModelHandler(BaseHandler):
                 prompt = f"Please reply to my message in {WHISPER_LANGUAGE_TO_LLM_LANGUAGE[language_code]}. " + prompt
 
         self.chat.append({"role": self.user_role, "content": prompt})
+        token = self.cancel_token
+        # a streamer per prompt, so that text left over by a cancelled generation is never read by the next one
+        streamer = TextIteratorStreamer(
+            self.tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True,
+        )
+        gen_kwargs = {
+            **self.gen_kwargs,
+            "streamer": streamer,
+            # stops the generation as soon as the turn is cancelled
+            "stopping_criteria": StoppingCriteriaList([token]),
+        }
         thread = Thread(
-            target=self.pipe, args=(self.chat.to_list(),), kwargs=self.gen_kwargs
+            target=self.pipe, args=(self.chat.to_list(),), kwargs=gen_kwargs
         )
         thread.start()
+        n_sentences = 0
         if self.device == "mps":
             generated_text = ""
-            for new_text in self.streamer:
+            for new_text in streamer:
                 generated_text += new_text
             printable_text = generated_text
             torch.mps.empty_cache()
         else:
-            generated_text, printable_text = "", ""
-            for new_text in self.streamer:
+            generated_text = ""
+            # sentences are yielded as soon as complete, the new text only being inspected
+            splitter = SentenceSplitter()
+            for new_text in streamer:
                 generated_text += new_text
-                printable_text += new_text
-                sentences = sent_tokenize(printable_text)
-                if len(sentences) > 1:
-                    yield (sentences[0], language_code)
-                    printable_text = new_text
+                if token.cancelled:
+                    break
+                for sentence in splitter.push(new_text):
+                    yield (sentence, language_code)
+                    n_sentences += 1
+            printable_text = splitter.flush()
 
         self.chat.append({"role": "assistant", "content": generated_text})
 
-        # don't forget last sentence
-        yield (printable_text, language_code)
+        if token.cancelled:
+            logger.debug("Generation cancelled")
+            return
+        # don't forget last sentence, the TTS expects at least one
+        if printable_text or not n_sentences:
+            yield (printable_text, language_code)
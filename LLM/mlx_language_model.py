@@ -96,6 +96,7 @@ class MLXLanguageModelHandler(BaseHandler):
         prompt = self.tokenizer.apply_chat_template(
             chat_messages, tokenize=False, add_generation_prompt=True
         )
+        token = self.cancel_token
         output = ""
         curr_output = ""
         for t in stream_generate(
@@ -104,6 +105,9 @@ class MLXLanguageModelHandler(BaseHandler):
             prompt,
             max_tokens=self.gen_kwargs["max_new_tokens"],
         ):
+            if token.cancelled:
+                logger.debug("Generation cancelled")
+                break
             output += t.text
             curr_output += t.text
             if curr_output.endswith((".", "?", "!", "<|end|>")):
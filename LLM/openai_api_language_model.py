@@ -1,12 +1,12 @@
 import logging
 import time
 
-from nltk import sent_tokenize
 from rich.console import Console
 from openai import OpenAI
 
 from baseHandler import BaseHandler
 from LLM.chat import Chat
+from LLM.sentences import SentenceSplitter
 
 logger = logging.getLogger(__name__)
 
@@ -85,18 +85,26 @@ class OpenApiModelHandler(BaseHandler):
                 stream=self.stream
             )
             if self.stream:
-                generated_text, printable_text = "", ""
+                token = self.cancel_token
+                generated_text = ""
+                splitter = SentenceSplitter()
+                n_sentences = 0
                 for chunk in response:
+                    if token.cancelled:
+                        logger.debug("Generation cancelled")
+                        response.close()
+                        self.chat.append({"role": "assistant", "content": generated_text})
+                        return
                     new_text = chunk.choices[0].delta.content or ""
                     generated_text += new_text
-                    printable_text += new_text
-                    sentences = sent_tokenize(printable_text)
-                    if len(sentences) > 1:
-                        yield sentences[0], language_code
-                        printable_text = new_text
+                    for sentence in splitter.push(new_text):
+                        yield sentence, language_code
+                        n_sentences += 1
                 self.chat.append({"role": "assistant", "content": generated_text})
-                # don't forget last sentence
-                yield printable_text, language_code
+                # don't forget last sentence, the TTS expects at least one
+                printable_text = splitter.flush()
+                if printable_text or not n_sentences:
+                    yield printable_text, language_code
             else:
                 generated_text = response.choices[0].message.content
                 self.chat.append({"role": "assistant", "content": generated_text})
@@ -0,0 +1,142 @@
+"""
+Incremental sentence splitting of the text streamed by the language models, so that the TTS starts on the first
+sentence while the next ones are generated. Each streamed character is inspected once, instead of tokenizing the whole
+pending text at each token, and no tokenizer model is needed.
+"""
+
+# end a sentence when followed by a space
+LATIN_TERMINALS = ".!?…"
+# end a sentence without a following space, as in Chinese and Japanese
+CJK_TERMINALS = "。！？｡"
+# kept with the sentence they end
+CLOSING = "\"'”’»)]}」』）》】"
+# words whose period does not end the sentence, lowercased
+ABBREVIATIONS = frozenset(
+    (
+        "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "vs", "e.g", "i.e", "fig", "approx", "dept", "inc", "ltd", "mt",
+        "cf", "mme", "mlle", "sra", "srta", "dra", "z.b", "bzw", "usw", "ggf",
+    )
+)
+# abbreviations of "number", whose period does not end the sentence before a number only: "No. 5", but "I said no. The"
+NUMBER_ABBREVIATIONS = frozenset(("no", "nr"))
+# longest abbreviation looked back for
+MAX_ABBREVIATION = 8
+
+
+class SentenceSplitter:
+    """
+    Splits streamed text into sentences: `push` takes the new text and returns the sentences it completes, `flush`
+    returns the rest at the end of the stream.
+    A sentence ends:
+    - after `.`, `!`, `?` or `…`, closing quotes or brackets included, once followed by a space. After a period or an
+      ellipsis, the next word must not start with a lowercase letter, and a period must not follow an abbreviation,
+      a dotted acronym ("U.S.") or a list number, nor "No." followed by a number,
+    - right after `。`, `！` or `？` (and closing quotes or brackets),
+    - at a line break.
+    The decision waits for the character following the end of the sentence, and the new characters are inspected once.
+    """
+
+    def __init__(self):
+        self.text = ""
+        # end of the sentence in `text` if the following characters confirm it
+        self.end = None
+        self.space = False
+        self.period = False
+        self.cjk = False
+        self.number_abbreviation = False
+
+    def push(self, new_text):
+        sentences = []
+        for char in new_text:
+            if self.end is not None:
+                if self.confirm(char, sentences):
+                    continue
+            self.text += char
+            if char in CJK_TERMINALS:
+                self.candidate(period=False, cjk=True)
+            elif char in LATIN_TERMINALS:
+                word = self.word_before() if char == "." else None
+                if word is None or not self.abbreviation(word):
+                    self.candidate(period=char in ".…", cjk=False)
+                    self.number_abbreviation = word is not None and word.lower() in NUMBER_ABBREVIATIONS
+            elif char == "\n":
+                self.emit(len(self.text), sentences)
+        return sentences
+
+    def flush(self):
+        sentence = self.text.strip()
+        self.text = ""
+        self.end = None
+        return sentence
+
+    def candidate(self, period, cjk):
+        self.end = len(self.text)
+        self.space = False
+        self.period = period
+        self.cjk = cjk
+        self.number_abbreviation = False
+
+    def confirm(self, char, sentences):
+        """
+        Decides on the pending end of sentence with the next character, returns whether `char` was consumed.
+        """
+        if not self.space:
+            if char in CLOSING or char in LATIN_TERMINALS or char in CJK_TERMINALS:
+                # the sentence ends after the closing quotes or the repeated punctuation ("?!", "...")
+                self.text += char
+                self.end = len(self.text)
+                self.period = self.period and char in ".…"
+                self.cjk = self.cjk or char in CJK_TERMINALS
+                self.number_abbreviation = False
+                return True
+            if char.isspace():
+                self.space = True
+                self.text += char
+                if not self.period or char == "\n":
+                    self.emit(self.end, sentences)
+                return True
+            if self.cjk:
+                self.emit(self.end, sentences)
+            else:
+                # "3.14", "e.g.x": not the end of a sentence
+                self.end = None
+            return False
+        if char.isspace():
+            self.text += char
+            if char == "\n":
+                self.emit(self.end, sentences)
+            return True
+        if not char.islower() and not (self.number_abbreviation and char.isdigit()):
+            self.emit(self.end, sentences)
+        self.end = None
+        return False
+
+    def emit(self, end, sentences):
+        sentence = self.text[:end].strip()
+        self.text = self.text[end:].lstrip()
+        self.end = None
+        if sentence:
+            sentences.append(sentence)
+
+    def word_before(self):
+        """
+        Word preceding the character just added, with its inner periods.
+        """
+        text = self.text[-MAX_ABBREVIATION - 2 : -1]
+        start = len(text)
+        while start > 0 and (text[start - 1].isalpha() or text[start - 1] == "."):
+            start -= 1
+        return text[start:]
+
+    def abbreviation(self, word):
+        """
+        Whether the period just added after `word` follows an abbreviation, a dotted acronym or a list number.
+        """
+        if word.lower() in ABBREVIATIONS:
+            return True
+        # "U.S.", "J.R.R."
+        parts = word.split(".")
+        if len(parts) > 1 and all(len(part) == 1 for part in parts):
+            return True
+        # "1. ", "2. " starting the items of a list
+        return not word and self.text[:-1].strip().isdigit()
@@ -0,0 +1,67 @@
+"""
+Compares the cost of the log-mel features of the Whisper STT on short turns:
+- the HF `WhisperFeatureExtractor`, computing every frame of the audio padded to 30 s,
+- `LogMelExtractor`, computing only the frames overlapping the audio in a single FFT (the default path).
+
+    python -m STT.benchmark_log_mel --model_name openai/whisper-large-v3
+"""
+from dataclasses import dataclass, field
+from time import perf_counter
+
+import numpy as np
+from transformers import HfArgumentParser, WhisperFeatureExtractor
+
+from STT.log_mel import LogMelExtractor
+
+
+@dataclass
+class BenchmarkLogMelArguments:
+    model_name: str = field(
+        default="distil-whisper/distil-large-v3",
+        metadata={"help": "Model whose feature extractor is used. Default is 'distil-whisper/distil-large-v3'."},
+    )
+    durations_s: str = field(
+        default="1,2,3,4,5",
+        metadata={"help": "Comma-separated durations of the turns, in seconds. Default is '1,2,3,4,5'."},
+    )
+    n_runs: int = field(default=20, metadata={"help": "Runs per duration. Default is 20."})
+
+
+def report(name, elapsed, n_runs, reference=None):
+    line = f"{name:<16} {elapsed / n_runs * 1000:8.2f} ms/turn"
+    if reference is not None:
+        line += f"  speedup {reference / elapsed:6.1f}x"
+    print(line)
+
+
+def main(args):
+    feature_extractor = WhisperFeatureExtractor.from_pretrained(args.model_name)
+    extractor = LogMelExtractor(
+        feature_extractor.mel_filters,
+        n_fft=feature_extractor.n_fft,
+        hop_length=feature_extractor.hop_length,
+        n_frames=feature_extractor.nb_max_frames,
+    )
+    rng = np.random.default_rng(0)
+    for duration_s in (float(duration) for duration in args.durations_s.split(",")):
+        audio = rng.uniform(-0.5, 0.5, int(duration_s * 16000)).astype(np.float32)
+        print(f"{duration_s} s turn")
+
+        start = perf_counter()
+        for _ in range(args.n_runs):
+            expected = feature_extractor(audio, sampling_rate=16000, return_tensors="np").input_features[0]
+        reference = perf_counter() - start
+        report("hf", reference, args.n_runs)
+
+        start = perf_counter()
+        for _ in range(args.n_runs):
+            features = extractor(audio)
+        report("vectorized", perf_counter() - start, args.n_runs, reference)
+
+        print(f"max abs diff: {np.abs(features - expected).max():.2e}")
+
+
+if __name__ == "__main__":
+    parser = HfArgumentParser((BenchmarkLogMelArguments,))
+    (args,) = parser.parse_args_into_dataclasses()
+    main(args)
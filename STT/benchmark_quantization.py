@@ -0,0 +1,154 @@
+"""
+Compares the int8 dynamically quantized Whisper STT (`--stt_quantization int8`) with the fp32 baseline on CPU: word
+error rate against reference transcripts, and transcription latency.
+The utterances are either the `.wav` files of `--audio_dir`, each with its reference transcript in a `.txt` file of the
+same name, or the samples of a HF dataset (requires `datasets`).
+
+    python -m STT.benchmark_quantization --model_name openai/whisper-small --n_samples 50
+"""
+import os
+import re
+import wave
+from dataclasses import dataclass, field
+from threading import Event
+from time import perf_counter
+from typing import Optional
+
+import numpy as np
+from transformers import HfArgumentParser
+
+from STT.whisper_stt_handler import WhisperSTTHandler
+from VAD.framing import StreamingResampler
+
+
+@dataclass
+class BenchmarkQuantizationArguments:
+    model_name: str = field(
+        default="distil-whisper/distil-large-v3",
+        metadata={"help": "The Whisper model to compare. Default is 'distil-whisper/distil-large-v3'."},
+    )
+    audio_dir: Optional[str] = field(
+        default=None,
+        metadata={"help": "Directory of 16-bit PCM .wav files with .txt reference transcripts. Default is None."},
+    )
+    dataset: str = field(
+        default="hf-internal-testing/librispeech_asr_dummy",
+        metadata={"help": "HF dataset used without `--audio_dir`. Default is 'hf-internal-testing/librispeech_asr_dummy'."},
+    )
+    dataset_config: str = field(default="clean", metadata={"help": "Config of the dataset. Default is 'clean'."})
+    dataset_split: str = field(default="validation", metadata={"help": "Split of the dataset. Default is 'validation'."})
+    n_samples: int = field(default=50, metadata={"help": "Maximum number of utterances. Default is 50."})
+    language: str = field(default="en", metadata={"help": "Language of the utterances. Default is 'en'."})
+    cpu_threads: Optional[int] = field(
+        default=None, metadata={"help": "Torch threads. Default is None (the number of physical cores)."}
+    )
+    quantization_cache_dir: Optional[str] = field(
+        default=None, metadata={"help": "Cache of the quantized model. Default is 'tmp/quantized' in the repository."}
+    )
+
+
+def resample(audio, sampling_rate):
+    if sampling_rate == 16000:
+        return audio
+    return StreamingResampler(sampling_rate, 16000)(audio)
+
+
+def read_wav(path):
+    with wave.open(path) as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise ValueError(f"{path} is not 16-bit PCM")
+        audio = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+        audio = audio.reshape(-1, wav_file.getnchannels()).mean(axis=1) / 32768
+        return resample(audio.astype(np.float32), wav_file.getframerate())
+
+
+def load_utterances(args):
+    """
+    Returns (audio, reference transcript) pairs, the audio being float32 sampled at 16 kHz.
+    """
+    if args.audio_dir is not None:
+        utterances = []
+        for name in sorted(os.listdir(args.audio_dir)):
+            stem, extension = os.path.splitext(name)
+            if extension != ".wav":
+                continue
+            with open(os.path.join(args.audio_dir, stem + ".txt")) as reference:
+                utterances.append((read_wav(os.path.join(args.audio_dir, name)), reference.read()))
+        return utterances[: args.n_samples]
+
+    from datasets import load_dataset
+
+    dataset = load_dataset(args.dataset, args.dataset_config, split=args.dataset_split)
+    return [
+        (resample(np.asarray(sample["audio"]["array"], dtype=np.float32), sample["audio"]["sampling_rate"]), sample["text"])
+        for sample in dataset.select(range(min(args.n_samples, len(dataset))))
+    ]
+
+
+def normalize(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """
+    Word-level edit distance between two lists of words.
+    """
+    distances = np.arange(len(hypothesis) + 1)
+    for i, word in enumerate(reference, 1):
+        previous, distances = distances, np.empty_like(distances)
+        distances[0] = i
+        for j, hypothesis_word in enumerate(hypothesis, 1):
+            distances[j] = min(previous[j] + 1, distances[j - 1] + 1, previous[j - 1] + (word != hypothesis_word))
+    return distances[-1]
+
+
+def evaluate(name, handler, utterances):
+    errors = n_words = 0
+    latencies = []
+    for audio, reference in utterances:
+        start = perf_counter()
+        text, _ = handler.transcribe(audio)
+        latencies.append(perf_counter() - start)
+        reference_words = normalize(reference)
+        errors += word_errors(reference_words, normalize(text))
+        n_words += len(reference_words)
+    audio_s = sum(len(audio) for audio, _ in utterances) / 16000
+    print(
+        f"{name:<6} WER {errors / max(n_words, 1):7.2%}  latency p50 {np.percentile(latencies, 50) * 1000:7.1f} ms  "
+        f"p90 {np.percentile(latencies, 90) * 1000:7.1f} ms  real-time factor {sum(latencies) / audio_s:.3f}"
+    )
+    return errors / max(n_words, 1), np.median(latencies)
+
+
+def main(args):
+    utterances = load_utterances(args)
+    print(f"{len(utterances)} utterances, {sum(len(audio) for audio, _ in utterances) / 16000:.1f} s of audio")
+    results = {}
+    for name, quantization in (("fp32", None), ("int8", "int8")):
+        start = perf_counter()
+        handler = WhisperSTTHandler(
+            Event(),
+            None,
+            None,
+            setup_kwargs={
+                "model_name": args.model_name,
+                "device": "cpu",
+                "torch_dtype": "float32",
+                "language": args.language,
+                "quantization": quantization,
+                "quantization_cache_dir": args.quantization_cache_dir,
+                "cpu_threads": args.cpu_threads,
+                "gen_kwargs": {"max_new_tokens": 128, "task": "transcribe"},
+            },
+        )
+        print(f"{name:<6} setup {perf_counter() - start:.2f} s")
+        results[name] = evaluate(name, handler, utterances)
+        del handler
+    (fp32_wer, fp32_latency), (int8_wer, int8_latency) = results["fp32"], results["int8"]
+    print(f"int8 vs fp32: WER {int8_wer - fp32_wer:+.2%}, speedup {fp32_latency / int8_latency:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = HfArgumentParser((BenchmarkQuantizationArguments,))
+    (args,) = parser.parse_args_into_dataclasses()
+    main(args)
@@ -1,11 +1,11 @@
 import logging
 import os
-from time import perf_counter
 
 from faster_whisper import WhisperModel
 from rich.console import Console
 
 from baseHandler import BaseHandler
+from utils.segments import PartialTranscripts
 
 console = Console()
 
@@ -28,12 +28,13 @@ class FasterWhisperSTTHandler(BaseHandler):
 
         os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
         self.model = WhisperModel(model_name, device=device, compute_type=compute_type)
+        self.partials = PartialTranscripts()
 
     def process(self, audio):
-        logger.debug("infering faster whisper...")
+        yield from self.partials.process(audio, self.transcribe)
 
-        global pipeline_start
-        pipeline_start = perf_counter()
+    def transcribe(self, audio):
+        logger.debug("infering faster whisper...")
 
         segments, info = self.model.transcribe(audio, **self.gen_kwargs)
         output_text = []
@@ -50,9 +51,9 @@ class FasterWhisperSTTHandler(BaseHandler):
         if pred_text:
             console.print(f"[yellow]USER: {pred_text}")
 
-            yield pred_text
-        else:
-            logger.debug("no text detected. skipping...")
+            return pred_text
+        logger.debug("no text detected. skipping...")
+        return None
 
     def cleanup(self):
         print("Stopping FasterWhisperSTTHandler")
@@ -1,6 +1,6 @@
 import logging
-from time import perf_counter
 from baseHandler import BaseHandler
+from utils.segments import PartialTranscripts
 from lightning_whisper_mlx import LightningWhisperMLX
 import numpy as np
 from rich.console import Console
@@ -39,14 +39,26 @@ class LightningWhisperSTTHandler(BaseHandler):
         torch_dtype="float16",
         compile_mode=None,
         language=None,
+        batch_size=1,
+        batch_wait_ms=20,
+        quantization=None,
+        quantization_cache_dir=None,
+        cpu_threads=None,
         gen_kwargs={},
     ):
+        if quantization is not None:
+            raise ValueError(f"Quantization {quantization!r} is not supported by whisper-mlx")
+        # arguments shared with the whisper backend, which the MLX model has no use for
+        for name, value in (("quantization_cache_dir", quantization_cache_dir), ("cpu_threads", cpu_threads)):
+            if value is not None:
+                logger.warning(f"--stt_{name} is not supported by whisper-mlx, ignoring it")
         if len(model_name.split("/")) > 1:
             model_name = model_name.split("/")[-1]
         self.device = device
         self.model = LightningWhisperMLX(model=model_name, batch_size=6, quant=None)
         self.start_language = language
         self.last_language = language
+        self.partials = PartialTranscripts()
 
         self.warmup()
 
@@ -61,10 +73,10 @@ class LightningWhisperSTTHandler(BaseHandler):
             _ = self.model.transcribe(dummy_input)["text"].strip()
 
     def process(self, spoken_prompt):
-        logger.debug("infering whisper...")
+        yield from self.partials.process(spoken_prompt, self.transcribe)
 
-        global pipeline_start
-        pipeline_start = perf_counter()
+    def transcribe(self, spoken_prompt):
+        logger.debug("infering whisper...")
 
         if self.start_language != 'auto':
             transcription_dict = self.model.transcribe(spoken_prompt, language=self.start_language)
@@ -90,5 +102,5 @@ class LightningWhisperSTTHandler(BaseHandler):
 
         if self.start_language == "auto":
             language_code += "-auto"
-                    
-        yield (pred_text, language_code)
+
+        return (pred_text, language_code)
@@ -0,0 +1,98 @@
+"""
+Vectorized log-mel features of Whisper, matching the HF `WhisperFeatureExtractor`, for the STT handler thread.
+The HF extractor computes the STFT of the audio padded to 30 s frame by frame; here the frames are strided views of the
+audio, transformed in a single batched FFT, and only the frames overlapping the audio are computed: the frames of the
+zero padding have a known value. The window and the mel filterbank are computed once.
+"""
+import numpy as np
+
+# log10 of the floor of the mel energies, the value of the frames of silent padding
+LOG_MEL_FLOOR = -10.0
+
+
+def hann_window(n_fft):
+    # periodic window, as used by Whisper
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+
+
+class LogMelExtractor:
+    """
+    Computes the normalized log-mel spectrogram of utterances, as Whisper expects it.
+    `mel_filters` is the (n_fft // 2 + 1, n_mels) filterbank of the model, e.g. `processor.feature_extractor.mel_filters`.
+    The features are padded to `n_frames` frames (3000, 30 s, for Whisper), or trimmed to the length of the audio when
+    `n_frames` is None, for models accepting shorter inputs.
+    """
+
+    def __init__(self, mel_filters, n_fft=400, hop_length=160, n_frames=3000):
+        self.mel_filters = np.ascontiguousarray(mel_filters, dtype=np.float32)
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_frames = n_frames
+        self.window = hann_window(n_fft)
+
+    @property
+    def n_mels(self):
+        return self.mel_filters.shape[1]
+
+    def log_mel_frames(self, padded, n_frames):
+        """
+        Log-mel energies of the first `n_frames` frames of the reflect-padded audio, as a (n_frames, n_mels) array.
+        """
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft)[:: self.hop_length][:n_frames]
+        spectrum = np.fft.rfft(frames * self.window, axis=-1)
+        power = spectrum.real**2 + spectrum.imag**2
+        mel = power.astype(np.float32) @ self.mel_filters
+        return np.log10(np.maximum(mel, 1e-10))
+
+    def pad(self, audio, n_samples):
+        """
+        Centers the frames: reflect padding on the left, and the zeros following the audio on the right.
+        """
+        half = self.n_fft // 2
+        padded = np.zeros(n_samples + 2 * half, dtype=np.float32)
+        padded[half : half + len(audio)] = audio
+        left = audio[1 : half + 1][::-1]
+        padded[half - len(left) : half] = left
+        if len(audio) >= n_samples:
+            # audio of 30 s or more, reflected at its end as well
+            right = audio[-half - 1 : -1][::-1]
+            padded[half + n_samples : half + n_samples + len(right)] = right
+        return padded
+
+    def n_audio_frames(self, n_samples):
+        """
+        Number of frames overlapping `n_samples` samples of audio.
+        """
+        return -(-(n_samples + self.n_fft // 2) // self.hop_length)
+
+    def normalize(self, log_mel):
+        np.maximum(log_mel, log_mel.max() - 8.0, out=log_mel)
+        log_mel += 4.0
+        log_mel /= 4.0
+        return log_mel
+
+    def __call__(self, audio, n_frames=None):
+        """
+        Returns the (n_mels, n_frames) features of a float32 utterance sampled at 16 kHz.
+        When trimming, `n_frames` extends the features beyond the audio, as if it was followed by silence.
+        """
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if self.n_frames is not None:
+            audio = audio[: self.n_frames * self.hop_length]
+            n_frames = self.n_frames
+        elif n_frames is None:
+            n_frames = len(audio) // self.hop_length
+        n_computed = min(self.n_audio_frames(len(audio)), n_frames)
+        padded = self.pad(audio, n_computed * self.hop_length)
+        log_mel = np.full((n_frames, self.n_mels), LOG_MEL_FLOOR, dtype=np.float32)
+        log_mel[:n_computed] = self.log_mel_frames(padded, n_computed)
+        return self.normalize(log_mel).T
+
+    def batch(self, audios):
+        """
+        Returns the (batch_size, n_mels, n_frames) features of utterances. When trimming, the shorter utterances are
+        padded with silence to the longest one before being normalized, as the HF extractor pads the audio.
+        """
+        audios = [np.asarray(audio, dtype=np.float32).reshape(-1) for audio in audios]
+        n_frames = None if self.n_frames is not None else max(len(audio) for audio in audios) // self.hop_length
+        return np.stack([self(audio, n_frames) for audio in audios])
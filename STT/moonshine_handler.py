@@ -1,10 +1,10 @@
 import os
 os.environ['KERAS_BACKEND'] = 'torch'
 
-from time import perf_counter
 import moonshine
 import torch
 from baseHandler import BaseHandler
+from utils.segments import PartialTranscripts
 from rich.console import Console
 import logging
 
@@ -28,6 +28,7 @@ class MoonshineSTTHandler(BaseHandler):
 
         self.tokenizer = moonshine.load_tokenizer()
         self.model = moonshine.load_model(model_name)
+        self.partials = PartialTranscripts()
 
         self.warmup()
 
@@ -58,10 +59,10 @@ class MoonshineSTTHandler(BaseHandler):
             )
 
     def process(self, spoken_prompt):
-        logger.debug("infering moonshine...")
+        yield from self.partials.process(spoken_prompt, self.transcribe)
 
-        global pipeline_start
-        pipeline_start = perf_counter()
+    def transcribe(self, spoken_prompt):
+        logger.debug("infering moonshine...")
 
         pred_ids = self.model.generate(spoken_prompt[None, :])
         pred_text = self.tokenizer.decode_batch(pred_ids)[0]
@@ -69,4 +70,4 @@ class MoonshineSTTHandler(BaseHandler):
         logger.debug("finished whisper inference")
         console.print(f"[yellow]USER: {pred_text}")
 
-        yield (pred_text, "en")
+        return (pred_text, "en")
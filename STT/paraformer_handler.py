@@ -1,7 +1,7 @@
 import logging
-from time import perf_counter
 
 from baseHandler import BaseHandler
+from utils.segments import PartialTranscripts
 from funasr import AutoModel
 import numpy as np
 from rich.console import Console
@@ -33,6 +33,8 @@ class ParaformerSTTHandler(BaseHandler):
             model_name = model_name.split("/")[-1]
         self.device = device
         self.model = AutoModel(model=model_name, device=device)
+        # the transcripts are written without spaces
+        self.partials = PartialTranscripts(separator="")
         self.warmup()
 
     def warmup(self):
@@ -45,10 +47,10 @@ class ParaformerSTTHandler(BaseHandler):
             _ = self.model.generate(dummy_input)[0]["text"].strip().replace(" ", "")
 
     def process(self, spoken_prompt):
-        logger.debug("infering paraformer...")
+        yield from self.partials.process(spoken_prompt, self.transcribe)
 
-        global pipeline_start
-        pipeline_start = perf_counter()
+    def transcribe(self, spoken_prompt):
+        logger.debug("infering paraformer...")
 
         pred_text = (
             self.model.generate(spoken_prompt)[0]["text"].strip().replace(" ", "")
@@ -58,4 +60,4 @@ class ParaformerSTTHandler(BaseHandler):
         logger.debug("finished paraformer inference")
         console.print(f"[yellow]USER: {pred_text}")
 
-        yield pred_text
+        return pred_text
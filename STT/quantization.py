@@ -0,0 +1,101 @@
+"""
+CPU inference of the Whisper STT with int8 dynamic quantization (`--stt_quantization int8`), for nodes without GPU:
+the weights of the linear layers are quantized once, and the activations on the fly at each call. The quantized model
+is cached on disk, so that later startups load it instead of loading and quantizing the fp32 weights.
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+from time import perf_counter
+
+import torch
+import transformers
+from transformers import AutoModelForSpeechSeq2Seq
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(Path(__file__).resolve().parent.parent, "tmp", "quantized")
+
+
+def physical_cores():
+    """
+    Number of physical cores available to the process: hyper-threads share the execution units of a core, so running
+    more torch threads than cores slows the matrix multiplications down.
+    """
+    try:
+        import psutil
+
+        n_cores = psutil.cpu_count(logical=False)
+    except ImportError:
+        n_cores = None
+    if not n_cores:
+        cores = set()
+        try:
+            with open("/proc/cpuinfo") as cpuinfo:
+                physical_id = None
+                for line in cpuinfo:
+                    key, _, value = line.partition(":")
+                    if key.strip() == "physical id":
+                        physical_id = value.strip()
+                    elif key.strip() == "core id":
+                        cores.add((physical_id, value.strip()))
+        except OSError:
+            pass
+        n_cores = len(cores) or os.cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"):
+        # the process may be pinned to fewer CPUs, e.g. in a container
+        n_cores = min(n_cores, len(os.sched_getaffinity(0)))
+    return n_cores
+
+
+def set_cpu_threads(n_threads=None):
+    """
+    Sets the number of threads of torch on CPU, the number of physical cores by default, and returns it.
+    """
+    n_threads = n_threads or physical_cores()
+    torch.set_num_threads(n_threads)
+    return n_threads
+
+
+def quantize_int8(model):
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantized_model_path(model_name, cache_dir):
+    # the pickled modules are only valid for the versions that saved them
+    key = f"{model_name}|int8-dynamic|torch {torch.__version__}|transformers {transformers.__version__}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    name = model_name.strip("/").replace("/", "--").replace(os.sep, "--")
+    return os.path.join(cache_dir, f"{name}-int8-{digest}.pt")
+
+
+def load_quantized_model(model_name, cache_dir=None):
+    """
+    Returns the int8 dynamically quantized `model_name`, from the cache of `cache_dir` if there, quantized from the fp32
+    model and cached otherwise.
+    """
+    path = quantized_model_path(model_name, cache_dir or DEFAULT_CACHE_DIR)
+    if os.path.exists(path):
+        start = perf_counter()
+        try:
+            model = torch.load(path, weights_only=False)
+            logger.info(f"Loaded the int8 model of {model_name} from {path} in {perf_counter() - start:.2f} s")
+            return model
+        except Exception:
+            logger.warning(f"Cannot load the cached int8 model {path}, quantizing again", exc_info=True)
+
+    start = perf_counter()
+    model = AutoModelForSpeechSeq2Seq.from_pretrained(model_name, torch_dtype=torch.float32)
+    model = quantize_int8(model.eval())
+    logger.info(f"Quantized {model_name} to int8 in {perf_counter() - start:.2f} s")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written aside and renamed, so that a concurrent or interrupted startup never reads a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Cached the int8 model in {path}")
+    except OSError:
+        logger.warning(f"Cannot cache the int8 model in {path}", exc_info=True)
+    return model
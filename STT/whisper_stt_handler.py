@@ -1,11 +1,14 @@
-from time import perf_counter
 from transformers import (
     AutoProcessor,
     AutoModelForSpeechSeq2Seq
 )
 import torch
-from copy import copy
+from time import perf_counter
+from STT.log_mel import LogMelExtractor
+from STT.quantization import load_quantized_model, set_cpu_threads
 from baseHandler import BaseHandler
+from utils.compile_cache import compile_cache_entry
+from utils.segments import PartialTranscripts
 from rich.console import Console
 import logging
 
@@ -31,6 +34,13 @@ SUPPORTED_LANGUAGES = [
 class WhisperSTTHandler(BaseHandler):
     """
     Handles the Speech To Text generation using a Whisper model.
+    Partial segments of an utterance (see `SpeechSegment`) are transcribed as they arrive, and their transcripts joined.
+    With `batch_size` > 1, the utterances of concurrent sessions arriving within `batch_wait_ms` are transcribed in a
+    single `generate`.
+    When the language is not forced, it is identified with a single decoder step over the encoder output, restricted to
+    the supported languages, and the transcription then reuses the encoder output.
+    With `quantization="int8"`, the model runs on CPU with its linear layers quantized to int8, see `STT.quantization`.
+    On CPU, torch uses `cpu_threads` threads, the number of physical cores by default.
     """
 
     def setup(
@@ -40,22 +50,54 @@ class WhisperSTTHandler(BaseHandler):
         torch_dtype="float16",
         compile_mode=None,
         language=None,
+        batch_size=1,
+        batch_wait_ms=20,
+        quantization=None,
+        quantization_cache_dir=None,
+        cpu_threads=None,
         gen_kwargs={},
     ):
+        if quantization not in (None, "int8"):
+            raise ValueError(f"Unsupported quantization {quantization!r}, only 'int8' is")
+        if quantization is not None:
+            if device != "cpu" or torch_dtype != "float32":
+                logger.warning(
+                    f"int8 dynamic quantization runs on CPU in float32, ignoring device {device} and dtype {torch_dtype}"
+                )
+                device, torch_dtype = "cpu", "float32"
+            if compile_mode:
+                logger.warning("torch compile is not supported with int8 dynamic quantization, ignoring compile mode")
+                compile_mode = None
+        if device == "cpu":
+            logger.info(f"{self.__class__.__name__}: running on CPU with {set_cpu_threads(cpu_threads)} threads")
         self.device = device
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
         self.torch_dtype = getattr(torch, torch_dtype)
         self.compile_mode = compile_mode
         self.gen_kwargs = gen_kwargs
         self.start_language = language
-        self.last_language = language if language != "auto" else None
-        if self.last_language is not None:
-            self.gen_kwargs["language"] = self.last_language
+        if language not in (None, "auto"):
+            self.gen_kwargs["language"] = language
+        self.partials = PartialTranscripts()
 
+        self.model_name = model_name
         self.processor = AutoProcessor.from_pretrained(model_name)
-        self.model = AutoModelForSpeechSeq2Seq.from_pretrained(
-            model_name,
-            torch_dtype=self.torch_dtype,
-        ).to(device)
+        feature_extractor = self.processor.feature_extractor
+        # same features as the processor, computed with a single FFT over the frames of the audio
+        self.log_mel = LogMelExtractor(
+            feature_extractor.mel_filters,
+            n_fft=feature_extractor.n_fft,
+            hop_length=feature_extractor.hop_length,
+            n_frames=feature_extractor.nb_max_frames,
+        )
+        if quantization is not None:
+            self.model = load_quantized_model(model_name, quantization_cache_dir)
+        else:
+            self.model = AutoModelForSpeechSeq2Seq.from_pretrained(
+                model_name,
+                torch_dtype=self.torch_dtype,
+            ).to(device)
 
         # compile
         if self.compile_mode:
@@ -63,18 +105,46 @@ class WhisperSTTHandler(BaseHandler):
             self.model.forward = torch.compile(
                 self.model.forward, mode=self.compile_mode, fullgraph=True
             )
+            if batch_size > 1:
+                logger.warning(
+                    "Batched Whisper inference with a compile mode recompiles the model for each new batch size"
+                )
+        # ids of the language tokens of the supported languages, in the order of SUPPORTED_LANGUAGES
+        lang_to_id = self.model.generation_config.lang_to_id
+        self.language_token_ids = torch.tensor(
+            [lang_to_id[f"<|{language}|>"] for language in SUPPORTED_LANGUAGES],
+            device=device,
+        )
         self.warmup()
 
-    def prepare_model_inputs(self, spoken_prompt):
-        input_features = self.processor(
-            spoken_prompt, sampling_rate=16000, return_tensors="pt"
-        ).input_features
+    @property
+    def detects_language(self):
+        return "language" not in self.gen_kwargs
+
+    def prepare_model_inputs(self, spoken_prompts):
+        input_features = torch.from_numpy(self.log_mel.batch(spoken_prompts))
         input_features = input_features.to(self.device, dtype=self.torch_dtype)
 
         return input_features
 
     def warmup(self):
         logger.info(f"Warming up {self.__class__.__name__}")
+        cache_entry = None
+        if self.compile_mode:
+            cache_entry = compile_cache_entry(
+                handler=self.__class__.__name__,
+                model=self.model_name,
+                dtype=str(self.torch_dtype),
+                device=self.device,
+                compile_mode=self.compile_mode,
+                detects_language=self.detects_language,
+                gen_kwargs=self.gen_kwargs,
+            )
+        if cache_entry is not None and cache_entry.load() and self.compile_mode == "default":
+            # nothing left to warm up, the graphs compiled by the warmup are loaded from the cache
+            cache_entry.warmed_up(0.0)
+            return
+        start_time = perf_counter()
 
         # 2 warmup steps for no compile or compile mode with CUDA graphs capture
         n_steps = 1 if self.compile_mode == "default" else 2
@@ -105,6 +175,8 @@ class WhisperSTTHandler(BaseHandler):
 
         for _ in range(n_steps):
             _ = self.model.generate(dummy_input, **warmup_gen_kwargs)
+            if self.detects_language:
+                _ = self.detect_languages(self.encode(dummy_input))
 
         if self.device == "cuda":
             end_event.record()
@@ -113,36 +185,79 @@ class WhisperSTTHandler(BaseHandler):
             logger.info(
                 f"{self.__class__.__name__}:  warmed up! time: {start_event.elapsed_time(end_event) * 1e-3:.3f} s"
             )
+        if cache_entry is not None:
+            # CUDA graphs cannot be cached, they are still captured by the warmup, from the cached compiled graphs
+            cache_entry.warmed_up(perf_counter() - start_time)
 
     def process(self, spoken_prompt):
-        logger.debug("infering whisper...")
+        yield from self.partials.process(spoken_prompt, self.transcribe)
 
-        global pipeline_start
-        pipeline_start = perf_counter()
+    def transcribe(self, spoken_prompt):
+        return self.transcribe_batch([spoken_prompt])[0]
 
-        input_features = self.prepare_model_inputs(spoken_prompt)
-        pred_ids = self.model.generate(input_features, **self.gen_kwargs)
-        language_code = self.processor.tokenizer.decode(pred_ids[0, 1])[2:-2]  # remove "<|" and "|>"
+    def transcribe_batch(self, spoken_prompts):
+        """
+        Transcribes a batch of utterances in a single `generate`, their features being padded to the same length.
+        Returns their (text, language_code) transcripts.
+        """
+        logger.debug(f"infering whisper on {len(spoken_prompts)} utterance(s)...")
 
-        if language_code not in SUPPORTED_LANGUAGES:  # reprocess with the last language
-            logger.warning("Whisper detected unsupported language:", language_code)
-            gen_kwargs = copy(self.gen_kwargs)
-            gen_kwargs['language'] = self.last_language
-            language_code = self.last_language
-            pred_ids = self.model.generate(input_features, **gen_kwargs)
+        input_features = self.prepare_model_inputs(spoken_prompts)
+        if self.detects_language:
+            # the encoder runs once, for the language identification and for the transcription
+            encoder_outputs = self.encode(input_features)
+            language_codes = self.detect_languages(encoder_outputs)
+            pred_ids = self.model.generate(
+                encoder_outputs=encoder_outputs,
+                **{**self.gen_kwargs, "language": language_codes},
+            )
         else:
-            self.last_language = language_code
-        
-        pred_text = self.processor.batch_decode(
+            pred_ids = self.model.generate(input_features, **self.gen_kwargs)
+            language_codes = [self.gen_kwargs["language"]] * len(spoken_prompts)
+        pred_texts = self.processor.batch_decode(
             pred_ids, skip_special_tokens=True, decode_with_timestamps=False
-        )[0]
-        language_code = self.processor.tokenizer.decode(pred_ids[0, 1])[2:-2] # remove "<|" and "|>"
+        )
 
         logger.debug("finished whisper inference")
-        console.print(f"[yellow]USER: {pred_text}")
-        logger.debug(f"Language Code Whisper: {language_code}")
+        outputs = []
+        for pred_text, language_code in zip(pred_texts, language_codes):
+            console.print(f"[yellow]USER: {pred_text}")
+            logger.debug(f"Language Code Whisper: {language_code}")
+            if self.start_language == "auto":
+                language_code += "-auto"
+            outputs.append((pred_text, language_code))
+        return outputs
+
+    @torch.no_grad()
+    def encode(self, input_features):
+        return self.model.get_encoder()(input_features)
+
+    @torch.no_grad()
+    def detect_languages(self, encoder_outputs):
+        """
+        Identifies the language of each utterance with a single decoder step, restricted to the supported languages.
+        """
+        batch_size = encoder_outputs.last_hidden_state.shape[0]
+        decoder_input_ids = torch.full(
+            (batch_size, 1),
+            self.model.generation_config.decoder_start_token_id,
+            device=encoder_outputs.last_hidden_state.device,
+        )
+        logits = self.model(
+            encoder_outputs=encoder_outputs,
+            decoder_input_ids=decoder_input_ids,
+            use_cache=False,
+        ).logits[:, -1]
+        language_ids = logits[:, self.language_token_ids].argmax(-1).tolist()
+        return [SUPPORTED_LANGUAGES[i] for i in language_ids]
 
-        if self.start_language == "auto":
-            language_code += "-auto"
-            
-        yield (pred_text, language_code)
+    def process_batch(self, inputs):
+        audios = [
+            audio
+            for audio in (self.partials.audio(spoken_prompt) for _, _, spoken_prompt in inputs)
+            if audio is not None
+        ]
+        transcripts = iter(self.transcribe_batch(audios) if audios else ())
+        # each transcript is routed back to the session and turn of its utterance
+        for session, turn, spoken_prompt in inputs:
+            yield session, turn, self.partials.process(spoken_prompt, lambda audio: next(transcripts))
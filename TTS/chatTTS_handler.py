@@ -15,6 +15,8 @@ console = Console()
 
 
 class ChatTTSHandler(BaseHandler):
+    produces_audio = True
+
     def setup(
         self,
         should_listen,
@@ -41,6 +43,7 @@ class ChatTTSHandler(BaseHandler):
 
     def process(self, llm_sentence):
         console.print(f"[green]ASSISTANT: {llm_sentence}")
+        token = self.cancel_token
         if self.device == "mps":
             import time
 
@@ -58,6 +61,9 @@ class ChatTTSHandler(BaseHandler):
         if self.stream:
             wavs = [np.array([])]
             for gen in wavs_gen:
+                if token.cancelled:
+                    logger.debug("Speech generation cancelled")
+                    break
                 if gen[0] is None or len(gen[0]) == 0:
                     self.should_listen.set()
                     return
@@ -75,6 +81,8 @@ class ChatTTSHandler(BaseHandler):
             audio_chunk = librosa.resample(wavs[0], orig_sr=24000, target_sr=16000)
             audio_chunk = (audio_chunk * 32768).astype(np.int16)
             for i in range(0, len(audio_chunk), self.chunk_size):
+                if token.cancelled:
+                    break
                 yield np.pad(
                     audio_chunk[i : i + self.chunk_size],
                     (0, self.chunk_size - len(audio_chunk[i : i + self.chunk_size])),
@@ -57,6 +57,8 @@ WHISPER_LANGUAGE_TO_FACEBOOK_LANGUAGE = {
 }
 
 class FacebookMMSTTSHandler(BaseHandler):
+    produces_audio = True
+
     def setup(
         self,
         should_listen,
@@ -132,6 +134,7 @@ class FacebookMMSTTSHandler(BaseHandler):
         console.print(f"[green]ASSISTANT: {llm_sentence}")
         logger.debug(f"Processing text: {llm_sentence}")
         logger.debug(f"Language code: {language_code}")
+        token = self.cancel_token
 
         if language_code is not None and self.language != language_code:
             try:
@@ -159,10 +162,14 @@ class FacebookMMSTTSHandler(BaseHandler):
 
         if self.stream:
             for i in range(0, len(audio_int16), self.chunk_size):
+                if token.cancelled:
+                    break
                 chunk = audio_int16[i:i + self.chunk_size]
                 yield np.pad(chunk, (0, self.chunk_size - len(chunk)))
         else:
             for i in range(0, len(audio_int16), self.chunk_size):
+                if token.cancelled:
+                    break
                 yield np.pad(
                     audio_int16[i : i + self.chunk_size],
                     (0, self.chunk_size - len(audio_int16[i : i + self.chunk_size])),
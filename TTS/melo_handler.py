@@ -1,6 +1,7 @@
 from melo.api import TTS
 import logging
 from baseHandler import BaseHandler
+from utils.utils import ensure_nltk_data
 import librosa
 import numpy as np
 from rich.console import Console
@@ -30,6 +31,8 @@ WHISPER_LANGUAGE_TO_MELO_SPEAKER = {
 
 
 class MeloTTSHandler(BaseHandler):
+    produces_audio = True
+
     def setup(
         self,
         should_listen,
@@ -39,6 +42,8 @@ class MeloTTSHandler(BaseHandler):
         gen_kwargs={},  # Unused
         blocksize=512,
     ):
+        # tagger of the English grapheme to phoneme conversion
+        ensure_nltk_data("taggers/averaged_perceptron_tagger_eng")
         self.should_listen = should_listen
         self.device = device
         self.language = language
@@ -62,6 +67,7 @@ class MeloTTSHandler(BaseHandler):
             llm_sentence, language_code = llm_sentence
 
         console.print(f"[green]ASSISTANT: {llm_sentence}")
+        token = self.cancel_token
 
         if language_code is not None and self.language != language_code:
             try:
@@ -101,6 +107,9 @@ class MeloTTSHandler(BaseHandler):
         audio_chunk = librosa.resample(audio_chunk, orig_sr=44100, target_sr=16000)
         audio_chunk = (audio_chunk * 32768).astype(np.int16)
         for i in range(0, len(audio_chunk), self.blocksize):
+            if token.cancelled:
+                logger.debug("Speech generation cancelled")
+                break
             yield np.pad(
                 audio_chunk[i : i + self.blocksize],
                 (0, self.blocksize - len(audio_chunk[i : i + self.blocksize])),
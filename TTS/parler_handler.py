@@ -5,11 +5,13 @@ import numpy as np
 import torch
 from transformers import (
     AutoTokenizer,
+    StoppingCriteriaList,
 )
 from parler_tts import ParlerTTSForConditionalGeneration, ParlerTTSStreamer
 import librosa
 import logging
 from rich.console import Console
+from utils.compile_cache import compile_cache_entry
 from utils.utils import next_power_of_2
 from transformers.utils.import_utils import (
     is_flash_attn_2_available,
@@ -44,6 +46,8 @@ WHISPER_LANGUAGE_TO_PARLER_SPEAKER = {
 
 
 class ParlerTTSHandler(BaseHandler):
+    produces_audio = True
+
     def setup(
         self,
         should_listen,
@@ -73,6 +77,7 @@ class ParlerTTSHandler(BaseHandler):
         self.speaker = "Jason"
         self.description = description
 
+        self.model_name = model_name
         self.model = ParlerTTSForConditionalGeneration.from_pretrained(
             model_name, torch_dtype=self.torch_dtype
         ).to(device)
@@ -137,6 +142,23 @@ class ParlerTTSHandler(BaseHandler):
 
     def warmup(self):
         logger.info(f"Warming up {self.__class__.__name__}")
+        cache_entry = None
+        if self.compile_mode:
+            cache_entry = compile_cache_entry(
+                handler=self.__class__.__name__,
+                model=self.model_name,
+                dtype=str(self.torch_dtype),
+                device=self.device,
+                compile_mode=self.compile_mode,
+                max_prompt_pad_length=self.max_prompt_pad_length,
+                description=self.description,
+                gen_kwargs=self.gen_kwargs,
+            )
+        if cache_entry is not None and cache_entry.load():
+            # the graphs compiled for each padded prompt length are loaded from the cache
+            cache_entry.warmed_up(0.0)
+            return
+        start_time = perf_counter()
 
         if self.device == "cuda":
             start_event = torch.cuda.Event(enable_timing=True)
@@ -168,6 +190,8 @@ class ParlerTTSHandler(BaseHandler):
             logger.info(
                 f"{self.__class__.__name__}:  warmed up! time: {start_event.elapsed_time(end_event) * 1e-3:.3f} s"
             )
+        if cache_entry is not None:
+            cache_entry.warmed_up(perf_counter() - start_time)
 
     def process(self, llm_sentence):
         if isinstance(llm_sentence, tuple):
@@ -193,17 +217,20 @@ class ParlerTTSHandler(BaseHandler):
         streamer = ParlerTTSStreamer(
             self.model, device=self.device, play_steps=self.play_steps
         )
-        tts_gen_kwargs = {"streamer": streamer, **tts_gen_kwargs}
+        token = self.cancel_token
+        tts_gen_kwargs = {
+            "streamer": streamer,
+            "stopping_criteria": StoppingCriteriaList([token]),
+            **tts_gen_kwargs,
+        }
         torch.manual_seed(0)
         thread = Thread(target=self.model.generate, kwargs=tts_gen_kwargs)
         thread.start()
 
-        for i, audio_chunk in enumerate(streamer):
-            global pipeline_start
-            if i == 0 and "pipeline_start" in globals():
-                logger.info(
-                    f"Time to first audio: {perf_counter() - pipeline_start:.3f}"
-                )
+        for audio_chunk in streamer:
+            if token.cancelled:
+                logger.debug("Speech generation cancelled")
+                break
             audio_chunk = librosa.resample(audio_chunk, orig_sr=44100, target_sr=16000)
             audio_chunk = (audio_chunk * 32768).astype(np.int16)
             for i in range(0, len(audio_chunk), self.blocksize):
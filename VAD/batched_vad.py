@@ -0,0 +1,280 @@
+import numpy as np
+
+from VAD.framing import AudioFramer
+from utils.buffers import SpeechBuffer
+from utils.segments import cut_segment, end_utterance
+
+# event emitted when a stream starts speaking, utterances are emitted as float32 arrays
+SPEECH_START = "start"
+
+
+class JitBatchScorer:
+    """
+    Scores one window of many streams in a single forward pass of a shared Silero VAD v5 JIT model.
+    The model keeps the recurrent state and audio context of a single batch: the state of each stream is kept here, in a
+    slot, and swapped in and out of the model around every forward pass.
+    """
+
+    def __init__(self, model, sampling_rate=16000, capacity=16):
+        # torch is only imported with the torch VAD backend
+        import torch
+
+        for attribute in ("_state", "_context", "_last_sr", "_last_batch_size"):
+            if not hasattr(model, attribute):
+                raise ValueError(
+                    "The batched VAD requires the Silero VAD v5 JIT model, use `--vad_backend onnx` or `--vad_batch_size 1` with other models"
+                )
+        self.model = model
+        self.sampling_rate = sampling_rate
+        self.context_size = 64 if sampling_rate == 16000 else 32
+        self.states = torch.zeros(2, capacity, 128)
+        self.contexts = torch.zeros(capacity, self.context_size)
+
+    @property
+    def capacity(self):
+        return self.contexts.shape[0]
+
+    def grow(self, capacity):
+        import torch
+
+        states = torch.zeros(2, capacity, 128)
+        contexts = torch.zeros(capacity, self.context_size)
+        states[:, : self.capacity] = self.states
+        contexts[: self.capacity] = self.contexts
+        self.states, self.contexts = states, contexts
+
+    def reset(self, slot):
+        self.states[:, slot] = 0
+        self.contexts[slot] = 0
+
+    def __call__(self, windows, slots):
+        """
+        windows: float32 array of shape (n_streams, window_size_samples)
+        slots: int64 array of the slots of the streams
+        Returns the speech probabilities of the windows as a NumPy array.
+        """
+        import torch
+
+        slots = torch.from_numpy(slots)
+        self.model._state = self.states[:, slots]
+        self.model._context = self.contexts[slots]
+        self.model._last_sr = self.sampling_rate
+        # prevents the model from resetting its state when the number of streams changes
+        self.model._last_batch_size = len(slots)
+        with torch.no_grad():
+            probs = self.model(torch.from_numpy(windows), self.sampling_rate)
+        self.states[:, slots] = self.model._state
+        self.contexts[slots] = self.model._context
+        # a single device to host transfer per forward pass
+        return probs[:, 0].cpu().numpy()
+
+
+class BatchedVADIterator:
+    """
+    Runs the VADIterator state machine for many audio streams at once.
+    Each call scores the queued audio of every stream: the i-th window of every stream is scored in the same forward pass,
+    and the hysteresis (speech start, silence countdown, end of speech) is then applied to all the streams at once on NumPy
+    arrays. Streams are identified by hashable keys and hold a slot in the state arrays until `remove` is called.
+
+    `scorer` is called with a (n_streams, window_size_samples) float32 array and the int64 slots of the streams, and
+    returns their speech probabilities; it also implements `capacity`, `grow(capacity)` and `reset(slot)`.
+    The audio of the streams is sent at `input_sampling_rate` (default: `sampling_rate`) and reframed into windows by
+    an `AudioFramer` per stream.
+    `endpointer_factory`, called with a stream key, creates the `AdaptiveEndpointer` of the stream; the streams
+    waiting for the end of speech are then evaluated one by one, while the others stay vectorized.
+    """
+
+    def __init__(
+        self,
+        scorer,
+        threshold=0.5,
+        sampling_rate=16000,
+        min_silence_duration_ms=100,
+        speech_pad_ms=30,
+        partial_segment_ms=0,
+        endpointer_factory=None,
+        input_sampling_rate=None,
+    ):
+        if sampling_rate not in [8000, 16000]:
+            raise ValueError(
+                "BatchedVADIterator does not support sampling rates other than [8000, 16000]"
+            )
+        self.scorer = scorer
+        self.threshold = threshold
+        self.sampling_rate = sampling_rate
+        self.input_sampling_rate = input_sampling_rate or sampling_rate
+        self.window_size_samples = 512 if sampling_rate == 16000 else 256
+        self.min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+        self.speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+        self.partial_segment_samples = sampling_rate * partial_segment_ms / 1000
+        self.endpointer_factory = endpointer_factory
+        self.endpointers = {}
+
+        self.slots = {}
+        self.free_slots = []
+        capacity = scorer.capacity
+        self.triggered = np.zeros(capacity, dtype=bool)
+        self.temp_end = np.zeros(capacity, dtype=np.int64)
+        self.current_sample = np.zeros(capacity, dtype=np.int64)
+        # sample at which the last utterance of each stream ended, the pre-roll does not reach back into it
+        self.speech_end = np.zeros(capacity, dtype=np.int64)
+        self.buffers = [self.new_buffer() for _ in range(capacity)]
+        # last windows of each stream, for the pre-roll of the utterances: the current window and the previous ones
+        self.pre_roll_samples = int(self.speech_pad_samples)
+        self.history_size = -(-self.pre_roll_samples // self.window_size_samples) + 1
+        self.history = np.zeros(
+            (capacity, self.history_size, self.window_size_samples), dtype=np.float32
+        )
+        self.framers = [self.new_framer() for _ in range(capacity)]
+
+    def new_buffer(self):
+        return SpeechBuffer(pad_samples=int(self.speech_pad_samples))
+
+    def new_framer(self):
+        return AudioFramer(self.input_sampling_rate, self.sampling_rate)
+
+    def slot(self, key):
+        slot = self.slots.get(key)
+        if slot is not None:
+            return slot
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            slot = len(self.slots)
+            if slot >= len(self.triggered):
+                self.grow(2 * len(self.triggered))
+        self.slots[key] = slot
+        if self.endpointer_factory is not None:
+            self.endpointers[slot] = self.endpointer_factory(key)
+        return slot
+
+    def grow(self, capacity):
+        self.scorer.grow(capacity)
+        extra = capacity - len(self.triggered)
+        self.triggered = np.concatenate((self.triggered, np.zeros(extra, dtype=bool)))
+        self.temp_end = np.concatenate((self.temp_end, np.zeros(extra, dtype=np.int64)))
+        self.current_sample = np.concatenate(
+            (self.current_sample, np.zeros(extra, dtype=np.int64))
+        )
+        self.speech_end = np.concatenate((self.speech_end, np.zeros(extra, dtype=np.int64)))
+        self.buffers.extend(self.new_buffer() for _ in range(extra))
+        self.history = np.concatenate(
+            (self.history, np.zeros((extra, *self.history.shape[1:]), dtype=np.float32))
+        )
+        self.framers.extend(self.new_framer() for _ in range(extra))
+
+    def remove(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        self.scorer.reset(slot)
+        self.triggered[slot] = False
+        self.temp_end[slot] = 0
+        self.current_sample[slot] = 0
+        self.speech_end[slot] = 0
+        self.buffers[slot] = self.new_buffer()
+        self.history[slot] = 0
+        self.framers[slot] = self.new_framer()
+        self.endpointers.pop(slot, None)
+        self.free_slots.append(slot)
+
+    def is_triggered(self, key):
+        slot = self.slots.get(key)
+        return slot is not None and bool(self.triggered[slot])
+
+    def pre_roll(self, slot):
+        """
+        Returns the audio heard by a stream before its current window and since its last utterance, up to
+        `speech_pad_ms`.
+        """
+        window_index = self.current_sample[slot] // self.window_size_samples - 1
+        indices = np.arange(window_index - self.history_size + 1, window_index) % self.history_size
+        available = min(
+            self.pre_roll_samples,
+            self.current_sample[slot] - self.window_size_samples - self.speech_end[slot],
+        )
+        return self.history[slot, indices].reshape(-1)[len(indices) * self.window_size_samples - available :]
+
+    def frames(self, slot, audio):
+        """
+        Splits the audio of a stream, a chunk or a list of chunks, into windows, keeping the remainder for the next call.
+        """
+        framer = self.framers[slot]
+        for chunk in audio if isinstance(audio, list) else (audio,):
+            framer.extend(chunk)
+        return framer.windows()
+
+    def __call__(self, streams):
+        """
+        streams: dict mapping stream keys to their audio: a chunk (int16 bytes or array, or float32 array) or a list of
+        chunks, of any size
+        Returns a dict mapping stream keys to their events, in order: SPEECH_START, the float32 array of a complete
+        utterance, or a `SpeechSegment` with `partial_segment_ms`.
+        """
+        keys = list(streams)
+        slots = np.array([self.slot(key) for key in keys], dtype=np.int64)
+        frames = [self.frames(slot, streams[key]) for key, slot in zip(keys, slots)]
+        n_frames = np.array([len(stream_frames) for stream_frames in frames])
+        events = {key: [] for key in keys}
+        for i in range(n_frames.max(initial=0)):
+            active = np.flatnonzero(n_frames > i)
+            windows = np.stack([frames[j][i] for j in active])
+            probs = self.scorer(windows, slots[active])
+            self.step([keys[j] for j in active], slots[active], windows, probs, events)
+        return events
+
+    def step(self, keys, slots, windows, probs, events):
+        """
+        Applies one window to the state machine of each stream, as `VADIterator.__call__` does for a single stream.
+        """
+        current_sample = self.current_sample[slots] + self.window_size_samples
+        triggered = self.triggered[slots]
+        speech = probs >= self.threshold
+        silence = probs < self.threshold - 0.15
+        resume = speech & (self.temp_end[slots] > 0)
+        temp_end = np.where(speech, 0, self.temp_end[slots])
+
+        start = speech & ~triggered
+        ending = silence & triggered
+        pause = ending & (temp_end == 0)
+        temp_end = np.where(ending & (temp_end == 0), current_sample, temp_end)
+        if self.endpointers:
+            min_silence_samples = np.full(len(slots), self.min_silence_samples)
+            for j in np.flatnonzero(resume):
+                self.endpointers[slots[j]].resume(current_sample[j] - self.temp_end[slots[j]])
+            for j in np.flatnonzero(ending):
+                # the window is appended to the buffer below
+                min_silence_samples[j] = self.endpointers[slots[j]].silence(
+                    probs[j], len(self.buffers[slots[j]]) + self.window_size_samples
+                )
+        else:
+            min_silence_samples = self.min_silence_samples
+        done = ending & (current_sample - temp_end >= min_silence_samples)
+        if self.endpointers:
+            for j in np.flatnonzero(done):
+                self.endpointers[slots[j]].end(current_sample[j] - temp_end[j])
+        # speech windows are accumulated, silent windows waiting for the end of speech only pad the utterance
+        keep = triggered & ~ending
+        temp_end[done] = 0
+
+        self.current_sample[slots] = current_sample
+        self.history[slots, (current_sample // self.window_size_samples - 1) % self.history_size] = windows
+        self.temp_end[slots] = temp_end
+        self.triggered[slots] = (triggered | start) & ~done
+        self.speech_end[slots[done]] = current_sample[done]
+
+        for j in np.flatnonzero(start):
+            self.buffers[slots[j]].start(self.pre_roll(slots[j]))
+            self.buffers[slots[j]].append(windows[j])
+            events[keys[j]].append(SPEECH_START)
+        for j in np.flatnonzero(keep):
+            self.buffers[slots[j]].append(windows[j])
+        for j in np.flatnonzero(ending):
+            self.buffers[slots[j]].append(windows[j], speech=False)
+        if self.partial_segment_samples > 0:
+            for j in np.flatnonzero(pause & ~done):
+                buffer = self.buffers[slots[j]]
+                if len(buffer) - buffer.segment_start >= self.partial_segment_samples:
+                    events[keys[j]].append(cut_segment(buffer))
+        for j in np.flatnonzero(done):
+            events[keys[j]].append(end_utterance(self.buffers[slots[j]]))
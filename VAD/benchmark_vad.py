@@ -0,0 +1,104 @@
+"""
+Compares the CPU cost of the Silero VAD backends on random audio:
+- the torch JIT model driven by `VADIterator`, one stream at a time (the default path),
+- the ONNX Runtime model driven by `VADIterator`,
+- the batched path (`--vad_batch_size`) of both backends, scoring all the streams in shared forward passes.
+
+    python -m VAD.benchmark_vad --onnx_model_path silero_vad.onnx --n_streams 64
+"""
+import copy
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Optional
+
+import numpy as np
+import torch
+from transformers import HfArgumentParser
+
+from VAD.batched_vad import BatchedVADIterator, JitBatchScorer
+from VAD.vad_iterator import VADIterator
+
+
+@dataclass
+class BenchmarkVADArguments:
+    onnx_model_path: Optional[str] = field(
+        default=None,
+        metadata={"help": "Path of silero_vad.onnx. The onnx backend is skipped if not given."},
+    )
+    n_streams: int = field(default=16, metadata={"help": "Number of concurrent audio streams. Default is 16."})
+    duration_s: float = field(default=10, metadata={"help": "Audio duration of each stream, in seconds. Default is 10."})
+    sample_rate: int = field(default=16000, metadata={"help": "Either 8000 or 16000. Default is 16000."})
+    intra_op_threads: int = field(default=1, metadata={"help": "Threads of the ONNX Runtime session. Default is 1."})
+    torch_threads: int = field(default=1, metadata={"help": "Threads of torch. Default is 1."})
+
+
+def report(name, elapsed, n_windows, audio_s):
+    print(
+        f"{name:<24} {elapsed:7.3f} s  {elapsed / n_windows * 1e6:8.1f} µs/window  "
+        f"real-time factor {elapsed / audio_s:.5f}"
+    )
+
+
+def run_iterators(model, audio, sample_rate, window_size, model_input=np.asarray):
+    iterators = [VADIterator(copy.deepcopy(model), sampling_rate=sample_rate) for _ in audio]
+    start = perf_counter()
+    for i in range(0, audio.shape[1], window_size):
+        for iterator, stream in zip(iterators, audio):
+            iterator(model_input(stream[i : i + window_size]))
+    return perf_counter() - start
+
+
+def run_batched(scorer, audio, sample_rate, window_size, chunk_windows=4):
+    iterator = BatchedVADIterator(scorer, sampling_rate=sample_rate)
+    chunk_size = chunk_windows * window_size
+    start = perf_counter()
+    for i in range(0, audio.shape[1], chunk_size):
+        iterator({key: stream[i : i + chunk_size] for key, stream in enumerate(audio)})
+    return perf_counter() - start
+
+
+def main(args):
+    torch.set_num_threads(args.torch_threads)
+    window_size = 512 if args.sample_rate == 16000 else 256
+    n_windows_per_stream = int(args.duration_s * args.sample_rate) // window_size
+    audio = np.random.default_rng(0).uniform(
+        -0.5, 0.5, (args.n_streams, n_windows_per_stream * window_size)
+    ).astype(np.float32)
+    n_windows = args.n_streams * n_windows_per_stream
+    audio_s = args.n_streams * args.duration_s
+    print(f"{args.n_streams} streams of {args.duration_s} s, {n_windows} windows")
+
+    jit_model, _ = torch.hub.load("snakers4/silero-vad", "silero_vad")
+    jit_model.requires_grad_(False)
+    report(
+        "torch jit",
+        run_iterators(jit_model, audio, args.sample_rate, window_size, torch.from_numpy),
+        n_windows,
+        audio_s,
+    )
+    report(
+        "torch jit batched",
+        run_batched(JitBatchScorer(jit_model, args.sample_rate), audio, args.sample_rate, window_size),
+        n_windows,
+        audio_s,
+    )
+
+    if args.onnx_model_path is None:
+        return
+    from VAD.onnx_vad import OnnxBatchScorer, OnnxSessionPool, OnnxVADModel
+
+    pool = OnnxSessionPool(args.onnx_model_path, intra_op_threads=args.intra_op_threads)
+    onnx_model = OnnxVADModel(pool, args.sample_rate)
+    report("onnx", run_iterators(onnx_model, audio, args.sample_rate, window_size), n_windows, audio_s)
+    report(
+        "onnx batched",
+        run_batched(OnnxBatchScorer(pool, args.sample_rate), audio, args.sample_rate, window_size),
+        n_windows,
+        audio_s,
+    )
+
+
+if __name__ == "__main__":
+    parser = HfArgumentParser((BenchmarkVADArguments,))
+    (args,) = parser.parse_args_into_dataclasses()
+    main(args)
@@ -0,0 +1,157 @@
+"""
+Adaptive endpointing (`--adaptive_endpointing`): the silence awaited before the end of speech is adapted to each turn
+and each speaker instead of always being `min_silence_ms`.
+"""
+import logging
+import re
+from collections import deque
+
+import numpy as np
+
+from utils.metrics import REGISTRY, Histogram
+from utils.segments import latest_transcript
+
+logger = logging.getLogger(__name__)
+
+ENDPOINT_SILENCE_SECONDS = REGISTRY.register(
+    Histogram(
+        "s2s_vad_endpoint_silence_seconds",
+        "Silence awaited by the VAD before the end of speech of each turn.",
+    )
+)
+
+# a transcript ending like this is likely a complete turn
+COMPLETE_TURN = re.compile(r"[.?!。？！…]\W*$")
+# and like this, an incomplete one
+INCOMPLETE_TURN = re.compile(
+    r"([,;:、，；：-]|\b(and|but|or|so|because|then|that|the|a|to|of|with|um+|uh+|er+|hmm+|like))\W*$",
+    re.IGNORECASE,
+)
+
+
+def turn_completeness(text):
+    """
+    Lightweight end-of-turn classifier of a partial transcript: 1 if it looks complete, -1 if it looks incomplete,
+    0 when it cannot tell.
+    """
+    if not text:
+        return 0
+    if COMPLETE_TURN.search(text):
+        return 1
+    if INCOMPLETE_TURN.search(text):
+        return -1
+    return 0
+
+
+class AdaptiveEndpointer:
+    """
+    Silence awaited before the end of speech of one stream, between `min_endpoint_ms` and `max_endpoint_ms`.
+    Starting from `min_silence_ms`, the wait follows:
+    - the speaker: the pauses made inside the previous utterances are recorded, and the wait is kept above most of them.
+      The silences ending the turns are recorded too, as pauses lasting at least as long (censored observations), so
+      that the wait only shrinks below `min_silence_ms` once most of the pauses of the speaker are known to be shorter,
+      while it grows for hesitant speakers,
+    - the speech probabilities during the silence, relative to the probability below which a window is silent
+      (`threshold` - 0.15, as in `VADIterator`): a clean drop to zero shortens the wait, while a probability lingering
+      near the silence threshold lengthens it,
+    - the utterance length: short answers ("yes", "no") are usually complete,
+    - the transcript of the last partial segment (`--partial_segment_ms`): terminal punctuation shortens the wait, a
+      trailing conjunction, comma or filler word lengthens it.
+    The wait is reevaluated at every silent window, and the latency saved over `min_silence_ms` is reported per turn.
+    """
+
+    def __init__(
+        self,
+        sampling_rate=16000,
+        threshold=0.5,
+        min_silence_ms=1000,
+        min_endpoint_ms=200,
+        max_endpoint_ms=2000,
+        session=None,
+        n_pauses=32,
+    ):
+        self.sampling_rate = sampling_rate
+        self.threshold = threshold
+        self.silence_threshold = threshold - 0.15
+        self.min_silence_samples = sampling_rate * min_silence_ms / 1000
+        self.min_endpoint_samples = sampling_rate * min_endpoint_ms / 1000
+        self.max_endpoint_samples = sampling_rate * max_endpoint_ms / 1000
+        self.session = session
+        # (samples, censored) of the recent pauses, censored for the silences ending a turn
+        self.pauses = deque(maxlen=n_pauses)
+        self.silence_prob_sum = 0.0
+        self.silence_windows = 0
+        self.saved_samples = 0
+
+    def pause_quantile(self, q):
+        """
+        Kaplan-Meier estimate of the `q` quantile of the pauses of the speaker, None when the censored pauses leave it
+        unknown.
+        """
+        survival = 1.0
+        at_risk = len(self.pauses)
+        for samples, censored in sorted(self.pauses):
+            if not censored:
+                survival *= 1 - 1 / at_risk
+                if survival <= 1 - q:
+                    return samples
+            at_risk -= 1
+        return None
+
+    def speaker_wait(self):
+        """
+        Silence awaited for the speaker, before the adjustments of the turn.
+        """
+        if len(self.pauses) < 3:
+            return self.min_silence_samples
+        quantile = self.pause_quantile(0.9)
+        if quantile is not None:
+            return 1.5 * quantile
+        # the speaker may pause longer than the turns ended so far: never shorter than the default wait
+        pauses = [samples for samples, censored in self.pauses if not censored]
+        if not pauses:
+            return self.min_silence_samples
+        return max(self.min_silence_samples, 1.5 * np.percentile(pauses, 90))
+
+    def silence(self, prob, utterance_samples):
+        """
+        Called for each silent window of a pause, returns the number of silent samples ending the speech.
+        """
+        self.silence_prob_sum += prob
+        self.silence_windows += 1
+
+        wait = self.speaker_wait()
+        factor = 1.0
+        silence_prob = self.silence_prob_sum / self.silence_windows
+        if silence_prob < 0.1 * self.silence_threshold:
+            factor *= 0.75
+        elif silence_prob > 0.5 * self.silence_threshold:
+            factor *= 1.25
+        if utterance_samples < self.sampling_rate:
+            factor *= 0.8
+        factor *= (1.0, 0.6, 1.5)[turn_completeness(latest_transcript(self.session))]
+        return min(max(wait * factor, self.min_endpoint_samples), self.max_endpoint_samples)
+
+    def resume(self, pause_samples):
+        """
+        Called when the speech resumes after a pause.
+        """
+        self.pauses.append((pause_samples, False))
+        self.silence_prob_sum = 0.0
+        self.silence_windows = 0
+
+    def end(self, silence_samples):
+        """
+        Called at the end of speech, after `silence_samples` of silence.
+        """
+        # had the turn not ended, the pause would have lasted at least as long
+        self.pauses.append((silence_samples, True))
+        self.silence_prob_sum = 0.0
+        self.silence_windows = 0
+        saved = self.min_silence_samples - silence_samples
+        self.saved_samples += saved
+        ENDPOINT_SILENCE_SECONDS.labels().observe(silence_samples / self.sampling_rate)
+        logger.debug(
+            f"VAD: end of speech after {silence_samples / self.sampling_rate * 1000:.0f} ms of silence, "
+            f"{saved / self.sampling_rate * 1000:.0f} ms saved"
+        )
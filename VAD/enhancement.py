@@ -0,0 +1,151 @@
+"""
+Speech enhancement with DeepFilterNet (`--audio_enhancement`), run as a side stage of the VAD: while the user speaks,
+the utterance is denoised block by block in a worker thread, so that at the end of speech only the last block is left
+to enhance.
+"""
+import logging
+import queue
+import threading
+from time import monotonic
+
+import numpy as np
+import torch
+import torchaudio
+from df.enhance import enhance, init_df
+
+logger = logging.getLogger(__name__)
+
+
+class EnhancementWorker:
+    """
+    Thread enhancing the blocks submitted by the `StreamEnhancement`s of the VAD, in submission order.
+    The audio is resampled to the rate of the model and back with resampling kernels computed once.
+    Each block is enhanced after `context_ms` of the audio preceding it, which lets the recurrent model settle, and
+    the enhanced context is dropped.
+    """
+
+    def __init__(self, sample_rate=16000, block_ms=500, context_ms=200):
+        self.model, self.df_state, _ = init_df()
+        self.sample_rate = sample_rate
+        self.block_samples = sample_rate * block_ms // 1000
+        self.context_samples = sample_rate * context_ms // 1000
+        self.upsample = self.downsample = None
+        if self.df_state.sr() != sample_rate:
+            self.upsample = torchaudio.transforms.Resample(sample_rate, self.df_state.sr())
+            self.downsample = torchaudio.transforms.Resample(self.df_state.sr(), sample_rate)
+        self.tasks = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="EnhancementWorker", daemon=True)
+        self.thread.start()
+
+    @torch.no_grad()
+    def enhance(self, audio):
+        x = torch.from_numpy(audio).unsqueeze(0)
+        if self.upsample is not None:
+            x = self.upsample(x)
+        enhanced = enhance(self.model, self.df_state, x)
+        if self.downsample is not None:
+            enhanced = self.downsample(enhanced)
+        return enhanced.numpy().reshape(-1)
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            stream, utterance, start, audio, context = task
+            if utterance != stream.utterance:
+                # the utterance was dropped
+                continue
+            try:
+                enhanced = self.enhance(np.concatenate((context, audio)))
+                enhanced = enhanced[len(context) : len(context) + len(audio)]
+                if len(enhanced) < len(audio):
+                    # resampling may round the length down
+                    enhanced = np.concatenate((enhanced, audio[len(enhanced) :]))
+            except Exception:
+                logger.exception("Audio enhancement failed, the block is kept as is")
+                enhanced = audio
+            stream.write(utterance, start, enhanced)
+
+    def stop(self):
+        self.tasks.put(None)
+
+
+class StreamEnhancement:
+    """
+    Enhanced audio of the utterance being spoken on one stream.
+    `update` submits the complete blocks of the speech buffer to the worker as the speech is captured, `enhanced`
+    submits the rest of an utterance or segment and waits for its enhanced audio, returned as a view. `reset` starts a
+    new utterance in a new array, so that the views handed out stay valid.
+    The wait is bounded by `timeout_s`: if the worker is stopped or stuck, the blocks not enhanced yet are returned as
+    captured rather than stalling the VAD.
+    """
+
+    def __init__(self, worker, capacity=16000 * 10, timeout_s=2.0):
+        self.worker = worker
+        self.timeout_s = timeout_s
+        self.condition = threading.Condition()
+        self.output = np.empty(capacity, dtype=np.float32)
+        self.utterance = 0
+        self.submitted = 0
+        self.done = 0
+        self.context = np.zeros(0, dtype=np.float32)
+
+    def reset(self):
+        with self.condition:
+            self.utterance += 1
+            self.output = np.empty(len(self.output), dtype=np.float32)
+            self.submitted = self.done = 0
+            self.context = np.zeros(0, dtype=np.float32)
+
+    def update(self, buffer):
+        block_samples = self.worker.block_samples
+        while len(buffer) - self.submitted >= block_samples:
+            self.submit(buffer.data[self.submitted : self.submitted + block_samples])
+
+    def submit(self, audio):
+        # `audio` is a view on audio that is not modified anymore, the worker reads it without copy
+        self.worker.tasks.put((self, self.utterance, self.submitted, audio, self.context))
+        context_samples = self.worker.context_samples
+        if len(audio) >= context_samples:
+            self.context = audio[len(audio) - context_samples :]
+        else:
+            self.context = np.concatenate((self.context, audio))[-context_samples:]
+        self.submitted += len(audio)
+
+    def write(self, utterance, start, enhanced):
+        with self.condition:
+            if utterance != self.utterance:
+                return
+            end = start + len(enhanced)
+            if end > len(self.output):
+                output = np.empty(max(end, 2 * len(self.output)), dtype=np.float32)
+                output[:start] = self.output[:start]
+                self.output = output
+            self.output[start:end] = enhanced
+            self.done = end
+            self.condition.notify_all()
+
+    def enhanced(self, audio, end):
+        """
+        Returns the enhanced `audio`, ending `end` samples after the start of the utterance.
+        """
+        start = end - len(audio)
+        if self.submitted < start:
+            self.submitted = start
+        if end > self.submitted:
+            self.submit(audio[self.submitted - start :])
+        deadline = monotonic() + self.timeout_s
+        with self.condition:
+            while self.done < end:
+                remaining = deadline - monotonic()
+                if remaining <= 0 or not self.worker.thread.is_alive():
+                    # the enhanced blocks, followed by the audio as captured
+                    enhanced_end = max(self.done, start)
+                    logger.warning(
+                        f"Audio enhancement did not complete, {end - enhanced_end} samples are kept as captured"
+                    )
+                    return np.concatenate((self.output[start:enhanced_end], audio[enhanced_end - start :]))
+                # wakes up regularly to check that the worker is still running
+                self.condition.wait(min(remaining, 0.1))
+            return self.output[start:end]
@@ -0,0 +1,128 @@
+"""
+Reframing of the client audio into the exact windows of the Silero VAD (512 samples at 16 kHz, 256 at 8 kHz), whatever
+the size of the chunks sent by the client and its sample rate.
+"""
+import math
+
+import numpy as np
+
+MODEL_SAMPLING_RATES = (8000, 16000)
+
+
+def model_sampling_rate(sampling_rate):
+    """
+    Rate at which the VAD runs for a client sending audio at `sampling_rate`: other rates than 8 and 16 kHz are
+    resampled to 16 kHz, the rate expected by the STT models.
+    """
+    return sampling_rate if sampling_rate in MODEL_SAMPLING_RATES else 16000
+
+
+def window_size(sampling_rate):
+    return 512 if sampling_rate == 16000 else 256
+
+
+def lowpass_kernel(cutoff, n_taps):
+    """
+    Hann-windowed sinc low-pass filter, `cutoff` being relative to the sampling rate.
+    """
+    t = np.arange(n_taps) - (n_taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * t) * np.hanning(n_taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class StreamingResampler:
+    """
+    Resamples a stream of float32 chunks from `orig_freq` to `new_freq`, keeping the filter history and the phase of
+    the interpolation across chunks. Downsampling applies an anti-aliasing low-pass filter, whose kernel is computed
+    once, before linearly interpolating the output samples.
+    """
+
+    def __init__(self, orig_freq, new_freq, taps_per_ratio=8):
+        self.step = orig_freq / new_freq
+        self.kernel = None
+        if orig_freq > new_freq:
+            n_taps = 2 * taps_per_ratio * math.ceil(self.step) + 1
+            # the cut-off is kept a little below the new Nyquist frequency
+            self.kernel = lowpass_kernel(0.45 / self.step, n_taps)
+            self.history = np.zeros(n_taps - 1, dtype=np.float32)
+        # position of the next output sample, in input samples, 0 being the last sample of the previous chunk
+        self.position = 1.0
+        self.last = np.float32(0)
+
+    def __call__(self, chunk):
+        if self.kernel is not None:
+            padded = np.concatenate((self.history, chunk))
+            self.history = padded[len(padded) - len(self.history) :]
+            chunk = np.convolve(padded, self.kernel, mode="valid")
+        n_samples = len(chunk)
+        n_out = max(0, math.floor((n_samples - self.position) / self.step) + 1)
+        positions = self.position + self.step * np.arange(n_out)
+        samples = np.concatenate(([self.last], chunk))
+        out = np.interp(positions, np.arange(n_samples + 1), samples).astype(np.float32)
+        self.position += self.step * n_out - n_samples
+        if n_samples:
+            self.last = chunk[-1]
+        return out
+
+
+class AudioFramer:
+    """
+    Accumulates the audio chunks of one stream, int16 (bytes or array) or float32, in a preallocated float32 buffer and
+    hands out the complete windows of `window_size_samples` samples, the remainder being kept for the next chunks.
+    Audio sent at another rate than the model's is resampled first. The int16 conversion writes straight into the
+    buffer, so framing allocates nothing once the buffer is large enough for the chunks of the client.
+    """
+
+    def __init__(self, sampling_rate=16000, model_sampling_rate=16000, capacity=4096):
+        self.window_size_samples = window_size(model_sampling_rate)
+        self.resampler = None
+        if sampling_rate != model_sampling_rate:
+            self.resampler = StreamingResampler(sampling_rate, model_sampling_rate)
+        self.buffer = np.empty(max(capacity, self.window_size_samples), dtype=np.float32)
+        self.length = 0
+        self.consumed = 0
+
+    def extend(self, chunk):
+        """
+        Appends a chunk. The windows previously returned by `windows` are overwritten.
+        """
+        if self.consumed:
+            # the remainder, shorter than a window, moves to the front
+            remainder = self.length - self.consumed
+            self.buffer[:remainder] = self.buffer[self.consumed : self.length]
+            self.length, self.consumed = remainder, 0
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            chunk = np.frombuffer(chunk, dtype=np.int16)
+        chunk = chunk.reshape(-1)
+        if self.resampler is not None:
+            if chunk.dtype == np.int16:
+                chunk = chunk * np.float32(1 / 32768)
+            chunk = self.resampler(chunk)
+        end = self.length + len(chunk)
+        if end > len(self.buffer):
+            buffer = np.empty(max(end, 2 * len(self.buffer)), dtype=np.float32)
+            buffer[: self.length] = self.buffer[: self.length]
+            self.buffer = buffer
+        if chunk.dtype == np.int16:
+            np.multiply(
+                chunk, np.float32(1 / 32768), out=self.buffer[self.length : end], dtype=np.float32
+            )
+        else:
+            self.buffer[self.length : end] = chunk
+        self.length = end
+
+    def windows(self):
+        """
+        Returns the complete windows as a (n_windows, window_size_samples) view, valid until the next `extend`.
+        """
+        n_windows = (self.length - self.consumed) // self.window_size_samples
+        start = self.consumed
+        self.consumed += n_windows * self.window_size_samples
+        return self.buffer[start : self.consumed].reshape(n_windows, self.window_size_samples)
+
+    def push(self, chunk):
+        self.extend(chunk)
+        return self.windows()
+
+    def reset(self):
+        self.length = self.consumed = 0
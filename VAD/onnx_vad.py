@@ -0,0 +1,138 @@
+"""
+ONNX Runtime backend of the Silero VAD (`--vad_backend onnx`), loaded from a local `silero_vad.onnx` file (v5) instead of
+`torch.hub`, so that the VAD needs neither network access nor torch.
+The inference sessions are pooled and shared by all the streams, while the recurrent state and audio context of each
+stream are kept outside of the sessions, in the stream's `OnnxVADModel` (or in the slots of `OnnxBatchScorer`).
+"""
+import logging
+import queue
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxSessionPool:
+    """
+    Pool of ONNX Runtime inference sessions of a model, each running with `intra_op_threads` threads.
+    """
+
+    def __init__(self, model_path, pool_size=1, intra_op_threads=1):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("The onnx VAD backend requires onnxruntime: `pip install onnxruntime`")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        self.sessions = queue.Queue()
+        for _ in range(pool_size):
+            self.sessions.put(
+                onnxruntime.InferenceSession(
+                    model_path, sess_options=options, providers=["CPUExecutionProvider"]
+                )
+            )
+        logger.info(
+            f"Loaded {model_path} in {pool_size} ONNX Runtime session(s) of {intra_op_threads} thread(s)"
+        )
+
+    @contextmanager
+    def session(self):
+        session = self.sessions.get()
+        try:
+            yield session
+        finally:
+            self.sessions.put(session)
+
+    def run(self, x, state, sampling_rate):
+        with self.session() as session:
+            out, state = session.run(
+                None,
+                {"input": x, "state": state, "sr": np.array(sampling_rate, dtype=np.int64)},
+            )
+        return out, state
+
+
+def context_size(sampling_rate):
+    return 64 if sampling_rate == 16000 else 32
+
+
+class OnnxVADModel:
+    """
+    Drop-in replacement of the Silero JIT model for `VADIterator`: one instance per stream, holding its recurrent state.
+    Copies (`copy.deepcopy`) share the session pool and start from a fresh state.
+    """
+
+    def __init__(self, pool, sampling_rate=16000):
+        self.pool = pool
+        self.sampling_rate = sampling_rate
+        self.context_size = context_size(sampling_rate)
+        self.reset_states()
+
+    def reset_states(self, batch_size=1):
+        self.state = np.zeros((2, batch_size, 128), dtype=np.float32)
+        self.context = np.zeros((batch_size, self.context_size), dtype=np.float32)
+
+    def __deepcopy__(self, memo):
+        return OnnxVADModel(self.pool, self.sampling_rate)
+
+    def __call__(self, x, sr):
+        """
+        x: float32 window of shape (window_size_samples,) or (batch_size, window_size_samples), NumPy array or tensor
+        Returns the speech probabilities as a (batch_size, 1) NumPy array.
+        """
+        if sr != self.sampling_rate:
+            raise ValueError(f"The model was set up for {self.sampling_rate} Hz, got {sr} Hz")
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[np.newaxis]
+        if x.shape[0] != self.context.shape[0]:
+            self.reset_states(x.shape[0])
+        x = np.concatenate((self.context, x), axis=1)
+        out, self.state = self.pool.run(x, self.state, sr)
+        self.context = x[:, -self.context_size :]
+        return out
+
+
+class OnnxBatchScorer:
+    """
+    Same as `JitBatchScorer`, for the ONNX backend: the states of the streams are passed to the session explicitly.
+    """
+
+    def __init__(self, pool, sampling_rate=16000, capacity=16):
+        self.pool = pool
+        self.sampling_rate = sampling_rate
+        self.context_size = context_size(sampling_rate)
+        self.states = np.zeros((2, capacity, 128), dtype=np.float32)
+        self.contexts = np.zeros((capacity, self.context_size), dtype=np.float32)
+        self.inputs = np.empty(0, dtype=np.float32)
+
+    @property
+    def capacity(self):
+        return self.contexts.shape[0]
+
+    def grow(self, capacity):
+        states = np.zeros((2, capacity, 128), dtype=np.float32)
+        contexts = np.zeros((capacity, self.context_size), dtype=np.float32)
+        states[:, : self.capacity] = self.states
+        contexts[: self.capacity] = self.contexts
+        self.states, self.contexts = states, contexts
+
+    def reset(self, slot):
+        self.states[:, slot] = 0
+        self.contexts[slot] = 0
+
+    def __call__(self, windows, slots):
+        n_streams, window_size = windows.shape
+        size = n_streams * (self.context_size + window_size)
+        if len(self.inputs) < size:
+            self.inputs = np.empty(size, dtype=np.float32)
+        # context and windows are written in a preallocated input buffer
+        x = self.inputs[:size].reshape(n_streams, self.context_size + window_size)
+        x[:, : self.context_size] = self.contexts[slots]
+        x[:, self.context_size :] = windows
+        out, state = self.pool.run(x, self.states[:, slots], self.sampling_rate)
+        self.states[:, slots] = state
+        self.contexts[slots] = x[:, -self.context_size :]
+        return out[:, 0]
@@ -1,12 +1,16 @@
-import torchaudio
+import copy
+
+from VAD.batched_vad import SPEECH_START, BatchedVADIterator, JitBatchScorer
+from VAD.endpointing import AdaptiveEndpointer
+from VAD.framing import AudioFramer, model_sampling_rate
 from VAD.vad_iterator import VADIterator
 from baseHandler import BaseHandler
 import numpy as np
-import torch
 from rich.console import Console
 
-from utils.utils import int2float
-from df.enhance import enhance, init_df
+from utils.metrics import turn_clocks
+from utils.segments import SpeechSegment
+from utils.session import PerSession, current_session
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,8 +22,21 @@ class VADHandler(BaseHandler):
     """
     Handles voice activity detection. When voice activity is detected, audio will be accumulated until the end of speech is detected and then passed
     to the following part.
+    The VAD state is kept per session, so that a single handler can serve every client of a multi-session server.
+    With `vad_batch_size` > 1, up to `vad_batch_size` queued chunks are taken at once and the windows of all the sessions are
+    scored together, see `BatchedVADIterator`.
+    With `partial_segment_ms` > 0, the speech is also sent to the STT in segments cut at the pauses while the user is
+    still speaking, see `SpeechSegment`, so that most of the utterance is transcribed by the end of speech.
+    With `adaptive_endpointing`, the silence ending the speech is set per turn and per speaker by an
+    `AdaptiveEndpointer` instead of being `min_silence_ms`.
+    Clients may send chunks of any size, at any `sample_rate`: the audio is reframed into the windows of the model by an
+    `AudioFramer`, and resampled to 16 kHz unless sent at 8 or 16 kHz. The utterances are sent at the rate of the model.
+    With `audio_enhancement`, the speech is denoised by DeepFilterNet block by block while it is captured, in a
+    separate thread, see `StreamEnhancement`.
     """
 
+    starts_turns = True
+
     def setup(
         self,
         should_listen,
@@ -30,62 +47,207 @@ class VADHandler(BaseHandler):
         max_speech_ms=float("inf"),
         speech_pad_ms=30,
         audio_enhancement=False,
+        enhancement_block_ms=500,
+        barge_in=False,
+        vad_batch_size=1,
+        vad_backend="torch",
+        vad_onnx_model_path=None,
+        vad_onnx_pool_size=1,
+        vad_intra_op_threads=1,
+        partial_segment_ms=0,
+        adaptive_endpointing=False,
+        min_endpoint_ms=200,
+        max_endpoint_ms=2000,
     ):
         self.should_listen = should_listen
-        self.sample_rate = sample_rate
+        self.input_sample_rate = sample_rate
+        # rate of the audio once reframed, and of the utterances
+        self.sample_rate = sample_rate = model_sampling_rate(sample_rate)
         self.min_silence_ms = min_silence_ms
         self.min_speech_ms = min_speech_ms
         self.max_speech_ms = max_speech_ms
-        self.model, _ = torch.hub.load("snakers4/silero-vad", "silero_vad")
-        self.iterator = VADIterator(
-            self.model,
-            threshold=thresh,
-            sampling_rate=sample_rate,
-            min_silence_duration_ms=min_silence_ms,
-            speech_pad_ms=speech_pad_ms,
+        self.thresh = thresh
+        self.speech_pad_ms = speech_pad_ms
+        # the first segment is long enough for the utterance not to be discarded as too short
+        self.partial_segment_ms = max(partial_segment_ms, min_speech_ms) if partial_segment_ms > 0 else 0
+        self.adaptive_endpointing = adaptive_endpointing
+        self.min_endpoint_ms = min_endpoint_ms
+        self.max_endpoint_ms = max_endpoint_ms
+        if vad_backend == "onnx":
+            from VAD.onnx_vad import OnnxBatchScorer, OnnxSessionPool, OnnxVADModel
+
+            if vad_onnx_model_path is None:
+                raise ValueError("The onnx VAD backend requires `--vad_onnx_model_path`")
+            pool = OnnxSessionPool(
+                vad_onnx_model_path, vad_onnx_pool_size, vad_intra_op_threads
+            )
+            self.model = OnnxVADModel(pool, sample_rate)
+            # the onnx model takes the NumPy windows
+            self.model_input = np.asarray
+        elif vad_backend == "torch":
+            # torch is only imported with the torch backend
+            import torch
+
+            self.model, _ = torch.hub.load("snakers4/silero-vad", "silero_vad")
+            # no autograd graph is recorded by the forward passes of the VAD
+            self.model.requires_grad_(False)
+            self.model_input = torch.from_numpy
+        else:
+            raise ValueError(f"The VAD backend should be either torch or onnx, got {vad_backend}")
+        # the Silero model is stateful: each session gets its own copy of it
+        self.iterators = PerSession(self.create_iterator)
+        self.framers = PerSession(
+            lambda: AudioFramer(self.input_sample_rate, self.sample_rate)
         )
+        self.barge_in = barge_in
+        self.batch_size = vad_batch_size
+        if vad_batch_size > 1:
+            # a single model shared by all the sessions, their states are swapped in by the scorer
+            if vad_backend == "onnx":
+                scorer = OnnxBatchScorer(pool, sample_rate)
+            else:
+                scorer = JitBatchScorer(self.model, sample_rate)
+            self.batched_iterator = BatchedVADIterator(
+                scorer,
+                threshold=thresh,
+                sampling_rate=sample_rate,
+                min_silence_duration_ms=min_silence_ms,
+                speech_pad_ms=speech_pad_ms,
+                partial_segment_ms=self.partial_segment_ms,
+                endpointer_factory=self.create_endpointer if adaptive_endpointing else None,
+                input_sampling_rate=self.input_sample_rate,
+            )
         self.audio_enhancement = audio_enhancement
         if audio_enhancement:
-            self.enhanced_model, self.df_state, _ = init_df()
+            from VAD.enhancement import EnhancementWorker, StreamEnhancement
+
+            self.enhancement_worker = EnhancementWorker(sample_rate, enhancement_block_ms)
+            self.enhancements = PerSession(
+                lambda: StreamEnhancement(self.enhancement_worker)
+            )
+
+    def create_iterator(self):
+        return VADIterator(
+            copy.deepcopy(self.model),
+            threshold=self.thresh,
+            sampling_rate=self.sample_rate,
+            min_silence_duration_ms=self.min_silence_ms,
+            speech_pad_ms=self.speech_pad_ms,
+            partial_segment_ms=self.partial_segment_ms,
+            endpointer=self.create_endpointer(current_session()) if self.adaptive_endpointing else None,
+        )
+
+    def create_endpointer(self, session):
+        return AdaptiveEndpointer(
+            sampling_rate=self.sample_rate,
+            threshold=self.thresh,
+            min_silence_ms=self.min_silence_ms,
+            min_endpoint_ms=self.min_endpoint_ms,
+            max_endpoint_ms=self.max_endpoint_ms,
+            session=session,
+        )
+
+    @property
+    def iterator(self):
+        return self.iterators.get()
 
     def process(self, audio_chunk):
-        audio_int16 = np.frombuffer(audio_chunk, dtype=np.int16)
-        audio_float32 = int2float(audio_int16)
-        vad_output = self.iterator(torch.from_numpy(audio_float32))
-        if vad_output is not None and len(vad_output) != 0:
-            logger.debug("VAD: end of speech detected")
-            array = torch.cat(vad_output).cpu().numpy()
-            duration_ms = len(array) / self.sample_rate * 1000
-            if duration_ms < self.min_speech_ms or duration_ms > self.max_speech_ms:
-                logger.debug(
-                    f"audio input of duration: {len(array) / self.sample_rate}s, skipping"
-                )
+        iterator = self.iterator
+        for window in self.framers.get().push(audio_chunk):
+            was_triggered = iterator.triggered
+            vad_output = iterator(self.model_input(window))
+            if not was_triggered and iterator.triggered:
+                self.on_speech_start()
+            if vad_output is not None:
+                yield from self.on_vad_output(vad_output)
+            if self.audio_enhancement and iterator.triggered:
+                self.enhancements.get().update(iterator.buffer)
+
+    def on_vad_output(self, vad_output):
+        if isinstance(vad_output, SpeechSegment):
+            if vad_output.final:
+                yield from self.on_speech_end(vad_output)
             else:
-                self.should_listen.clear()
-                logger.debug("Stop listening")
-                if self.audio_enhancement:
-                    if self.sample_rate != self.df_state.sr():
-                        audio_float32 = torchaudio.functional.resample(
-                            torch.from_numpy(array),
-                            orig_freq=self.sample_rate,
-                            new_freq=self.df_state.sr(),
-                        )
-                        enhanced = enhance(
-                            self.enhanced_model,
-                            self.df_state,
-                            audio_float32.unsqueeze(0),
-                        )
-                        enhanced = torchaudio.functional.resample(
-                            enhanced,
-                            orig_freq=self.df_state.sr(),
-                            new_freq=self.sample_rate,
-                        )
-                    else:
-                        enhanced = enhance(
-                            self.enhanced_model, self.df_state, audio_float32
-                        )
-                    array = enhanced.numpy().squeeze()
-                yield array
+                yield self.on_segment(vad_output)
+        elif len(vad_output) != 0:
+            yield from self.on_speech_end(vad_output)
+
+    def on_speech_start(self):
+        if self.audio_enhancement:
+            self.enhancements.get().reset()
+        if self.barge_in and not self.should_listen.is_set():
+            # the user speaks while the assistant is replying
+            logger.debug("VAD: barge-in")
+            # the utterance being captured starts the new turn
+            self.interruption.interrupt()
+            self.should_listen.set()
+
+    def on_segment(self, segment):
+        logger.debug(f"VAD: partial segment of {len(segment.audio) / self.sample_rate:.2f}s")
+        segment.audio = self.enhance_audio(segment.audio, segment.utterance_samples)
+        return segment
+
+    def on_speech_end(self, array):
+        """
+        array: the audio of the utterance, or its final `SpeechSegment` if partial segments were sent
+        """
+        logger.debug("VAD: end of speech detected")
+        segment = array if isinstance(array, SpeechSegment) else None
+        n_samples = segment.utterance_samples if segment is not None else len(array)
+        duration_ms = n_samples / self.sample_rate * 1000
+        if duration_ms < self.min_speech_ms or duration_ms > self.max_speech_ms:
+            logger.debug(
+                f"audio input of duration: {n_samples / self.sample_rate}s, skipping"
+            )
+            if segment is not None:
+                # the STT drops the partial transcripts
+                yield SpeechSegment(None, final=True)
+            return
+        self.should_listen.clear()
+        logger.debug("Stop listening")
+        turn_clocks.get().start()
+        if segment is not None:
+            if len(segment.audio):
+                segment.audio = self.enhance_audio(segment.audio, segment.utterance_samples)
+            yield segment
+        else:
+            yield self.enhance_audio(array, len(array))
+
+    def enhance_audio(self, array, end):
+        """
+        Returns the enhanced `array`, ending `end` samples after the start of the utterance.
+        """
+        if not self.audio_enhancement:
+            return array
+        return self.enhancements.get().enhanced(array, end)
+
+    def process_batch(self, inputs):
+        for key in list(self.batched_iterator.slots):
+            if key is not None and key.closed:
+                self.batched_iterator.remove(key)
+        # audio of each session, in arrival order
+        streams = {}
+        for session, _, audio_chunk in inputs:
+            streams.setdefault(session, []).append(audio_chunk)
+        for session, events in self.batched_iterator(streams).items():
+            yield session, None, self.process_events(session, events)
+
+    def process_events(self, session, events):
+        """
+        Handles the events of a session returned by the `BatchedVADIterator`.
+        """
+        for event in events:
+            if isinstance(event, str) and event == SPEECH_START:
+                self.on_speech_start()
+                continue
+            yield from self.on_vad_output(event)
+        if self.audio_enhancement and self.batched_iterator.is_triggered(session):
+            slot = self.batched_iterator.slots[session]
+            self.enhancements.get().update(self.batched_iterator.buffers[slot])
+
+    def cleanup(self):
+        if self.audio_enhancement:
+            self.enhancement_worker.stop()
 
     @property
     def min_time_to_debug(self):
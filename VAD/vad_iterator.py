@@ -1,4 +1,7 @@
-import torch
+import numpy as np
+
+from utils.buffers import SpeechBuffer
+from utils.segments import cut_segment, end_utterance
 
 
 class VADIterator:
@@ -9,6 +12,8 @@ class VADIterator:
         sampling_rate: int = 16000,
         min_silence_duration_ms: int = 100,
         speech_pad_ms: int = 30,
+        partial_segment_ms: int = 0,
+        endpointer=None,
     ):
         """
         Mainly taken from https://github.com/snakers4/silero-vad
@@ -30,13 +35,19 @@ class VADIterator:
 
         speech_pad_ms: int (default - 30 milliseconds)
             Final speech chunks are padded by speech_pad_ms each side
+
+        partial_segment_ms: int (default - 0 milliseconds)
+            When positive, the speech is cut into segments at the pauses, once at least partial_segment_ms were spoken
+            since the previous segment, and the segments are returned while the user is still speaking
+
+        endpointer: AdaptiveEndpointer (default - None)
+            When given, sets the silence ending the speech instead of min_silence_duration_ms
         """
 
         self.model = model
         self.threshold = threshold
         self.sampling_rate = sampling_rate
         self.is_speaking = False
-        self.buffer = []
 
         if sampling_rate not in [8000, 16000]:
             raise ValueError(
@@ -45,6 +56,12 @@ class VADIterator:
 
         self.min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
         self.speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+        self.partial_segment_samples = sampling_rate * partial_segment_ms / 1000
+        self.endpointer = endpointer
+        self.buffer = SpeechBuffer(
+            pre_roll_samples=int(self.speech_pad_samples),
+            pad_samples=int(self.speech_pad_samples),
+        )
         self.reset_states()
 
     def reset_states(self):
@@ -53,48 +70,65 @@ class VADIterator:
         self.temp_end = 0
         self.current_sample = 0
 
-    @torch.no_grad()
     def __call__(self, x):
         """
-        x: torch.Tensor
-            audio chunk (see examples in repo)
+        x: float32 audio window, a NumPy array for the onnx model, a torch.Tensor for the torch model
 
-        return_seconds: bool (default - False)
-            whether return timestamps in seconds (default - samples)
+        Returns the float32 audio of the utterance, padded by speech_pad_ms each side, when the end of speech is detected.
+        The array is a view on the speech buffer, handed over without copy.
+        With partial_segment_ms, returns a `SpeechSegment` at the pauses of the speech, and the final `SpeechSegment` at
+        the end of speech if the utterance was cut.
         """
 
-        if not torch.is_tensor(x):
-            try:
-                x = torch.Tensor(x)
-            except Exception:
-                raise TypeError("Audio cannot be casted to tensor. Cast it manually")
-
-        window_size_samples = len(x[0]) if x.dim() == 2 else len(x)
+        window_size_samples = x.shape[-1]
         self.current_sample += window_size_samples
 
         speech_prob = self.model(x, self.sampling_rate).item()
+        # x may be a reused conversion buffer, the speech buffer keeps its own copy
+        samples = np.asarray(x).reshape(-1)
 
         if (speech_prob >= self.threshold) and self.temp_end:
+            if self.endpointer is not None:
+                self.endpointer.resume(self.current_sample - self.temp_end)
             self.temp_end = 0
 
         if (speech_prob >= self.threshold) and not self.triggered:
             self.triggered = True
+            self.buffer.start()
+            self.buffer.append(samples)
             return None
 
         if (speech_prob < self.threshold - 0.15) and self.triggered:
-            if not self.temp_end:
+            pause = not self.temp_end
+            if pause:
                 self.temp_end = self.current_sample
-            if self.current_sample - self.temp_end < self.min_silence_samples:
+            # trailing silence, kept up to speech_pad_ms
+            self.buffer.append(samples, speech=False)
+            if self.endpointer is None:
+                min_silence_samples = self.min_silence_samples
+            else:
+                min_silence_samples = self.endpointer.silence(speech_prob, len(self.buffer))
+            if self.current_sample - self.temp_end < min_silence_samples:
+                if pause and self.cuts_segment():
+                    return cut_segment(self.buffer)
                 return None
             else:
                 # end of speak
+                if self.endpointer is not None:
+                    self.endpointer.end(self.current_sample - self.temp_end)
                 self.temp_end = 0
                 self.triggered = False
-                spoken_utterance = self.buffer
-                self.buffer = []
-                return spoken_utterance
+                return end_utterance(self.buffer)
 
         if self.triggered:
-            self.buffer.append(x)
+            self.buffer.append(samples)
+        else:
+            self.buffer.listen(samples)
 
         return None
+
+    def cuts_segment(self):
+        return (
+            self.partial_segment_samples > 0
+            and len(self.buffer) - self.buffer.segment_start >= self.partial_segment_samples
+        )
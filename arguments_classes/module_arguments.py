@@ -11,7 +11,7 @@ class ModuleArguments:
     mode: Optional[str] = field(
         default="socket",
         metadata={
-            "help": "The mode to run the pipeline in. Either 'local' or 'socket'. Default is 'socket'."
+            "help": "The mode to run the pipeline in. Either 'local', 'socket', 'multi_socket' (several concurrent clients sharing the models) or 'async_socket' (same as 'multi_socket', served from a single asyncio event loop). Default is 'socket'."
         },
     )
     local_mac_optimal_settings: bool = field(
@@ -44,3 +44,33 @@ class ModuleArguments:
             "help": "Provide logging level. Example --log_level debug, default=info."
         },
     )
+    parallel_startup: bool = field(
+        default=True,
+        metadata={
+            "help": "If True, the VAD, STT, LLM and TTS models are loaded concurrently, the warmups of the models sharing "
+            "a device running one at a time. The startup timeline is logged. Default is True."
+        },
+    )
+    compile_cache_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Directory of the torch compile cache. The compiled graphs of the models are saved after their warmup, "
+            "and the warmup is skipped when they are found at the next startup. Default is 'tmp' in the repository."
+        },
+    )
+    compile_cache_max_gb: float = field(
+        default=4,
+        metadata={
+            "help": "Size above which the least recently used entries of the compile cache are pruned. Default is 4 GB."
+        },
+    )
+    metrics_port: int = field(
+        default=0,
+        metadata={
+            "help": "If specified, serves the latency and throughput metrics of the pipeline in the Prometheus text format on http://metrics_host:metrics_port/metrics. Default is 0 (disabled)."
+        },
+    )
+    metrics_host: str = field(
+        default="127.0.0.1",
+        metadata={"help": "The host the metrics endpoint listens on. Default is '127.0.0.1'."},
+    )
@@ -0,0 +1,60 @@
+from dataclasses import dataclass, field
+
+QUEUE_POLICY_HELP = "What to do when the queue is full: 'block' the producer, 'drop_oldest' queued item or 'drop_newest' item."
+
+
+@dataclass
+class QueueArguments:
+    recv_audio_chunks_queue_size: int = field(
+        default=512,
+        metadata={
+            "help": "Maximum number of received audio chunks waiting for the VAD, 0 for unbounded. The receive buffers are "
+            "sized from it, see `--recv_buffer_slots`. Default is 512."
+        },
+    )
+    recv_audio_chunks_queue_policy: str = field(
+        default="drop_oldest",
+        metadata={
+            "help": f"{QUEUE_POLICY_HELP} 'block' is not supported by the async_socket mode. Default is 'drop_oldest'."
+        },
+    )
+    spoken_prompt_queue_size: int = field(
+        default=8,
+        metadata={
+            "help": "Maximum number of utterances waiting for the STT, 0 for unbounded. Default is 8."
+        },
+    )
+    spoken_prompt_queue_policy: str = field(
+        default="block",
+        metadata={"help": f"{QUEUE_POLICY_HELP} Default is 'block'."},
+    )
+    text_prompt_queue_size: int = field(
+        default=8,
+        metadata={
+            "help": "Maximum number of transcripts waiting for the LLM, 0 for unbounded. Default is 8."
+        },
+    )
+    text_prompt_queue_policy: str = field(
+        default="block",
+        metadata={"help": f"{QUEUE_POLICY_HELP} Default is 'block'."},
+    )
+    lm_response_queue_size: int = field(
+        default=32,
+        metadata={
+            "help": "Maximum number of sentences waiting for the TTS, 0 for unbounded. Default is 32."
+        },
+    )
+    lm_response_queue_policy: str = field(
+        default="block",
+        metadata={"help": f"{QUEUE_POLICY_HELP} Default is 'block'."},
+    )
+    send_audio_chunks_queue_size: int = field(
+        default=512,
+        metadata={
+            "help": "Maximum number of generated audio chunks waiting to be sent or played, 0 for unbounded. Default is 512."
+        },
+    )
+    send_audio_chunks_queue_policy: str = field(
+        default="block",
+        metadata={"help": f"{QUEUE_POLICY_HELP} Default is 'block'."},
+    )
@@ -0,0 +1,12 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SessionServerArguments:
+    max_sessions: int = field(
+        default=32,
+        metadata={
+            "help": "Maximum number of concurrent client sessions served by the multi-session servers (`--mode multi_socket` or `--mode async_socket`). "
+            "Clients connect to `recv_host`:`recv_port` with a single bidirectional connection. Default is 32."
+        },
+    )
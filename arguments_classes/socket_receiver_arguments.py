@@ -1,4 +1,5 @@
 from dataclasses import dataclass, field
+from typing import Optional
 
 
 @dataclass
@@ -19,6 +20,33 @@ class SocketReceiverArguments:
     chunk_size: int = field(
         default=1024,
         metadata={
-            "help": "The size of each data chunk to be sent or received over the socket. Default is 1024 bytes."
+            "help": "The size of each data chunk to be sent or received over the socket. Any size works, the VAD reframes "
+            "the audio into the windows of its model: larger chunks mean fewer network packets. Default is 1024 bytes."
+        },
+    )
+    recv_buffer_slots: Optional[int] = field(
+        default=None,
+        metadata={
+            "help": "Maximum number of receive buffers reused in a ring, a buffer being reused once the VAD is done with its "
+            "chunk. When the VAD lags further behind, chunks are received in new buffers. Buffers are only allocated as "
+            "the VAD lags. Default is None: as many as the chunks the recv_audio_chunks_queue and the VAD can hold, 64 "
+            "if the queue is unbounded."
+        },
+    )
+    protocol: str = field(
+        default="raw",
+        metadata={
+            "help": "Wire protocol of every socket mode. Either 'raw' (int16 PCM, end of stream signalled by b'END') or 'framed' "
+            "(length-prefixed frames carrying sequence numbers, capture timestamps and control messages, see connections/protocol.py). "
+            "The client must use the same protocol. Default is 'raw'."
+        },
+    )
+    max_audio_lag_ms: int = field(
+        default=1000,
+        metadata={
+            "help": "With the framed protocol, audio frames received more than max_audio_lag_ms later than the fastest "
+            "frame of their stream are dropped instead of being passed late to the VAD, as when the server falls behind "
+            "the client. The lag is measured on the capture timestamps, independently of the clock of the client. "
+            "0 keeps every frame. Default is 1000 ms."
         },
     )
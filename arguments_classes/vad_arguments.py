@@ -1,4 +1,5 @@
 from dataclasses import dataclass, field
+from typing import Optional
 
 
 @dataclass
@@ -12,7 +13,8 @@ class VADHandlerArguments:
     sample_rate: int = field(
         default=16000,
         metadata={
-            "help": "The sample rate of the audio in Hertz. Default is 16000 Hz, which is a common setting for voice audio."
+            "help": "The sample rate of the audio in Hertz. Default is 16000 Hz, which is a common setting for voice audio. "
+            "Audio sent at other rates than 8000 and 16000 Hz is resampled to 16000 Hz."
         },
     )
     min_silence_ms: int = field(
@@ -45,3 +47,80 @@ class VADHandlerArguments:
             "help": "improves sound quality by applying techniques like noise reduction, equalization, and echo cancellation. Default is False."
         },
     )
+    enhancement_block_ms: int = field(
+        default=500,
+        metadata={
+            "help": "With audio enhancement, the speech is enhanced in blocks of this many milliseconds while the user speaks, "
+            "in a separate thread, so that only the last block is left to enhance at the end of speech. Default is 500 ms."
+        },
+    )
+    barge_in: bool = field(
+        default=False,
+        metadata={
+            "help": "Keep running the VAD while the assistant replies: when the user starts speaking, the language model and TTS "
+            "generations are cancelled, the queued audio is flushed and a new turn starts. Socket modes only, the client should "
+            "run with `--barge_in` (and headphones) and `--protocol framed` to drop the audio it already buffered. Default is False."
+        },
+    )
+    vad_batch_size: int = field(
+        default=1,
+        metadata={
+            "help": "Maximum number of queued audio chunks processed at once. Above 1, the windows of all the sessions are scored "
+            "in shared forward passes of a single VAD model, which lowers the CPU cost per stream when serving many clients "
+            "(`--mode multi_socket` or `async_socket`). Requires the Silero VAD v5 model. Default is 1."
+        },
+    )
+    vad_backend: str = field(
+        default="torch",
+        metadata={
+            "help": "Backend running the Silero VAD. Either 'torch' (JIT model from torch.hub, downloaded on first start) or "
+            "'onnx' (ONNX Runtime, from the local model file given by `--vad_onnx_model_path`). Default is 'torch'."
+        },
+    )
+    vad_onnx_model_path: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Path of the Silero VAD v5 ONNX model (silero_vad.onnx) used by the onnx backend. Default is None."
+        },
+    )
+    vad_onnx_pool_size: int = field(
+        default=1,
+        metadata={
+            "help": "Number of ONNX Runtime inference sessions shared by the streams of the onnx backend. Default is 1."
+        },
+    )
+    vad_intra_op_threads: int = field(
+        default=1,
+        metadata={
+            "help": "Number of threads used by each ONNX Runtime inference session of the onnx backend. Default is 1."
+        },
+    )
+    partial_segment_ms: int = field(
+        default=0,
+        metadata={
+            "help": "Transcribe the speech progressively: the audio is sent to the STT in segments cut at the pauses of the "
+            "speech, each holding at least this many milliseconds (and at least `min_speech_ms`), and only the speech after "
+            "the last pause is left to transcribe at the end of speech. 0 disables it. Default is 0."
+        },
+    )
+    adaptive_endpointing: bool = field(
+        default=False,
+        metadata={
+            "help": "Adapt the silence ending the speech to each turn and speaker instead of always waiting `min_silence_ms`: "
+            "it shrinks when the turn is confidently complete (clean silence, short answer, transcript ending a sentence "
+            "with `--partial_segment_ms`) and grows for hesitant speakers. The latency saved is logged at debug level. "
+            "Default is False."
+        },
+    )
+    min_endpoint_ms: int = field(
+        default=200,
+        metadata={
+            "help": "Shortest silence ending the speech with adaptive endpointing. Measured in milliseconds. Default is 200 ms."
+        },
+    )
+    max_endpoint_ms: int = field(
+        default=2000,
+        metadata={
+            "help": "Longest silence ending the speech with adaptive endpointing. Measured in milliseconds. Default is 2000 ms."
+        },
+    )
@@ -28,6 +28,43 @@ class WhisperSTTHandlerArguments:
             "help": "Compile mode for torch compile. Either 'default', 'reduce-overhead' and 'max-autotune'. Default is None (no compilation)"
         },
     )
+    stt_batch_size: int = field(
+        default=1,
+        metadata={
+            "help": "Maximum number of utterances transcribed together. Above 1, the utterances of concurrent sessions "
+            "(`--mode multi_socket` or `async_socket`) are batched in a single generate. Not supported by whisper-mlx. "
+            "Default is 1."
+        },
+    )
+    stt_batch_wait_ms: int = field(
+        default=20,
+        metadata={
+            "help": "Longest time waited for more utterances to batch with the first one. Measured in milliseconds. "
+            "Default is 20 ms."
+        },
+    )
+    stt_quantization: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Quantization of the model. 'int8' quantizes the linear layers of the model to int8 (dynamic "
+            "quantization) and runs it on CPU, for nodes without GPU. The quantized model is cached on disk. Not "
+            "supported by whisper-mlx. Default is None (no quantization)."
+        },
+    )
+    stt_quantization_cache_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Directory of the quantized models cached by `--stt_quantization`. Default is 'tmp/quantized' in "
+            "the repository."
+        },
+    )
+    stt_cpu_threads: Optional[int] = field(
+        default=None,
+        metadata={
+            "help": "Number of torch threads when the model runs on CPU. This setting is global to the process. "
+            "Default is None (the number of physical cores)."
+        },
+    )
     stt_gen_max_new_tokens: int = field(
         default=128,
         metadata={
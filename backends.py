@@ -0,0 +1,167 @@
+"""
+Registry of the STT, LLM and TTS backends of the pipeline (`--stt`, `--llm` and `--tts`).
+A backend names its handler class and its arguments class as "module:attribute" paths, imported only once the backend
+is selected: the pipeline only imports the heavy dependencies (torch, transformers, nltk, ...) of the backends it runs,
+and only parses their arguments.
+Backends of other packages are registered with an entry point of the `speech_to_speech.backends` group, named
+"<kind>.<name>" (e.g. "tts.my-tts") and pointing to a `Backend`.
+"""
+import importlib
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from utils.startup import startup_timeline
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "speech_to_speech.backends"
+KINDS = ("stt", "llm", "tts")
+
+
+def import_object(path):
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+@dataclass(frozen=True)
+class Backend:
+    kind: str
+    name: str
+    # "module:class" path of the handler
+    handler: str
+    # "module:class" path of the arguments dataclass, None if the handler takes no arguments
+    arguments: Optional[str] = None
+    # prefix of the arguments, removed by `rename_args`
+    prefix: Optional[str] = None
+    # logged when the handler cannot be imported
+    import_error_hint: Optional[str] = None
+
+    def arguments_class(self):
+        return import_object(self.arguments) if self.arguments is not None else None
+
+    def handler_class(self):
+        name = self.handler.partition(":")[2]
+        with startup_timeline.phase(name, "import"):
+            try:
+                return import_object(self.handler)
+            except Exception:
+                if self.import_error_hint:
+                    logger.error(f"Error importing {name}. {self.import_error_hint}")
+                raise
+
+
+BACKENDS = {kind: {} for kind in KINDS}
+
+
+def register(backend):
+    BACKENDS[backend.kind][backend.name] = backend
+    return backend
+
+
+for backend in (
+    Backend(
+        "stt",
+        "whisper",
+        "STT.whisper_stt_handler:WhisperSTTHandler",
+        "arguments_classes.whisper_stt_arguments:WhisperSTTHandlerArguments",
+        "stt",
+    ),
+    Backend(
+        "stt",
+        "whisper-mlx",
+        "STT.lightning_whisper_mlx_handler:LightningWhisperSTTHandler",
+        "arguments_classes.whisper_stt_arguments:WhisperSTTHandlerArguments",
+        "stt",
+    ),
+    Backend(
+        "stt",
+        "paraformer",
+        "STT.paraformer_handler:ParaformerSTTHandler",
+        "arguments_classes.paraformer_stt_arguments:ParaformerSTTHandlerArguments",
+        "paraformer_stt",
+    ),
+    Backend(
+        "stt",
+        "faster-whisper",
+        "STT.faster_whisper_handler:FasterWhisperSTTHandler",
+        "arguments_classes.faster_whisper_stt_arguments:FasterWhisperSTTHandlerArguments",
+        "faster_whisper_stt",
+    ),
+    Backend("stt", "moonshine", "STT.moonshine_handler:MoonshineSTTHandler"),
+    Backend(
+        "llm",
+        "transformers",
+        "LLM.language_model:LanguageModelHandler",
+        "arguments_classes.language_model_arguments:LanguageModelHandlerArguments",
+        "lm",
+    ),
+    Backend(
+        "llm",
+        "open_api",
+        "LLM.openai_api_language_model:OpenApiModelHandler",
+        "arguments_classes.open_api_language_model_arguments:OpenApiLanguageModelHandlerArguments",
+        "open_api",
+    ),
+    Backend(
+        "llm",
+        "mlx-lm",
+        "LLM.mlx_language_model:MLXLanguageModelHandler",
+        "arguments_classes.mlx_language_model_arguments:MLXLanguageModelHandlerArguments",
+        "mlx_lm",
+    ),
+    Backend(
+        "tts",
+        "parler",
+        "TTS.parler_handler:ParlerTTSHandler",
+        "arguments_classes.parler_tts_arguments:ParlerTTSHandlerArguments",
+        "tts",
+    ),
+    Backend(
+        "tts",
+        "melo",
+        "TTS.melo_handler:MeloTTSHandler",
+        "arguments_classes.melo_tts_arguments:MeloTTSHandlerArguments",
+        "melo",
+        import_error_hint="You might need to run: python -m unidic download",
+    ),
+    Backend(
+        "tts",
+        "chatTTS",
+        "TTS.chatTTS_handler:ChatTTSHandler",
+        "arguments_classes.chat_tts_arguments:ChatTTSHandlerArguments",
+        "chat_tts",
+    ),
+    Backend(
+        "tts",
+        "facebookMMS",
+        "TTS.facebookmms_handler:FacebookMMSTTSHandler",
+        "arguments_classes.facebookmms_tts_arguments:FacebookMMSTTSHandlerArguments",
+        "facebook_mms",
+    ),
+):
+    register(backend)
+
+
+def entry_point_backend(kind, name):
+    from importlib.metadata import entry_points
+
+    found = entry_points()
+    if hasattr(found, "select"):
+        found = found.select(group=ENTRY_POINT_GROUP)
+    else:
+        found = found.get(ENTRY_POINT_GROUP, [])
+    for entry_point in found:
+        if entry_point.name == f"{kind}.{name}":
+            return register(entry_point.load())
+    return None
+
+
+def get_backend(kind, name):
+    """
+    Returns the `kind` backend called `name`, looked up in the entry points if not built in.
+    """
+    backend = BACKENDS[kind].get(name) or entry_point_backend(kind, name)
+    if backend is None:
+        raise ValueError(f"The {kind.upper()} should be one of {', '.join(BACKENDS[kind])}, not {name!r}.")
+    return backend
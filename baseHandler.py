@@ -1,6 +1,13 @@
+from queue import Empty
 from time import perf_counter
 import logging
 
+from utils.interruption import CancellationToken, Interruption
+from utils.metrics import HandlerMetrics, turn_clocks
+from utils.session import PerSession, SessionMessage, set_current_session
+from utils.startup import scheduled_warmup, startup_timeline
+from utils.stats import StreamingStats
+
 logger = logging.getLogger(__name__)
 
 
@@ -11,14 +18,49 @@ class BaseHandler:
     To stop a handler properly, set the stop_event and, to avoid queue deadlocks, place b"END" in the input queue.
     Objects placed in the input queue will be processed by the `process` method, and the yielded results will be placed in the output queue.
     The cleanup method handles stopping the handler, and b"END" is placed in the output queue.
+    In multi-session mode, inputs are wrapped in a `SessionMessage`: the payload is processed with the session set as current,
+    and the outputs are wrapped with the same session and turn.
+    `interruptions` holds the barge-in state shared by the handlers of the pipeline, see `interruption`.
+    Each input is processed with a `cancel_token`: once the turn is interrupted or the pipeline stops, the `process`
+    generator is closed, its pending outputs are dropped, and queued inputs of the cancelled turn are skipped.
+    Handlers generating the audio of the reply set `produces_audio` so that the time to first audio of each turn is measured.
+    The handler starting the turns (the VAD) sets `starts_turns`: it is never cancelled, and its outputs belong to the turn
+    in progress when they are yielded.
+    Handlers setting `batch_size` > 1 take up to `batch_size` inputs at once, the ones queued within `batch_wait_ms` of the
+    first, and process them together in `process_batch`.
+    The time taken to yield each output is kept in `times`, a fixed-memory `StreamingStats` summarized when the handler stops.
+    Handlers may be set up concurrently: the `warmup` methods of the subclasses run one at a time per `device`, and the
+    setup and warmup are recorded in the startup timeline, see `utils.startup`.
     """
 
-    def __init__(self, stop_event, queue_in, queue_out, setup_args=(), setup_kwargs={}):
+    produces_audio = False
+    starts_turns = False
+    batch_size = 1
+    batch_wait_ms = 0
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "warmup" in cls.__dict__:
+            cls.warmup = scheduled_warmup(cls.__dict__["warmup"])
+
+    def __init__(
+        self,
+        stop_event,
+        queue_in,
+        queue_out,
+        setup_args=(),
+        setup_kwargs={},
+        interruptions=None,
+    ):
         self.stop_event = stop_event
         self.queue_in = queue_in
         self.queue_out = queue_out
-        self.setup(*setup_args, **setup_kwargs)
-        self._times = []
+        self.interruptions = interruptions or PerSession(Interruption)
+        self.cancel_token = None
+        self.metrics = HandlerMetrics(self.__class__.__name__)
+        with startup_timeline.phase(self.__class__.__name__, "setup"):
+            self.setup(*setup_args, **setup_kwargs)
+        self.times = StreamingStats()
 
     def setup(self):
         pass
@@ -27,27 +69,148 @@ class BaseHandler:
         raise NotImplementedError
 
     def run(self):
+        if self.batch_size > 1:
+            self.run_batches()
+            return
         while not self.stop_event.is_set():
-            input = self.queue_in.get()
+            input = self.get_input()
             if isinstance(input, bytes) and input == b"END":
                 # sentinelle signal to avoid queue deadlock
                 logger.debug("Stopping thread")
                 break
-            start_time = perf_counter()
-            for output in self.process(input):
-                self._times.append(perf_counter() - start_time)
+            input = self.unwrap(input)
+            if input is None:
+                continue
+            session, turn, input = input
+            self.put_outputs([(session, turn, self.process(input))])
+
+        self.stop()
+
+    def run_batches(self):
+        """
+        Processes up to `batch_size` inputs at once with `process_batch`: the first input queued, and the ones queued
+        within `batch_wait_ms` of it.
+        """
+        stopping = False
+        while not self.stop_event.is_set() and not stopping:
+            inputs = []
+            input = self.get_input()
+            deadline = perf_counter() + self.batch_wait_ms / 1000
+            while True:
+                if isinstance(input, bytes) and input == b"END":
+                    stopping = True
+                    break
+                input = self.unwrap(input)
+                if input is not None:
+                    inputs.append(input)
+                if len(inputs) >= self.batch_size:
+                    break
+                timeout = deadline - perf_counter()
+                try:
+                    input = self.get_input(timeout=timeout) if timeout > 0 else self.queue_in.get_nowait()
+                except Empty:
+                    break
+            if inputs:
+                self.put_outputs(self.process_batch(inputs))
+
+        self.stop()
+
+    def get_input(self, timeout=None):
+        input = self.queue_in.get(timeout=timeout)
+        queue_wait = getattr(self.queue_in, "last_wait", None)
+        if queue_wait is not None:
+            self.metrics.queue_wait_seconds.observe(queue_wait)
+        return input
+
+    def unwrap(self, input):
+        """
+        Returns the (session, turn, payload) of a queued input, the session being set as current, or None if the input
+        is skipped: its session is closed or its turn cancelled.
+        """
+        self.metrics.items_in.inc()
+        session, turn = None, None
+        if isinstance(input, SessionMessage):
+            session, turn, input = input.session, input.turn, input.payload
+            if session.closed:
+                return None
+        set_current_session(session)
+        if not self.starts_turns and CancellationToken(self.interruption, self.stop_event, turn).cancelled:
+            logger.debug(f"{self.__class__.__name__}: skipping an input of a cancelled turn")
+            return None
+        return session, turn, input
+
+    def process_batch(self, inputs):
+        """
+        Processes the (session, turn, payload) `inputs` of a batch. Yields the (session, turn, outputs) of each input,
+        `outputs` being iterated with the session set as current and the `cancel_token` of the turn.
+        """
+        raise NotImplementedError
+
+    def put_outputs(self, processed):
+        """
+        Places the outputs of the `processed` (session, turn, outputs) inputs in the output queue, tagged with their
+        session and turn, measuring the time taken to yield each, and the time from the start of the batch to the first
+        output of each input. Once a turn is cancelled, its outputs are dropped and their generator is closed.
+        """
+        start_time = input_time = perf_counter()
+        for session, turn, outputs in processed:
+            set_current_session(session)
+            self.cancel_token = CancellationToken(self.interruption, self.stop_event, turn)
+            first = True
+            for output in outputs:
+                self.times.add(perf_counter() - start_time)
+                self.metrics.process_seconds.observe(self.last_time)
+                if first:
+                    self.metrics.first_output_seconds.observe(perf_counter() - input_time)
+                    first = False
                 if self.last_time > self.min_time_to_debug:
                     logger.debug(f"{self.__class__.__name__}: {self.last_time: .3f} s")
+                if self.starts_turns:
+                    # the output belongs to the turn in progress, which a barge-in of the user may just have started
+                    generation = self.interruption.generation
+                elif self.cancel_token.cancelled:
+                    outputs.close()
+                    break
+                else:
+                    generation = self.cancel_token.generation
+                if session is not None:
+                    output = SessionMessage(session, output, generation)
                 self.queue_out.put(output)
+                self.metrics.items_out.inc()
+                if self.produces_audio:
+                    turn_clocks.get().first_audio()
                 start_time = perf_counter()
+            if self.cancel_token.cancelled and not self.starts_turns:
+                self.log_cancellation()
 
+    def stop(self):
+        logger.info(f"{self.__class__.__name__} process times: {self.times}")
         self.cleanup()
         self.queue_out.put(b"END")
 
+    def log_cancellation(self):
+        latency = self.cancel_token.latency
+        if latency is not None:
+            logger.debug(f"{self.__class__.__name__}: turn cancelled {latency:.3f} s after the interruption")
+
+    @property
+    def interruption(self):
+        """
+        Barge-in state of the conversation being processed.
+        """
+        return self.interruptions.get()
+
     @property
     def last_time(self):
-        return self._times[-1]
-    
+        return self.times.last
+
+    @property
+    def percentiles(self):
+        """
+        p50, p95 and p99 of the time taken to yield each output, in seconds.
+        """
+        return self.times.percentiles()
+
     @property
     def min_time_to_debug(self):
         return 0.001
@@ -0,0 +1,99 @@
+"""
+Measures the imports of the pipeline for a configuration: the arguments parsing and the modules of the VAD and of the
+selected backends are imported in a fresh interpreter with `-X importtime`. Reports the total import time, the
+slowest packages and the heavy packages imported, and fails when the total exceeds `--budget_s`.
+The arguments not recognized are those of the pipeline:
+
+    python benchmark_imports.py --budget_s 8 --stt faster-whisper --llm open_api --tts melo
+"""
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from transformers import HfArgumentParser
+
+HEAVY_PACKAGES = (
+    "torch",
+    "torchaudio",
+    "transformers",
+    "nltk",
+    "gradio",
+    "librosa",
+    "numba",
+    "scipy",
+    "openai",
+    "parler_tts",
+    "melo",
+    "ChatTTS",
+    "funasr",
+    "faster_whisper",
+    "df",
+    "mlx",
+)
+
+IMPORT_PIPELINE = """
+import sys
+sys.argv = ["s2s_pipeline.py", *{argv!r}]
+import s2s_pipeline
+from backends import KINDS, get_backend
+module_kwargs = s2s_pipeline.parse_arguments()[0]
+for kind in KINDS:
+    get_backend(kind, getattr(module_kwargs, kind)).handler_class()
+import VAD.vad_handler
+"""
+
+
+@dataclass
+class BenchmarkImportsArguments:
+    budget_s: Optional[float] = field(
+        default=None,
+        metadata={"help": "Longest total import time accepted, in seconds. Default is None (no budget)."},
+    )
+    top: int = field(default=15, metadata={"help": "Number of slowest packages reported. Default is 15."})
+
+
+def import_times(pipeline_argv):
+    """
+    Returns the (self, cumulative, module) import times in seconds of the pipeline for `pipeline_argv`, in import order.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_PIPELINE.format(argv=pipeline_argv)],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing the pipeline failed:\n{result.stderr[-2000:]}")
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        times.append((int(self_us) / 1e6, int(cumulative_us) / 1e6, module.rstrip()))
+    return times
+
+
+def main(args, pipeline_argv):
+    times = import_times(pipeline_argv)
+    # modules imported at the top level, their cumulative times add up to the total
+    total = sum(cumulative for _, cumulative, module in times if not module.startswith("  "))
+    package_times = defaultdict(float)
+    for self_time, _, module in times:
+        package_times[module.strip().split(".")[0]] += self_time
+    print(f"imports of `{' '.join(pipeline_argv) or 'default configuration'}`: {total:.2f} s, {len(times)} modules")
+    for package, self_time in sorted(package_times.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {package:<24} {self_time:7.3f} s")
+    heavy = [package for package in HEAVY_PACKAGES if package in package_times]
+    print(f"heavy packages imported: {', '.join(heavy) or 'none'}")
+    if args.budget_s is not None:
+        if total > args.budget_s:
+            print(f"over the budget of {args.budget_s:.2f} s")
+            sys.exit(1)
+        print(f"within the budget of {args.budget_s:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = HfArgumentParser((BenchmarkImportsArguments,))
+    args, pipeline_argv = parser.parse_args_into_dataclasses(return_remaining_strings=True)
+    main(args, pipeline_argv)
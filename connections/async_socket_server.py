@@ -0,0 +1,225 @@
+import asyncio
+import threading
+from rich.console import Console
+import logging
+
+from connections.codecs import CodecPool
+from connections.protocol import (
+    CLIENT_ERRORS,
+    FrameType,
+    FrameWriter,
+    StreamState,
+    encode_audio_frames,
+    handle_client_frame,
+    read_frame,
+)
+from utils.session import Session, SessionQueue
+
+logger = logging.getLogger(__name__)
+
+console = Console()
+
+
+class AsyncSocketServer:
+    """
+    Asyncio replacement of the SocketReceiver/SocketSender pair, serving many concurrent clients from a single event loop.
+    As with the SessionServer, each client uses one bidirectional connection and gets its own session. Incoming chunks are read
+    with `StreamReader.readexactly`, and the generated audio is written with `drain()` so that a slow client only
+    slows down its own writer. Idle or slow connections cost no thread: the event loop thread serves all the clients, and a
+    single helper thread bridges the blocking pipeline queue into the loop.
+    """
+
+    def __init__(
+        self,
+        stop_event,
+        queue_in,
+        queue_out,
+        host="0.0.0.0",
+        port=12345,
+        chunk_size=1024,
+        max_sessions=1024,
+        max_send_queue_size=256,
+        protocol="raw",
+        max_audio_lag_ms=1000,
+        codec_workers=2,
+        barge_in=False,
+    ):
+        if getattr(queue_out, "policy", None) == "block" and queue_out.maxsize > 0:
+            # the chunks are queued from the event loop, which must never wait for the VAD
+            raise ValueError(
+                "The async_socket mode requires a 'drop_oldest' or 'drop_newest' policy for a bounded "
+                "recv_audio_chunks_queue, not 'block'"
+            )
+        self.stop_event = stop_event
+        self.queue_in = queue_in
+        self.queue_out = queue_out
+        self.host = host
+        self.port = port
+        self.chunk_size = chunk_size
+        self.max_sessions = max_sessions
+        self.max_send_queue_size = max_send_queue_size
+        self.protocol = protocol
+        self.max_audio_lag_ms = max_audio_lag_ms
+        self.barge_in = barge_in
+        # codecs run on worker threads rather than on the event loop shared by every session
+        self.codec_pool = CodecPool(codec_workers)
+        self.sessions = {}
+        self.send_queues = {}
+        self.client_tasks = set()
+
+    async def receive(self, session, reader):
+        try:
+            await self.receive_chunks(session, reader)
+        except CLIENT_ERRORS as e:
+            logger.warning(f"{session}: {e!r}, closing the session")
+        finally:
+            session.close()
+
+    async def receive_chunks(self, session, reader):
+        loop = asyncio.get_running_loop()
+        executor = self.codec_pool.executor(session.session_id)
+        state = session.stream_state
+        session_queue = SessionQueue(self.queue_out, session)
+        while not session.closed:
+            if self.protocol == "framed":
+                frame = await read_frame(reader)
+                decoded = None
+                if frame is not None and frame.frame_type == FrameType.AUDIO:
+                    decoded = await loop.run_in_executor(
+                        executor, state.codec.decode, frame.payload
+                    )
+                if not handle_client_frame(
+                    frame,
+                    state,
+                    session.should_listen,
+                    session_queue.put,
+                    decoded,
+                    barge_in=self.barge_in,
+                ):
+                    break
+                continue
+
+            try:
+                audio_chunk = await reader.readexactly(self.chunk_size)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                # connection closed
+                break
+            if session.should_listen.is_set() or self.barge_in:
+                session_queue.put(audio_chunk)
+
+    async def send(self, session, writer):
+        loop = asyncio.get_running_loop()
+        executor = self.codec_pool.executor(session.session_id)
+        state = session.stream_state
+        send_queue = self.send_queues[session.session_id]
+        frame_writer = FrameWriter()
+        while True:
+            audio_chunk = await send_queue.get()
+            if isinstance(audio_chunk, bytes) and audio_chunk == b"END":
+                if self.protocol == "framed":
+                    writer.write(frame_writer.encode(FrameType.STOP))
+                break
+            if isinstance(audio_chunk, bytes) and audio_chunk == b"INTERRUPT":
+                if self.protocol == "framed":
+                    writer.write(frame_writer.encode(FrameType.INTERRUPT))
+                continue
+            if self.protocol == "framed":
+                packets = await loop.run_in_executor(
+                    executor, state.codec.encode, audio_chunk
+                )
+                writer.write(
+                    encode_audio_frames(frame_writer, state, audio_chunk, packets)
+                )
+                state.stats.update(send_queue.qsize())
+            else:
+                writer.write(memoryview(audio_chunk).cast("B"))
+            try:
+                # backpressure: wait for the client to consume what was already written
+                await writer.drain()
+            except ConnectionError:
+                break
+
+    async def handle_client(self, reader, writer):
+        address = writer.get_extra_info("peername")
+        if len(self.sessions) >= self.max_sessions:
+            logger.warning(f"Rejecting {address}: {self.max_sessions} sessions already active")
+            writer.close()
+            return
+        session = Session(address)
+        session.stream_state = StreamState(str(session), self.max_audio_lag_ms)
+        self.client_tasks.add(asyncio.current_task())
+        self.sessions[session.session_id] = session
+        self.send_queues[session.session_id] = asyncio.Queue()
+        logger.info(f"{session} connected, {len(self.sessions)} active session(s)")
+        if self.protocol == "raw":
+            # framed clients start the stream with a START frame
+            session.should_listen.set()
+
+        receive_task = asyncio.create_task(self.receive(session, reader))
+        send_task = asyncio.create_task(self.send(session, writer))
+        await asyncio.wait((receive_task, send_task), return_when=asyncio.FIRST_COMPLETED)
+        receive_task.cancel()
+        send_task.cancel()
+        for result in await asyncio.gather(receive_task, send_task, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"{session} failed: {result!r}")
+
+        session.close()
+        del self.sessions[session.session_id]
+        del self.send_queues[session.session_id]
+        writer.close()
+        self.client_tasks.discard(asyncio.current_task())
+        logger.info(f"{session} closed, {len(self.sessions)} active session(s)")
+
+    def dispatch(self, message):
+        """
+        Routes a tagged output to its session. Runs on the event loop.
+        """
+        send_queue = self.send_queues.get(message.session.session_id)
+        if send_queue is None:
+            return
+        if isinstance(message.payload, bytes) and message.payload == b"INTERRUPT":
+            # the user barged in, drop the audio waiting to be sent
+            while not send_queue.empty():
+                send_queue.get_nowait()
+        elif send_queue.qsize() >= self.max_send_queue_size:
+            # the client does not keep up, drop the oldest chunk rather than stalling every session
+            send_queue.get_nowait()
+            logger.warning(f"{message.session} is too slow, dropping audio")
+        send_queue.put_nowait(message.payload)
+
+    def route(self, loop, done):
+        """
+        Bridges the blocking pipeline queue into the event loop. Runs on its own daemon thread.
+        """
+        while not self.stop_event.is_set():
+            message = self.queue_in.get()
+            if isinstance(message, bytes) and message == b"END":
+                break
+            loop.call_soon_threadsafe(self.dispatch, message)
+        loop.call_soon_threadsafe(done.set)
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        done = asyncio.Event()
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        logger.info(f"Async socket server listening on {self.host}:{self.port}")
+        threading.Thread(target=self.route, args=(loop, done), daemon=True).start()
+        stop_waiter = loop.run_in_executor(None, self.stop_event.wait)
+        await asyncio.wait(
+            (asyncio.create_task(done.wait()), stop_waiter),
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        # unblock the stop waiter when the pipeline ended first
+        self.stop_event.set()
+
+        server.close()
+        for send_queue in self.send_queues.values():
+            send_queue.put_nowait(b"END")
+        await asyncio.gather(*self.client_tasks, return_exceptions=True)
+        await server.wait_closed()
+
+    def run(self):
+        asyncio.run(self.serve())
+        self.codec_pool.shutdown()
+        logger.info("Async socket server closed")
@@ -0,0 +1,166 @@
+"""
+Audio codecs of the client links, used on top of the framed protocol (`--protocol framed`).
+The client picks the codec with `listen_and_play.py --codec` and announces it in its CONFIG frame, the server then encodes
+and decodes the audio of that client with the same codec. The payload of each AUDIO frame is one encoded packet.
+
+- `pcm`: raw int16, 256 kbps at 16 kHz.
+- `flac`: lossless, requires `soundfile`. Each packet is a self-contained FLAC stream, which adds a small header per chunk.
+- `opus`: lossy, requires `opuslib` and libopus. Audio is re-framed into 20 ms Opus frames.
+"""
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PCMCodec:
+    name = "pcm"
+
+    def __init__(self, sample_rate=16000):
+        self.sample_rate = sample_rate
+
+    def encode(self, audio_chunk):
+        return [memoryview(audio_chunk).cast("B")]
+
+    def decode(self, packet):
+        return np.frombuffer(packet, dtype=np.int16)
+
+
+class FlacCodec:
+    name = "flac"
+
+    def __init__(self, sample_rate=16000):
+        try:
+            import soundfile
+        except ImportError:
+            raise ImportError("The flac codec requires soundfile: `pip install soundfile`")
+        self.soundfile = soundfile
+        self.sample_rate = sample_rate
+
+    def encode(self, audio_chunk):
+        audio_int16 = np.frombuffer(audio_chunk, dtype=np.int16)
+        buffer = io.BytesIO()
+        self.soundfile.write(
+            buffer, audio_int16, self.sample_rate, format="FLAC", subtype="PCM_16"
+        )
+        return [buffer.getbuffer()]
+
+    def decode(self, packet):
+        audio_int16, _ = self.soundfile.read(io.BytesIO(packet), dtype="int16")
+        return audio_int16
+
+
+class OpusCodec:
+    name = "opus"
+
+    def __init__(self, sample_rate=16000, frame_ms=20, bitrate=24000):
+        try:
+            import opuslib
+        except Exception as e:
+            # opuslib raises a bare Exception when libopus is missing
+            raise ImportError(
+                "The opus codec requires opuslib and libopus: `pip install opuslib`"
+            ) from e
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.max_frame_size = sample_rate * 120 // 1000
+        self.encoder = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+        self.encoder.bitrate = bitrate
+        self.decoder = opuslib.Decoder(sample_rate, 1)
+        # samples waiting for a full Opus frame
+        self.pending = np.empty(0, dtype=np.int16)
+
+    def encode(self, audio_chunk):
+        audio_int16 = np.concatenate(
+            (self.pending, np.frombuffer(audio_chunk, dtype=np.int16))
+        )
+        n_frames = len(audio_int16) // self.frame_size
+        packets = [
+            self.encoder.encode(
+                audio_int16[i * self.frame_size : (i + 1) * self.frame_size].tobytes(),
+                self.frame_size,
+            )
+            for i in range(n_frames)
+        ]
+        self.pending = audio_int16[n_frames * self.frame_size :]
+        return packets
+
+    def decode(self, packet):
+        return np.frombuffer(
+            self.decoder.decode(bytes(packet), self.max_frame_size), dtype=np.int16
+        )
+
+
+CODECS = {codec.name: codec for codec in (PCMCodec, FlacCodec, OpusCodec)}
+
+
+def get_codec(name, sample_rate=16000):
+    if name not in CODECS:
+        raise ValueError(f"The codec should be one of {', '.join(CODECS)}, got {name}")
+    return CODECS[name](sample_rate=sample_rate)
+
+
+class CodecPool:
+    """
+    Worker threads running the codecs off the event loop of the asyncio transport.
+    Codecs are stateful, so every stream is pinned to one worker to keep its packets in order.
+    """
+
+    def __init__(self, workers=2):
+        self.executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="codec")
+            for _ in range(workers)
+        ]
+
+    def executor(self, key):
+        return self.executors[hash(key) % len(self.executors)]
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False)
+
+
+class LinkStats:
+    """
+    Bandwidth and jitter buffer depth of a client link, logged every `interval_s` seconds.
+    """
+
+    def __init__(self, name, interval_s=10):
+        self.name = name
+        self.interval_s = interval_s
+        self.wire_bytes_in = self.pcm_bytes_in = 0
+        self.wire_bytes_out = self.pcm_bytes_out = 0
+        self.max_jitter_depth = 0
+        self.last_report = perf_counter()
+
+    def count_in(self, wire_bytes, pcm_bytes):
+        self.wire_bytes_in += wire_bytes
+        self.pcm_bytes_in += pcm_bytes
+
+    def count_out(self, wire_bytes, pcm_bytes):
+        self.wire_bytes_out += wire_bytes
+        self.pcm_bytes_out += pcm_bytes
+
+    def update(self, jitter_depth):
+        """
+        Records the current jitter buffer depth (in chunks) and logs the stats once per interval.
+        """
+        self.max_jitter_depth = max(self.max_jitter_depth, jitter_depth)
+        elapsed = perf_counter() - self.last_report
+        if elapsed < self.interval_s:
+            return
+        logger.info(
+            f"{self.name}: in {self.wire_bytes_in * 8e-3 / elapsed:.1f} kbps "
+            f"(x{self.pcm_bytes_in / max(self.wire_bytes_in, 1):.1f} compression), "
+            f"out {self.wire_bytes_out * 8e-3 / elapsed:.1f} kbps "
+            f"(x{self.pcm_bytes_out / max(self.wire_bytes_out, 1):.1f} compression), "
+            f"jitter buffer {jitter_depth} chunks (max {self.max_jitter_depth})"
+        )
+        self.wire_bytes_in = self.pcm_bytes_in = 0
+        self.wire_bytes_out = self.pcm_bytes_out = 0
+        self.max_jitter_depth = jitter_depth
+        self.last_report = perf_counter()
@@ -27,7 +27,12 @@ class LocalAudioStreamer:
                 self.input_queue.put(indata.copy())
                 outdata[:] = 0 * outdata
             else:
-                outdata[:] = self.output_queue.get()[:, np.newaxis]
+                audio_chunk = self.output_queue.get()
+                if isinstance(audio_chunk, bytes):
+                    # control markers such as b"INTERRUPT"
+                    outdata[:] = 0 * outdata
+                else:
+                    outdata[:] = audio_chunk[:, np.newaxis]
 
         logger.debug("Available devices:")
         logger.debug(sd.query_devices())
@@ -0,0 +1,259 @@
+"""
+Length-prefixed framed wire protocol used between `listen_and_play.py` and the server connections when `--protocol framed`.
+
+Every frame starts with a fixed 20-byte header, in network byte order:
+    magic (2 bytes, b"S2") | type (uint8) | flags (uint8) | sequence number (uint32) | timestamp (int64, µs) | payload length (uint32)
+followed by `payload length` bytes of payload.
+
+AUDIO frames carry int16 PCM. The client stamps them with their capture time, and the server stamps the audio it generates
+with the capture time of the utterance being answered, so that the client can measure the true end-to-end latency of each
+reply on its own clock. Control frames replace the in-band b"END" marker of the raw protocol.
+"""
+import asyncio
+import json
+import logging
+import struct
+import time
+from enum import IntEnum
+from typing import NamedTuple
+
+from connections.codecs import LinkStats, get_codec
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"S2"
+HEADER = struct.Struct("!2sBBIqI")
+
+
+class FrameType(IntEnum):
+    AUDIO = 0
+    # the client is ready to stream, the server starts listening
+    START = 1
+    # end of stream, in either direction
+    STOP = 2
+    # drop the audio being played or generated
+    INTERRUPT = 3
+    # JSON encoded settings
+    CONFIG = 4
+
+
+class Frame(NamedTuple):
+    frame_type: FrameType
+    seq: int
+    timestamp: int
+    payload: memoryview
+    flags: int = 0
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+# raised on the frames of a misbehaving client: malformed header or CONFIG payload, unsupported codec
+CLIENT_ERRORS = (ValueError, KeyError, TypeError, ImportError)
+
+
+def now_us():
+    return time.time_ns() // 1000
+
+
+def config_payload(**config):
+    return json.dumps(config).encode()
+
+
+def parse_config(payload):
+    return json.loads(bytes(payload).decode())
+
+
+class FrameWriter:
+    """
+    Encodes frames, numbering them in sending order.
+    """
+
+    def __init__(self):
+        self.seq = 0
+
+    def encode(self, frame_type, payload=b"", timestamp=0, flags=0):
+        payload = memoryview(payload).cast("B")
+        header = HEADER.pack(MAGIC, frame_type, flags, self.seq, timestamp, len(payload))
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        return b"".join((header, payload))
+
+
+def parse_header(header):
+    magic, frame_type, flags, seq, timestamp, length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ProtocolError(f"Invalid frame magic {bytes(magic)!r}, is the peer using --protocol framed?")
+    try:
+        frame_type = FrameType(frame_type)
+    except ValueError:
+        raise ProtocolError(f"Unknown frame type {frame_type}")
+    return frame_type, flags, seq, timestamp, length
+
+
+def recv_exactly(conn, view):
+    """
+    Fills `view` from `conn`. Returns False if the connection is closed first.
+    """
+    received = 0
+    while received < len(view):
+        nbytes = conn.recv_into(view[received:])
+        if nbytes == 0:
+            return False
+        received += nbytes
+    return True
+
+
+class FrameReader:
+    """
+    Reads frames from a blocking socket into preallocated buffers.
+    When a `ChunkRing` is given, audio payloads fitting its slots are received in them and returned as NumPy views, see
+    `ChunkRing`. Other audio payloads are received in buffers of their own, as they are queued for the pipeline. Control
+    payloads are received in a single reusable buffer, and are only valid until the next frame is read.
+    """
+
+    def __init__(self, conn, ring=None, max_payload_size=1 << 20):
+        self.conn = conn
+        self.ring = ring
+        self.max_payload_size = max_payload_size
+        self.header = memoryview(bytearray(HEADER.size))
+        self.payload = bytearray(4096)
+
+    def read(self):
+        """
+        Returns the next frame, or None when the connection is closed.
+        """
+        if not recv_exactly(self.conn, self.header):
+            return None
+        frame_type, flags, seq, timestamp, length = parse_header(self.header)
+        if length > self.max_payload_size:
+            raise ProtocolError(f"Frame payload of {length} bytes exceeds {self.max_payload_size} bytes")
+
+        if frame_type == FrameType.AUDIO and self.ring is not None and 0 < length <= self.ring.chunk_size:
+            payload = self.ring.recv_into(self.conn, length)
+            if payload is None:
+                return None
+        elif frame_type == FrameType.AUDIO:
+            payload = memoryview(bytearray(length))
+            if not recv_exactly(self.conn, payload):
+                return None
+        else:
+            if length > len(self.payload):
+                self.payload = bytearray(length)
+            payload = memoryview(self.payload)[:length]
+            if not recv_exactly(self.conn, payload):
+                return None
+        return Frame(frame_type, seq, timestamp, payload, flags)
+
+
+async def read_frame(reader, max_payload_size=1 << 20):
+    """
+    Reads the next frame from an asyncio StreamReader, returns None when the connection is closed.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+        frame_type, flags, seq, timestamp, length = parse_header(header)
+        if length > max_payload_size:
+            raise ProtocolError(f"Frame payload of {length} bytes exceeds {max_payload_size} bytes")
+        payload = await reader.readexactly(length) if length else b""
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    return Frame(frame_type, seq, timestamp, memoryview(payload), flags)
+
+
+class StreamState:
+    """
+    Receiving side bookkeeping of a framed stream: drops the audio frames that are duplicated or replayed, and with
+    `max_lag_ms`, the stale ones: frames delivered more than `max_lag_ms` later than the fastest frame of the stream, as
+    when the receiver falls behind and the audio piles up in the socket buffers. The capture and arrival times are on
+    different clocks, so the lag is measured against the fastest delivery seen instead of the absolute delay.
+    It also remembers the capture time of the latest audio frame passed to the pipeline, which the sending side echoes
+    in the frames of the reply, and holds the codec announced by the client, shared by both directions of the link.
+    """
+
+    def __init__(self, name="client", max_lag_ms=None):
+        self.name = name
+        self.last_seq = None
+        self.capture_timestamp = 0
+        self.dropped_frames = 0
+        self.max_lag_us = max_lag_ms * 1000 if max_lag_ms else None
+        # smallest difference between the arrival and the capture time of a frame, the clock offset plus the delay
+        self.min_delay_us = None
+        self.stale_frames = 0
+        self.lagging = False
+        self.codec = get_codec("pcm")
+        self.stats = LinkStats(name)
+
+    def configure(self, config):
+        if "codec" in config:
+            self.codec = get_codec(config["codec"], config.get("sample_rate", 16000))
+
+    def accept(self, frame, arrival_us=None):
+        if self.last_seq is not None:
+            delta = (frame.seq - self.last_seq) & 0xFFFFFFFF
+            if delta == 0 or delta >= 0x80000000:
+                # duplicate or older than a frame already received
+                self.dropped_frames += 1
+                return False
+        self.last_seq = frame.seq
+        return not self.stale(frame, now_us() if arrival_us is None else arrival_us)
+
+    def stale(self, frame, arrival_us):
+        if self.max_lag_us is None or not frame.timestamp:
+            return False
+        delay_us = arrival_us - frame.timestamp
+        if self.min_delay_us is None or delay_us < self.min_delay_us:
+            self.min_delay_us = delay_us
+        lagging = delay_us - self.min_delay_us > self.max_lag_us
+        if lagging:
+            self.stale_frames += 1
+            if not self.lagging:
+                logger.warning(
+                    f"{self.name}: audio received {(delay_us - self.min_delay_us) / 1000:.0f} ms late, dropping stale frames"
+                )
+        elif self.lagging:
+            logger.info(f"{self.name}: caught up, {self.stale_frames} stale frame(s) dropped so far")
+        self.lagging = lagging
+        return lagging
+
+
+def handle_client_frame(
+    frame, state, should_listen, put_audio, decoded=None, barge_in=False
+):
+    """
+    Applies a frame received by the server from a client.
+    Audio is decoded (unless the caller passes it already `decoded`) and passed to `put_audio` while listening, or always
+    with `barge_in`. Returns False when the client ends the stream.
+    """
+    if frame is None or frame.frame_type == FrameType.STOP:
+        return False
+    if frame.frame_type == FrameType.AUDIO:
+        listening = should_listen.is_set()
+        if state.accept(frame) and (listening or barge_in):
+            if listening:
+                state.capture_timestamp = frame.timestamp
+            audio_chunk = state.codec.decode(frame.payload) if decoded is None else decoded
+            state.stats.count_in(len(frame.payload), len(audio_chunk) * 2)
+            put_audio(audio_chunk)
+    elif frame.frame_type == FrameType.START:
+        should_listen.set()
+    elif frame.frame_type == FrameType.CONFIG:
+        config = parse_config(frame.payload)
+        logger.info(f"Client config: {config}")
+        state.configure(config)
+    return True
+
+
+def encode_audio_frames(writer, state, audio_chunk, packets=None):
+    """
+    Encodes a generated audio chunk with the codec of the link into AUDIO frames echoing the capture timestamp.
+    `packets` can be given when the chunk was already encoded by the caller.
+    """
+    if packets is None:
+        packets = state.codec.encode(audio_chunk)
+    frames = [
+        writer.encode(FrameType.AUDIO, packet, timestamp=state.capture_timestamp)
+        for packet in packets
+    ]
+    state.stats.count_out(sum(len(frame) for frame in frames), len(audio_chunk) * 2)
+    return b"".join(frames)
@@ -0,0 +1,182 @@
+import socket
+import threading
+from rich.console import Console
+import logging
+
+from connections.protocol import (
+    CLIENT_ERRORS,
+    FrameReader,
+    FrameType,
+    FrameWriter,
+    StreamState,
+    encode_audio_frames,
+    handle_client_frame,
+)
+from utils.buffers import ChunkRing
+from utils.interruption import drain
+from utils.session import Session, SessionQueue
+
+logger = logging.getLogger(__name__)
+
+console = Console()
+
+
+class SessionServer:
+    """
+    Accepts many concurrent clients on a single port and multiplexes them onto the shared pipeline handlers.
+    Each client uses one bidirectional connection: int16 audio chunks are received on it, and the generated audio is sent back on it.
+    Incoming chunks are tagged with the client session before being placed in `queue_out`, and the tagged outputs read from
+    `queue_in` are routed back to the session they belong to.
+    """
+
+    def __init__(
+        self,
+        stop_event,
+        queue_in,
+        queue_out,
+        host="0.0.0.0",
+        port=12345,
+        chunk_size=1024,
+        max_sessions=32,
+        buffer_slots=64,
+        protocol="raw",
+        max_audio_lag_ms=1000,
+        barge_in=False,
+    ):
+        self.stop_event = stop_event
+        self.queue_in = queue_in
+        self.queue_out = queue_out
+        self.host = host
+        self.port = port
+        self.chunk_size = chunk_size
+        self.max_sessions = max_sessions
+        self.buffer_slots = buffer_slots
+        self.protocol = protocol
+        self.max_audio_lag_ms = max_audio_lag_ms
+        self.barge_in = barge_in
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def receive(self, session, conn):
+        try:
+            self.receive_chunks(session, conn)
+        except OSError:
+            # connection reset
+            pass
+        except CLIENT_ERRORS as e:
+            logger.warning(f"{session}: {e!r}, closing the session")
+        finally:
+            self.close_session(session, conn)
+
+    def receive_chunks(self, session, conn):
+        session_queue = SessionQueue(self.queue_out, session)
+        ring = ChunkRing(self.chunk_size, slots=self.buffer_slots)
+        reader = FrameReader(conn, ring=ring)
+        while not self.stop_event.is_set() and not session.closed:
+            if self.protocol == "framed":
+                if not handle_client_frame(
+                    reader.read(),
+                    session.stream_state,
+                    session.should_listen,
+                    session_queue.put,
+                    barge_in=self.barge_in,
+                ):
+                    break
+                continue
+
+            audio_chunk = ring.recv_into(conn)
+            if audio_chunk is None:
+                break
+            if session.should_listen.is_set() or self.barge_in:
+                session_queue.put(audio_chunk)
+
+    def send(self, session, conn):
+        writer = FrameWriter()
+        while not self.stop_event.is_set():
+            audio_chunk = session.send_audio_chunks_queue.get()
+            try:
+                if isinstance(audio_chunk, bytes) and audio_chunk == b"END":
+                    if self.protocol == "framed":
+                        conn.sendall(writer.encode(FrameType.STOP))
+                    break
+                if isinstance(audio_chunk, bytes) and audio_chunk == b"INTERRUPT":
+                    if self.protocol == "framed":
+                        conn.sendall(writer.encode(FrameType.INTERRUPT))
+                    continue
+                if self.protocol == "framed":
+                    audio_chunk = encode_audio_frames(
+                        writer, session.stream_state, audio_chunk
+                    )
+                    session.stream_state.stats.update(
+                        session.send_audio_chunks_queue.qsize()
+                    )
+                conn.sendall(audio_chunk)
+            except OSError:
+                break
+        self.close_session(session, conn)
+
+    def close_session(self, session, conn):
+        with self.lock:
+            if self.sessions.pop(session.session_id, None) is None:
+                return
+        session.close()
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        conn.close()
+        logger.info(f"{session} closed, {len(self.sessions)} active session(s)")
+
+    def open_session(self, conn, address):
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                logger.warning(f"Rejecting {address}: {self.max_sessions} sessions already active")
+                conn.close()
+                return
+            session = Session(address)
+            session.stream_state = StreamState(str(session), self.max_audio_lag_ms)
+            self.sessions[session.session_id] = session
+        logger.info(f"{session} connected, {len(self.sessions)} active session(s)")
+        if self.protocol == "raw":
+            # framed clients start the stream with a START frame
+            session.should_listen.set()
+        threading.Thread(target=self.receive, args=(session, conn), daemon=True).start()
+        threading.Thread(target=self.send, args=(session, conn), daemon=True).start()
+
+    def accept(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(self.max_sessions)
+        # wake up regularly to check the stop event
+        self.socket.settimeout(1)
+        logger.info(f"Session server listening on {self.host}:{self.port}")
+        while not self.stop_event.is_set():
+            try:
+                conn, address = self.socket.accept()
+            except socket.timeout:
+                continue
+            conn.settimeout(None)
+            self.open_session(conn, address)
+        self.socket.close()
+
+    def run(self):
+        accept_thread = threading.Thread(target=self.accept, daemon=True)
+        accept_thread.start()
+
+        # route the generated audio back to its session
+        while not self.stop_event.is_set():
+            message = self.queue_in.get()
+            if isinstance(message, bytes) and message == b"END":
+                break
+            if message.session.closed:
+                continue
+            if isinstance(message.payload, bytes) and message.payload == b"INTERRUPT":
+                # the user barged in, drop the audio waiting to be sent
+                drain(message.session.send_audio_chunks_queue)
+            message.session.send_audio_chunks_queue.put(message.payload)
+
+        for session in list(self.sessions.values()):
+            session.close()
+        accept_thread.join()
+        logger.info("Session server closed")
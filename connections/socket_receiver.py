@@ -2,6 +2,9 @@ import socket
 from rich.console import Console
 import logging
 
+from connections.protocol import CLIENT_ERRORS, FrameReader, StreamState, handle_client_frame
+from utils.buffers import ChunkRing
+
 logger = logging.getLogger(__name__)
 
 console = Console()
@@ -20,6 +23,10 @@ class SocketReceiver:
         host="0.0.0.0",
         port=12345,
         chunk_size=1024,
+        buffer_slots=64,
+        protocol="raw",
+        stream_state=None,
+        barge_in=False,
     ):
         self.stop_event = stop_event
         self.queue_out = queue_out
@@ -27,16 +34,16 @@ class SocketReceiver:
         self.chunk_size = chunk_size
         self.host = host
         self.port = port
+        self.ring = ChunkRing(chunk_size, slots=buffer_slots)
+        self.protocol = protocol
+        # with barge-in, the VAD keeps listening while the assistant replies
+        self.barge_in = barge_in
+        # shared with the SocketSender, which echoes the capture timestamps
+        self.stream_state = stream_state or StreamState()
 
     def receive_full_chunk(self, conn, chunk_size):
-        data = b""
-        while len(data) < chunk_size:
-            packet = conn.recv(chunk_size - len(data))
-            if not packet:
-                # connection closed
-                return None
-            data += packet
-        return data
+        # chunks are received in place, in preallocated buffers handed to the VAD as NumPy views
+        return self.ring.recv_into(conn)
 
     def run(self):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -47,6 +54,10 @@ class SocketReceiver:
         self.conn, _ = self.socket.accept()
         logger.info("receiver connected")
 
+        if self.protocol == "framed":
+            self.receive_frames()
+            return
+
         self.should_listen.set()
         while not self.stop_event.is_set():
             audio_chunk = self.receive_full_chunk(self.conn, self.chunk_size)
@@ -54,7 +65,29 @@ class SocketReceiver:
                 # connection closed
                 self.queue_out.put(b"END")
                 break
-            if self.should_listen.is_set():
+            if self.should_listen.is_set() or self.barge_in:
                 self.queue_out.put(audio_chunk)
         self.conn.close()
         logger.info("Receiver closed")
+
+    def receive_frames(self):
+        reader = FrameReader(self.conn, ring=self.ring)
+        try:
+            while not self.stop_event.is_set():
+                if not handle_client_frame(
+                    reader.read(),
+                    self.stream_state,
+                    self.should_listen,
+                    self.queue_out.put,
+                    barge_in=self.barge_in,
+                ):
+                    break
+        except OSError:
+            # connection reset
+            pass
+        except CLIENT_ERRORS as e:
+            logger.warning(f"Closing the connection: {e!r}")
+        finally:
+            self.queue_out.put(b"END")
+            self.conn.close()
+        logger.info("Receiver closed")
@@ -2,6 +2,13 @@ import socket
 from rich.console import Console
 import logging
 
+from connections.protocol import (
+    FrameType,
+    FrameWriter,
+    StreamState,
+    encode_audio_frames,
+)
+
 logger = logging.getLogger(__name__)
 
 console = Console()
@@ -12,11 +19,22 @@ class SocketSender:
     Handles sending generated audio packets to the clients.
     """
 
-    def __init__(self, stop_event, queue_in, host="0.0.0.0", port=12346):
+    def __init__(
+        self,
+        stop_event,
+        queue_in,
+        host="0.0.0.0",
+        port=12346,
+        protocol="raw",
+        stream_state=None,
+    ):
         self.stop_event = stop_event
         self.queue_in = queue_in
         self.host = host
         self.port = port
+        self.protocol = protocol
+        # shared with the SocketReceiver, which records the capture timestamps
+        self.stream_state = stream_state or StreamState()
 
     def run(self):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -27,10 +45,34 @@ class SocketSender:
         self.conn, _ = self.socket.accept()
         logger.info("sender connected")
 
+        if self.protocol == "framed":
+            self.send_frames()
+            return
+
         while not self.stop_event.is_set():
             audio_chunk = self.queue_in.get()
+            if isinstance(audio_chunk, bytes) and audio_chunk == b"INTERRUPT":
+                # the raw protocol has no way to flush the client playback
+                continue
             self.conn.sendall(audio_chunk)
             if isinstance(audio_chunk, bytes) and audio_chunk == b"END":
                 break
         self.conn.close()
         logger.info("Sender closed")
+
+    def send_frames(self):
+        writer = FrameWriter()
+        while not self.stop_event.is_set():
+            audio_chunk = self.queue_in.get()
+            if isinstance(audio_chunk, bytes) and audio_chunk == b"END":
+                self.conn.sendall(writer.encode(FrameType.STOP))
+                break
+            if isinstance(audio_chunk, bytes) and audio_chunk == b"INTERRUPT":
+                self.conn.sendall(writer.encode(FrameType.INTERRUPT))
+                continue
+            self.conn.sendall(
+                encode_audio_frames(writer, self.stream_state, audio_chunk)
+            )
+            self.stream_state.stats.update(self.queue_in.qsize())
+        self.conn.close()
+        logger.info("Sender closed")
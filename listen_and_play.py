@@ -1,3 +1,4 @@
+import logging
 import socket
 import threading
 from queue import Queue
@@ -5,6 +6,16 @@ from dataclasses import dataclass, field
 import sounddevice as sd
 from transformers import HfArgumentParser
 
+from connections.codecs import LinkStats, get_codec
+from connections.protocol import (
+    FrameReader,
+    FrameType,
+    FrameWriter,
+    StreamState,
+    config_payload,
+    now_us,
+)
+
 
 @dataclass
 class ListenAndPlayArguments:
@@ -28,6 +39,32 @@ class ListenAndPlayArguments:
         default=12346,
         metadata={"help": "The network port for receiving data. Default is 12346."},
     )
+    duplex: bool = field(
+        default=False,
+        metadata={
+            "help": "Send and receive audio over a single connection to `send_port`, as expected by a server running with `--mode multi_socket`. Default is False."
+        },
+    )
+    protocol: str = field(
+        default="raw",
+        metadata={
+            "help": "Wire protocol, must match the server's `--protocol`. Either 'raw' or 'framed'. "
+            "With 'framed', the end-to-end latency of each reply is printed and stale audio is dropped. Default is 'raw'."
+        },
+    )
+    codec: str = field(
+        default="pcm",
+        metadata={
+            "help": "Audio codec of the link, requires `--protocol framed`. Either 'pcm', 'flac' (lossless) or 'opus'. Default is 'pcm'."
+        },
+    )
+    barge_in: bool = field(
+        default=False,
+        metadata={
+            "help": "Keep streaming the microphone while the reply is played, so that the user can interrupt the assistant. "
+            "Requires a server running with `--barge_in`, and headphones to avoid the reply being picked up by the microphone. Default is False."
+        },
+    )
 
 
 def listen_and_play(
@@ -37,18 +74,27 @@ def listen_and_play(
     host="localhost",
     send_port=12345,
     recv_port=12346,
+    duplex=False,
+    protocol="raw",
+    codec="pcm",
+    barge_in=False,
 ):
     send_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     send_socket.connect((host, send_port))
 
-    recv_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    recv_socket.connect((host, recv_port))
+    if duplex:
+        recv_socket = send_socket
+    else:
+        recv_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        recv_socket.connect((host, recv_port))
 
     print("Recording and streaming...")
 
     stop_event = threading.Event()
     recv_queue = Queue()
     send_queue = Queue()
+    link_codec = get_codec(codec, sample_rate=send_rate)
+    link_stats = LinkStats("listen_and_play")
 
     def callback_recv(outdata, frames, time, status):
         if not recv_queue.empty():
@@ -58,16 +104,48 @@ def listen_and_play(
         else:
             outdata[:] = b"\x00" * len(outdata)
 
+    # frames do not match the playback blocksize, their audio is played back from a contiguous buffer
+    playback_buffer = bytearray()
+
+    def callback_recv_frames(outdata, frames, time, status):
+        while len(playback_buffer) < len(outdata) and not recv_queue.empty():
+            playback_buffer.extend(recv_queue.get())
+        size = min(len(outdata), len(playback_buffer))
+        outdata[:size] = playback_buffer[:size]
+        outdata[size:] = b"\x00" * (len(outdata) - size)
+        del playback_buffer[:size]
+
     def callback_send(indata, frames, time, status):
-        if recv_queue.empty():
+        if barge_in or recv_queue.empty():
             data = bytes(indata)
-            send_queue.put(data)
+            send_queue.put((data, now_us()))
 
     def send(stop_event, send_queue):
         while not stop_event.is_set():
-            data = send_queue.get()
+            data, _ = send_queue.get()
             send_socket.sendall(data)
 
+    def send_frames(stop_event, send_queue):
+        writer = FrameWriter()
+        send_socket.sendall(
+            writer.encode(
+                FrameType.CONFIG,
+                config_payload(
+                    sample_rate=send_rate, chunk_size=list_play_chunk_size, codec=codec
+                ),
+            )
+        )
+        send_socket.sendall(writer.encode(FrameType.START))
+        while not stop_event.is_set():
+            data, capture_timestamp = send_queue.get()
+            frames = b"".join(
+                writer.encode(FrameType.AUDIO, packet, timestamp=capture_timestamp)
+                for packet in link_codec.encode(data)
+            )
+            link_stats.count_out(len(frames), len(data))
+            send_socket.sendall(frames)
+        send_socket.sendall(writer.encode(FrameType.STOP))
+
     def recv(stop_event, recv_queue):
         def receive_full_chunk(conn, chunk_size):
             data = b""
@@ -83,6 +161,37 @@ def listen_and_play(
             if data:
                 recv_queue.put(data)
 
+    def recv_frames(stop_event, recv_queue):
+        reader = FrameReader(recv_socket)
+        stream_state = StreamState()
+        # capture timestamp of the utterance the audio being played answers
+        reply_timestamp = 0
+        while not stop_event.is_set():
+            try:
+                frame = reader.read()
+            except OSError:
+                break
+            if frame is None or frame.frame_type == FrameType.STOP:
+                break
+            if frame.frame_type == FrameType.INTERRUPT:
+                while not recv_queue.empty():
+                    recv_queue.get_nowait()
+                playback_buffer.clear()
+            if frame.frame_type != FrameType.AUDIO or not stream_state.accept(frame):
+                continue
+            if frame.timestamp < reply_timestamp:
+                # left over of a previous reply, playing it now would be late
+                stream_state.dropped_frames += 1
+                continue
+            if frame.timestamp > reply_timestamp:
+                reply_timestamp = frame.timestamp
+                print(f"End-to-end latency: {(now_us() - reply_timestamp) / 1000:.0f} ms")
+            audio_chunk = link_codec.decode(frame.payload)
+            link_stats.count_in(len(frame.payload), audio_chunk.nbytes)
+            link_stats.update(recv_queue.qsize())
+            recv_queue.put(audio_chunk.tobytes())
+
+    framed = protocol == "framed"
     try:
         send_stream = sd.RawInputStream(
             samplerate=send_rate,
@@ -96,14 +205,18 @@ def listen_and_play(
             channels=1,
             dtype="int16",
             blocksize=list_play_chunk_size,
-            callback=callback_recv,
+            callback=callback_recv_frames if framed else callback_recv,
         )
         threading.Thread(target=send_stream.start).start()
         threading.Thread(target=recv_stream.start).start()
 
-        send_thread = threading.Thread(target=send, args=(stop_event, send_queue))
+        send_thread = threading.Thread(
+            target=send_frames if framed else send, args=(stop_event, send_queue)
+        )
         send_thread.start()
-        recv_thread = threading.Thread(target=recv, args=(stop_event, recv_queue))
+        recv_thread = threading.Thread(
+            target=recv_frames if framed else recv, args=(stop_event, recv_queue)
+        )
         recv_thread.start()
 
         input("Press Enter to stop...")
@@ -118,11 +231,13 @@ def listen_and_play(
         recv_thread.join()
         send_thread.join()
         send_socket.close()
-        recv_socket.close()
+        if not duplex:
+            recv_socket.close()
         print("Connection closed.")
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     parser = HfArgumentParser((ListenAndPlayArguments,))
     (listen_and_play_kwargs,) = parser.parse_args_into_dataclasses()
     listen_and_play(**vars(listen_and_play_kwargs))
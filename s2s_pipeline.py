@@ -1,55 +1,32 @@
+import json
 import logging
 import os
 import sys
 from copy import copy
+from dataclasses import fields
 from pathlib import Path
 from queue import Queue
 from threading import Event
 from typing import Optional
 from sys import platform
-from VAD.vad_handler import VADHandler
-from arguments_classes.chat_tts_arguments import ChatTTSHandlerArguments
-from arguments_classes.language_model_arguments import LanguageModelHandlerArguments
-from arguments_classes.mlx_language_model_arguments import (
-    MLXLanguageModelHandlerArguments,
-)
 from arguments_classes.module_arguments import ModuleArguments
-from arguments_classes.paraformer_stt_arguments import ParaformerSTTHandlerArguments
-from arguments_classes.parler_tts_arguments import ParlerTTSHandlerArguments
+from arguments_classes.queue_arguments import QueueArguments
 from arguments_classes.socket_receiver_arguments import SocketReceiverArguments
 from arguments_classes.socket_sender_arguments import SocketSenderArguments
+from arguments_classes.session_server_arguments import SessionServerArguments
 from arguments_classes.vad_arguments import VADHandlerArguments
-from arguments_classes.whisper_stt_arguments import WhisperSTTHandlerArguments
-from arguments_classes.faster_whisper_stt_arguments import (
-    FasterWhisperSTTHandlerArguments,
-)
-from arguments_classes.melo_tts_arguments import MeloTTSHandlerArguments
-from arguments_classes.open_api_language_model_arguments import OpenApiLanguageModelHandlerArguments
-from arguments_classes.facebookmms_tts_arguments import FacebookMMSTTSHandlerArguments
-import torch
-import nltk
+from backends import BACKENDS, KINDS, get_backend
 from rich.console import Console
-from transformers import (
-    HfArgumentParser,
-)
 
+from utils.compile_cache import configure_compile_cache
+from utils.interruption import Interruption
+from utils.metrics import MetricsServer, register_queues
+from utils.queues import BoundedQueue
+from utils.session import PerSession, SessionEvent
+from utils.startup import build_concurrently, startup_timeline
 from utils.thread_manager import ThreadManager
-from connections.gradio_handler import GradioHandler
-
-# Ensure that the necessary NLTK resources are available
-try:
-    nltk.data.find("tokenizers/punkt_tab")
-except (LookupError, OSError):
-    nltk.download("punkt_tab")
-try:
-    nltk.data.find("tokenizers/averaged_perceptron_tagger_eng")
-except (LookupError, OSError):
-    nltk.download("averaged_perceptron_tagger_eng")
-
-# caching allows ~50% compilation time reduction
-# see https://docs.google.com/document/d/1y5CRfMLdwEoF1nTk9q8qEu1mgMUuUtvhklPKJ2emLU8/edit#heading=h.o2asbxsrp1ma
+
 CURRENT_DIR = Path(__file__).resolve().parent
-os.environ["TORCHINDUCTOR_CACHE_DIR"] = os.path.join(CURRENT_DIR, "tmp")
 
 console = Console()
 logging.getLogger("numba").setLevel(logging.WARNING)  # quiet down numba logs
@@ -72,32 +49,101 @@ def rename_args(args, prefix):
     args.__dict__["gen_kwargs"] = gen_kwargs
 
 
+# arguments parsed whatever the backends
+BASE_ARGUMENTS = (
+    ModuleArguments,
+    SocketReceiverArguments,
+    SocketSenderArguments,
+    SessionServerArguments,
+    QueueArguments,
+    VADHandlerArguments,
+)
+
+
+def is_number(string):
+    try:
+        float(string)
+    except ValueError:
+        return False
+    return True
+
+
+def unselected_backend_argument(name, unselected_prefixes):
+    """
+    Whether `name` is an argument of a backend not selected. Those are ignored, as a configuration may hold the settings
+    of several backends.
+    """
+    return any(name.startswith(f"{prefix}_") for prefix in unselected_prefixes)
+
+
+def split_unselected_options(remaining, unselected_prefixes):
+    """
+    Splits the command line strings left unparsed, options and their values, into the ones of the backends not selected
+    and the unknown ones.
+    """
+    ignored, unknown = [], []
+    # a value goes with the option preceding it, and is unknown without one
+    current = unknown
+    for string in remaining:
+        if string.startswith("-") and not is_number(string):
+            name = string.lstrip("-").split("=", 1)[0]
+            current = ignored if unselected_backend_argument(name, unselected_prefixes) else unknown
+        current.append(string)
+    return ignored, unknown
+
+
 def parse_arguments():
-    parser = HfArgumentParser(
-        (
-            ModuleArguments,
-            SocketReceiverArguments,
-            SocketSenderArguments,
-            VADHandlerArguments,
-            WhisperSTTHandlerArguments,
-            ParaformerSTTHandlerArguments,
-            FasterWhisperSTTHandlerArguments,
-            LanguageModelHandlerArguments,
-            OpenApiLanguageModelHandlerArguments,
-            MLXLanguageModelHandlerArguments,
-            ParlerTTSHandlerArguments,
-            MeloTTSHandlerArguments,
-            ChatTTSHandlerArguments,
-            FacebookMMSTTSHandlerArguments,
-        )
-    )
+    """
+    Parses the arguments of the pipeline and of its selected STT, LLM and TTS backends only, see `backends`.
+    Returns the module, socket receiver, socket sender, session server, queue and VAD arguments, followed by the STT,
+    LLM and TTS arguments (None for a backend without arguments).
+    """
+    # transformers is only imported to parse the arguments, the pipeline may not use it otherwise
+    from transformers import HfArgumentParser
 
+    config = None
     if len(sys.argv) == 2 and sys.argv[1].endswith(".json"):
         # Parse configurations from a JSON file if specified
-        return parser.parse_json_file(json_file=os.path.abspath(sys.argv[1]))
+        with open(os.path.abspath(sys.argv[1])) as config_file:
+            config = json.load(config_file)
+        (module_kwargs,) = HfArgumentParser((ModuleArguments,)).parse_dict(config, allow_extra_keys=True)
+    else:
+        # without help, which lists the arguments of the selected backends as well
+        module_kwargs, _ = HfArgumentParser((ModuleArguments,), add_help=False).parse_args_into_dataclasses(
+            return_remaining_strings=True
+        )
+
+    # the backends are known from the module arguments, only their arguments classes are imported
+    optimal_mac_settings(module_kwargs.local_mac_optimal_settings, module_kwargs)
+    arguments_classes = [get_backend(kind, getattr(module_kwargs, kind)).arguments_class() for kind in KINDS]
+    dataclass_types = BASE_ARGUMENTS + tuple(arguments for arguments in arguments_classes if arguments is not None)
+    parser = HfArgumentParser(dataclass_types)
+    unselected_prefixes = {
+        backend.prefix for backends in BACKENDS.values() for backend in backends.values() if backend.prefix
+    } - {get_backend(kind, getattr(module_kwargs, kind)).prefix for kind in KINDS}
+    if config is not None:
+        known = {field.name for dtype in dataclass_types for field in fields(dtype)}
+        extra = [key for key in config if key not in known]
+        ignored = [key for key in extra if unselected_backend_argument(key, unselected_prefixes)]
+        unknown = [key for key in extra if key not in ignored]
+        if unknown:
+            raise ValueError(f"Unknown arguments in {sys.argv[1]}: {', '.join(unknown)}")
+        parsed = parser.parse_dict(config, allow_extra_keys=True)
     else:
         # Parse arguments from command line if no JSON file is provided
-        return parser.parse_args_into_dataclasses()
+        *parsed, remaining = parser.parse_args_into_dataclasses(return_remaining_strings=True)
+        ignored, unknown = split_unselected_options(remaining, unselected_prefixes)
+        if unknown:
+            parser.error(f"unrecognized arguments: {' '.join(unknown)}")
+    if ignored:
+        logging.getLogger(__name__).warning(
+            f"Ignoring the arguments of the backends not selected: {' '.join(ignored)}"
+        )
+    backend_kwargs = iter(parsed[len(BASE_ARGUMENTS) :])
+    return (
+        *parsed[: len(BASE_ARGUMENTS)],
+        *(next(backend_kwargs) if arguments is not None else None for arguments in arguments_classes),
+    )
 
 
 def setup_logger(log_level):
@@ -110,6 +156,8 @@ def setup_logger(log_level):
 
     # torch compile logs
     if log_level == "debug":
+        import torch
+
         torch._logging.set_logs(graph_breaks=True, recompiles=True, cudagraphs=True)
 
 
@@ -168,73 +216,77 @@ def prepare_module_args(module_kwargs, *handler_kwargs):
 
 def prepare_all_args(
     module_kwargs,
-    whisper_stt_handler_kwargs,
-    paraformer_stt_handler_kwargs,
-    faster_whisper_stt_handler_kwargs,
-    language_model_handler_kwargs,
-    open_api_language_model_handler_kwargs,
-    mlx_language_model_handler_kwargs,
-    parler_tts_handler_kwargs,
-    melo_tts_handler_kwargs,
-    chat_tts_handler_kwargs,
-    facebook_mms_tts_handler_kwargs,
+    stt_handler_kwargs,
+    llm_handler_kwargs,
+    tts_handler_kwargs,
 ):
-    prepare_module_args(
-        module_kwargs,
-        whisper_stt_handler_kwargs,
-        faster_whisper_stt_handler_kwargs,
-        paraformer_stt_handler_kwargs,
-        language_model_handler_kwargs,
-        open_api_language_model_handler_kwargs,
-        mlx_language_model_handler_kwargs,
-        parler_tts_handler_kwargs,
-        melo_tts_handler_kwargs,
-        chat_tts_handler_kwargs,
-        facebook_mms_tts_handler_kwargs,
-    )
+    handler_kwargs = (stt_handler_kwargs, llm_handler_kwargs, tts_handler_kwargs)
+    prepare_module_args(module_kwargs, *(kwargs for kwargs in handler_kwargs if kwargs is not None))
+
+    for kind, kwargs in zip(KINDS, handler_kwargs):
+        if kwargs is not None:
+            rename_args(kwargs, get_backend(kind, getattr(module_kwargs, kind)).prefix)
+
 
-    rename_args(whisper_stt_handler_kwargs, "stt")
-    rename_args(faster_whisper_stt_handler_kwargs, "faster_whisper_stt")
-    rename_args(paraformer_stt_handler_kwargs, "paraformer_stt")
-    rename_args(language_model_handler_kwargs, "lm")
-    rename_args(mlx_language_model_handler_kwargs, "mlx_lm")
-    rename_args(open_api_language_model_handler_kwargs, "open_api")
-    rename_args(parler_tts_handler_kwargs, "tts")
-    rename_args(melo_tts_handler_kwargs, "melo")
-    rename_args(chat_tts_handler_kwargs, "chat_tts")
-    rename_args(facebook_mms_tts_handler_kwargs, "facebook_mms")
+PIPELINE_QUEUES = (
+    "recv_audio_chunks_queue",
+    "send_audio_chunks_queue",
+    "spoken_prompt_queue",
+    "text_prompt_queue",
+    "lm_response_queue",
+)
 
 
-def initialize_queues_and_events():
-    return {
+def initialize_queues_and_events(queue_kwargs=None):
+    """
+    Creates the queues between the pipeline stages, bounded as configured in `queue_kwargs` (unbounded if not given).
+    """
+    queues_and_events = {
         "stop_event": Event(),
         "should_listen": Event(),
-        "recv_audio_chunks_queue": Queue(),
-        "send_audio_chunks_queue": Queue(),
-        "spoken_prompt_queue": Queue(),
-        "text_prompt_queue": Queue(),
-        "lm_response_queue": Queue(),
         "log_queue": Queue(),
     }
+    for name in PIPELINE_QUEUES:
+        queues_and_events[name] = BoundedQueue(
+            getattr(queue_kwargs, f"{name}_size", 0),
+            getattr(queue_kwargs, f"{name}_policy", "block"),
+            name=name,
+        )
+    return queues_and_events
+
+
+def recv_buffer_slots(socket_receiver_kwargs, vad_handler_kwargs, recv_audio_chunks_queue):
+    """
+    Size of the receive buffer rings: enough for every chunk the VAD may still hold, queued or being processed, so that
+    received chunks are only stored in new buffers when the queue is unbounded.
+    """
+    if socket_receiver_kwargs.recv_buffer_slots is not None:
+        return socket_receiver_kwargs.recv_buffer_slots
+    if recv_audio_chunks_queue.maxsize <= 0:
+        return 64
+    # plus the chunks taken by the VAD and the one being received
+    return recv_audio_chunks_queue.maxsize + vad_handler_kwargs.vad_batch_size + 1
+
+
+def log_queue_stats(queues_and_events, level=logging.INFO):
+    for name in PIPELINE_QUEUES:
+        logger.log(level, repr(queues_and_events[name]))
 
 
 def build_pipeline(
     module_kwargs,
     socket_receiver_kwargs,
     socket_sender_kwargs,
+    session_server_kwargs,
     vad_handler_kwargs,
-    whisper_stt_handler_kwargs,
-    faster_whisper_stt_handler_kwargs,
-    paraformer_stt_handler_kwargs,
-    language_model_handler_kwargs,
-    open_api_language_model_handler_kwargs,
-    mlx_language_model_handler_kwargs,
-    parler_tts_handler_kwargs,
-    melo_tts_handler_kwargs,
-    chat_tts_handler_kwargs,
-    facebook_mms_tts_handler_kwargs,
+    stt_handler_kwargs,
+    llm_handler_kwargs,
+    tts_handler_kwargs,
     queues_and_events,
 ):
+    from connections.gradio_handler import GradioHandler
+    from VAD.vad_handler import VADHandler
+
     stop_event = queues_and_events["stop_event"]
     should_listen = queues_and_events["should_listen"]
     recv_audio_chunks_queue = queues_and_events["recv_audio_chunks_queue"]
@@ -243,6 +295,12 @@ def build_pipeline(
     text_prompt_queue = queues_and_events["text_prompt_queue"]
     lm_response_queue = queues_and_events["lm_response_queue"]
     log_queue = queues_and_events["log_queue"]
+    # barge-in state, shared by all the handlers of a conversation
+    interruptions = PerSession(
+        lambda: Interruption((lm_response_queue, send_audio_chunks_queue))
+    )
+    barge_in = vad_handler_kwargs.barge_in
+    startup_timeline.reset()
     
     # 创建 handlers 列表并添加 GradioHandler
     logger.info("正在初始化 Gradio 界面...")
@@ -272,10 +330,55 @@ def build_pipeline(
         )
         comms_handlers = [local_audio_streamer]
         should_listen.set()
+        if barge_in:
+            logger.warning("Barge-in is not supported in local mode and is ignored")
+            vad_handler_kwargs.barge_in = False
+    elif module_kwargs.mode == "multi_socket":
+        from connections.session_server import SessionServer
+
+        comms_handlers = [
+            SessionServer(
+                stop_event,
+                queue_in=send_audio_chunks_queue,
+                queue_out=recv_audio_chunks_queue,
+                host=socket_receiver_kwargs.recv_host,
+                port=socket_receiver_kwargs.recv_port,
+                chunk_size=socket_receiver_kwargs.chunk_size,
+                max_sessions=session_server_kwargs.max_sessions,
+                buffer_slots=recv_buffer_slots(
+                    socket_receiver_kwargs, vad_handler_kwargs, recv_audio_chunks_queue
+                ),
+                protocol=socket_receiver_kwargs.protocol,
+                max_audio_lag_ms=socket_receiver_kwargs.max_audio_lag_ms,
+                barge_in=barge_in,
+            )
+        ]
+        # the handlers are shared: listening is toggled on the session being processed
+        should_listen = SessionEvent(should_listen)
+    elif module_kwargs.mode == "async_socket":
+        from connections.async_socket_server import AsyncSocketServer
+
+        comms_handlers = [
+            AsyncSocketServer(
+                stop_event,
+                queue_in=send_audio_chunks_queue,
+                queue_out=recv_audio_chunks_queue,
+                host=socket_receiver_kwargs.recv_host,
+                port=socket_receiver_kwargs.recv_port,
+                chunk_size=socket_receiver_kwargs.chunk_size,
+                max_sessions=session_server_kwargs.max_sessions,
+                protocol=socket_receiver_kwargs.protocol,
+                max_audio_lag_ms=socket_receiver_kwargs.max_audio_lag_ms,
+                barge_in=barge_in,
+            )
+        ]
+        should_listen = SessionEvent(should_listen)
     else:
+        from connections.protocol import StreamState
         from connections.socket_receiver import SocketReceiver
         from connections.socket_sender import SocketSender
 
+        stream_state = StreamState(max_lag_ms=socket_receiver_kwargs.max_audio_lag_ms)
         comms_handlers = [
             SocketReceiver(
                 stop_event,
@@ -284,163 +387,71 @@ def build_pipeline(
                 host=socket_receiver_kwargs.recv_host,
                 port=socket_receiver_kwargs.recv_port,
                 chunk_size=socket_receiver_kwargs.chunk_size,
+                buffer_slots=recv_buffer_slots(
+                    socket_receiver_kwargs, vad_handler_kwargs, recv_audio_chunks_queue
+                ),
+                protocol=socket_receiver_kwargs.protocol,
+                stream_state=stream_state,
+                barge_in=barge_in,
             ),
             SocketSender(
                 stop_event,
                 send_audio_chunks_queue,
                 host=socket_sender_kwargs.send_host,
                 port=socket_sender_kwargs.send_port,
+                protocol=socket_receiver_kwargs.protocol,
+                stream_state=stream_state,
             ),
         ]
 
-    vad = VADHandler(
-        stop_event,
-        queue_in=recv_audio_chunks_queue,
-        queue_out=spoken_prompt_queue,
-        setup_args=(should_listen,),
-        setup_kwargs=vars(vad_handler_kwargs),
+    # the modules of the selected backends are imported one at a time, beforehand, as concurrent imports of the same
+    # modules may deadlock
+    stt_handler, llm_handler, tts_handler = (
+        get_backend(kind, getattr(module_kwargs, kind)).handler_class() for kind in KINDS
     )
 
-    stt = get_stt_handler(module_kwargs, stop_event, spoken_prompt_queue, text_prompt_queue, whisper_stt_handler_kwargs, faster_whisper_stt_handler_kwargs, paraformer_stt_handler_kwargs)
-    lm = get_llm_handler(module_kwargs, stop_event, text_prompt_queue, lm_response_queue, language_model_handler_kwargs, open_api_language_model_handler_kwargs, mlx_language_model_handler_kwargs)
-    tts = get_tts_handler(module_kwargs, stop_event, lm_response_queue, send_audio_chunks_queue, should_listen, parler_tts_handler_kwargs, melo_tts_handler_kwargs, chat_tts_handler_kwargs, facebook_mms_tts_handler_kwargs)
+    # the models are loaded concurrently, their warmups running one at a time per device
+    vad, stt, lm, tts = build_concurrently(
+        [
+            lambda: VADHandler(
+                stop_event,
+                queue_in=recv_audio_chunks_queue,
+                queue_out=spoken_prompt_queue,
+                setup_args=(should_listen,),
+                setup_kwargs=vars(vad_handler_kwargs),
+                interruptions=interruptions,
+            ),
+            lambda: stt_handler(
+                stop_event,
+                queue_in=spoken_prompt_queue,
+                queue_out=text_prompt_queue,
+                setup_kwargs=setup_kwargs(stt_handler_kwargs),
+            ),
+            lambda: llm_handler(
+                stop_event,
+                queue_in=text_prompt_queue,
+                queue_out=lm_response_queue,
+                setup_kwargs=setup_kwargs(llm_handler_kwargs),
+                interruptions=interruptions,
+            ),
+            lambda: tts_handler(
+                stop_event,
+                queue_in=lm_response_queue,
+                queue_out=send_audio_chunks_queue,
+                setup_args=(should_listen,),
+                setup_kwargs=setup_kwargs(tts_handler_kwargs),
+                interruptions=interruptions,
+            ),
+        ],
+        parallel=module_kwargs.parallel_startup,
+    )
+    startup_timeline.report()
 
     return ThreadManager([*comms_handlers, vad, stt, lm, tts])
 
 
-def get_stt_handler(module_kwargs, stop_event, spoken_prompt_queue, text_prompt_queue, whisper_stt_handler_kwargs, faster_whisper_stt_handler_kwargs, paraformer_stt_handler_kwargs):
-    if module_kwargs.stt == "moonshine":
-        from STT.moonshine_handler import MoonshineSTTHandler
-        return MoonshineSTTHandler(
-            stop_event,
-            queue_in=spoken_prompt_queue,
-            queue_out=text_prompt_queue,
-        )
-    if module_kwargs.stt == "whisper":
-        from STT.whisper_stt_handler import WhisperSTTHandler
-        return WhisperSTTHandler(
-            stop_event,
-            queue_in=spoken_prompt_queue,
-            queue_out=text_prompt_queue,
-            setup_kwargs=vars(whisper_stt_handler_kwargs),
-        )
-    elif module_kwargs.stt == "whisper-mlx":
-        from STT.lightning_whisper_mlx_handler import LightningWhisperSTTHandler
-        return LightningWhisperSTTHandler(
-            stop_event,
-            queue_in=spoken_prompt_queue,
-            queue_out=text_prompt_queue,
-            setup_kwargs=vars(whisper_stt_handler_kwargs),
-        )
-    elif module_kwargs.stt == "paraformer":
-        from STT.paraformer_handler import ParaformerSTTHandler
-        return ParaformerSTTHandler(
-            stop_event,
-            queue_in=spoken_prompt_queue,
-            queue_out=text_prompt_queue,
-            setup_kwargs=vars(paraformer_stt_handler_kwargs),
-        )
-    elif module_kwargs.stt == "faster-whisper":
-        from STT.faster_whisper_handler import FasterWhisperSTTHandler
-
-        return FasterWhisperSTTHandler(
-            stop_event,
-            queue_in=spoken_prompt_queue,
-            queue_out=text_prompt_queue,
-            setup_kwargs=vars(faster_whisper_stt_handler_kwargs),
-        )
-    else:
-        raise ValueError("The STT should be either whisper, whisper-mlx, or paraformer.")
-
-
-def get_llm_handler(
-    module_kwargs, 
-    stop_event, 
-    text_prompt_queue, 
-    lm_response_queue, 
-    language_model_handler_kwargs,
-    open_api_language_model_handler_kwargs,
-    mlx_language_model_handler_kwargs
-):
-    if module_kwargs.llm == "transformers":
-        from LLM.language_model import LanguageModelHandler
-        return LanguageModelHandler(
-            stop_event,
-            queue_in=text_prompt_queue,
-            queue_out=lm_response_queue,
-            setup_kwargs=vars(language_model_handler_kwargs),
-        )
-    elif module_kwargs.llm == "open_api":
-        from LLM.openai_api_language_model import OpenApiModelHandler
-        return OpenApiModelHandler(
-            stop_event,
-            queue_in=text_prompt_queue,
-            queue_out=lm_response_queue,
-            setup_kwargs=vars(open_api_language_model_handler_kwargs),
-        )
-
-    elif module_kwargs.llm == "mlx-lm":
-        from LLM.mlx_language_model import MLXLanguageModelHandler
-        return MLXLanguageModelHandler(
-            stop_event,
-            queue_in=text_prompt_queue,
-            queue_out=lm_response_queue,
-            setup_kwargs=vars(mlx_language_model_handler_kwargs),
-        )
-
-    else:
-        raise ValueError("The LLM should be either transformers or mlx-lm")
-
-
-def get_tts_handler(module_kwargs, stop_event, lm_response_queue, send_audio_chunks_queue, should_listen, parler_tts_handler_kwargs, melo_tts_handler_kwargs, chat_tts_handler_kwargs, facebook_mms_tts_handler_kwargs):
-    if module_kwargs.tts == "parler":
-        from TTS.parler_handler import ParlerTTSHandler
-        return ParlerTTSHandler(
-            stop_event,
-            queue_in=lm_response_queue,
-            queue_out=send_audio_chunks_queue,
-            setup_args=(should_listen,),
-            setup_kwargs=vars(parler_tts_handler_kwargs),
-        )
-    elif module_kwargs.tts == "melo":
-        try:
-            from TTS.melo_handler import MeloTTSHandler
-        except RuntimeError as e:
-            logger.error(
-                "Error importing MeloTTSHandler. You might need to run: python -m unidic download"
-            )
-            raise e
-        return MeloTTSHandler(
-            stop_event,
-            queue_in=lm_response_queue,
-            queue_out=send_audio_chunks_queue,
-            setup_args=(should_listen,),
-            setup_kwargs=vars(melo_tts_handler_kwargs),
-        )
-    elif module_kwargs.tts == "chatTTS":
-        try:
-            from TTS.chatTTS_handler import ChatTTSHandler
-        except RuntimeError as e:
-            logger.error("Error importing ChatTTSHandler")
-            raise e
-        return ChatTTSHandler(
-            stop_event,
-            queue_in=lm_response_queue,
-            queue_out=send_audio_chunks_queue,
-            setup_args=(should_listen,),
-            setup_kwargs=vars(chat_tts_handler_kwargs),
-        )
-    elif module_kwargs.tts == "facebookMMS":
-        from TTS.facebookmms_handler import FacebookMMSTTSHandler
-        return FacebookMMSTTSHandler(
-            stop_event,
-            queue_in=lm_response_queue,
-            queue_out=send_audio_chunks_queue,
-            setup_args=(should_listen,),
-            setup_kwargs=vars(facebook_mms_tts_handler_kwargs),
-        )
-    else:
-        raise ValueError("The TTS should be either parler, melo or chatTTS")
+def setup_kwargs(handler_kwargs):
+    return vars(handler_kwargs) if handler_kwargs is not None else {}
 
 
 def main():
@@ -448,17 +459,12 @@ def main():
         module_kwargs,
         socket_receiver_kwargs,
         socket_sender_kwargs,
+        session_server_kwargs,
+        queue_kwargs,
         vad_handler_kwargs,
-        whisper_stt_handler_kwargs,
-        paraformer_stt_handler_kwargs,
-        faster_whisper_stt_handler_kwargs,  # Add this line
-        language_model_handler_kwargs,
-        open_api_language_model_handler_kwargs,
-        mlx_language_model_handler_kwargs,
-        parler_tts_handler_kwargs,
-        melo_tts_handler_kwargs,
-        chat_tts_handler_kwargs,
-        facebook_mms_tts_handler_kwargs,
+        stt_handler_kwargs,
+        llm_handler_kwargs,
+        tts_handler_kwargs,
     ) = parse_arguments()
 
     setup_logger(module_kwargs.log_level)
@@ -466,52 +472,59 @@ def main():
 
     prepare_all_args(
         module_kwargs,
-        whisper_stt_handler_kwargs,
-        paraformer_stt_handler_kwargs,
-        faster_whisper_stt_handler_kwargs,  # Add this line
-        language_model_handler_kwargs,
-        open_api_language_model_handler_kwargs,
-        mlx_language_model_handler_kwargs,
-        parler_tts_handler_kwargs,
-        melo_tts_handler_kwargs,
-        chat_tts_handler_kwargs,
-        facebook_mms_tts_handler_kwargs,
+        stt_handler_kwargs,
+        llm_handler_kwargs,
+        tts_handler_kwargs,
+    )
+
+    # caching allows ~50% compilation time reduction, and the warmups are skipped on a hit
+    # see https://docs.google.com/document/d/1y5CRfMLdwEoF1nTk9q8qEu1mgMUuUtvhklPKJ2emLU8/edit#heading=h.o2asbxsrp1ma
+    compile_cache = configure_compile_cache(
+        module_kwargs.compile_cache_dir or os.path.join(CURRENT_DIR, "tmp"),
+        max_bytes=int(module_kwargs.compile_cache_max_gb * 2**30),
     )
 
-    queues_and_events = initialize_queues_and_events()
+    queues_and_events = initialize_queues_and_events(queue_kwargs)
+    register_queues([queues_and_events[name] for name in PIPELINE_QUEUES])
+    metrics_server = None
+    if module_kwargs.metrics_port:
+        metrics_server = MetricsServer(module_kwargs.metrics_host, module_kwargs.metrics_port)
+        metrics_server.start()
 
     pipeline_manager = build_pipeline(
         module_kwargs,
         socket_receiver_kwargs,
         socket_sender_kwargs,
+        session_server_kwargs,
         vad_handler_kwargs,
-        whisper_stt_handler_kwargs,
-        faster_whisper_stt_handler_kwargs,  # Add this line
-        paraformer_stt_handler_kwargs,
-        language_model_handler_kwargs,
-        open_api_language_model_handler_kwargs,
-        mlx_language_model_handler_kwargs,
-        parler_tts_handler_kwargs,
-        melo_tts_handler_kwargs,
-        chat_tts_handler_kwargs,
-        facebook_mms_tts_handler_kwargs,
+        stt_handler_kwargs,
+        llm_handler_kwargs,
+        tts_handler_kwargs,
         queues_and_events,
     )
+    compile_cache.report()
 
     try:
         logger.info("正在启动所有组件...")
         pipeline_manager.start()
         logger.info("所有组件启动完成")
         
+        seconds = 0
         while not queues_and_events["stop_event"].is_set():
             try:
                 queues_and_events["stop_event"].wait(1)
+                seconds += 1
+                if seconds % 10 == 0:
+                    log_queue_stats(queues_and_events, logging.DEBUG)
             except KeyboardInterrupt:
                 logging.info("收到停止信号")
                 queues_and_events["stop_event"].set()
                 break
     finally:
         pipeline_manager.stop()
+        log_queue_stats(queues_and_events)
+        if metrics_server is not None:
+            metrics_server.stop()
         logging.info("Pipeline 已停止")
 
 
@@ -0,0 +1,94 @@
+import threading
+
+from baseHandler import BaseHandler
+from utils.queues import BoundedQueue
+from utils.session import Session, SessionMessage
+
+
+class DoublingHandler(BaseHandler):
+    def setup(self, batch_size=1):
+        self.batch_size = batch_size
+        self.batches = []
+
+    def process(self, number):
+        yield 2 * number
+
+    def process_batch(self, inputs):
+        self.batches.append([number for _, _, number in inputs])
+        for session, turn, number in inputs:
+            yield session, turn, self.process(number)
+
+
+class TurnStartingHandler(DoublingHandler):
+    starts_turns = True
+
+    def process(self, number):
+        if number < 0:
+            self.interruption.interrupt()
+        yield number
+
+
+def run(handler_class, inputs, interrupted=(), **setup_kwargs):
+    queue_in, queue_out = BoundedQueue(), BoundedQueue()
+    handler = handler_class(threading.Event(), queue_in, queue_out, setup_kwargs=setup_kwargs)
+    for session in interrupted:
+        handler.interruptions.for_session(session).interrupt()
+    for input in inputs:
+        queue_in.put(input)
+    queue_in.put(b"END")
+    handler.run()
+    outputs = []
+    while not queue_out.empty():
+        outputs.append(queue_out.get())
+    assert outputs.pop() == b"END"
+    return handler, outputs
+
+
+def test_outputs_are_tagged_with_session_and_turn():
+    session = Session()
+    _, outputs = run(DoublingHandler, [SessionMessage(session, 1, 0), 2])
+    assert (outputs[0].session, outputs[0].payload, outputs[0].turn) == (session, 2, 0)
+    assert outputs[1] == 4
+
+
+def test_inputs_of_closed_sessions_and_cancelled_turns_are_skipped():
+    session, closed = Session(), Session()
+    closed.close()
+    _, outputs = run(
+        DoublingHandler,
+        [SessionMessage(closed, 1, 0), SessionMessage(session, 2, 0), SessionMessage(session, 3, 1)],
+        interrupted=[session],
+    )
+    assert [(output.payload, output.turn) for output in outputs] == [(6, 1)]
+
+
+def test_batches():
+    sessions = [Session(), Session()]
+    inputs = [SessionMessage(sessions[number % 2], number, 0) for number in range(5)]
+    handler, outputs = run(DoublingHandler, inputs, batch_size=3)
+    assert handler.batches == [[0, 1, 2], [3, 4]]
+    assert [(output.session, output.payload) for output in outputs] == [
+        (sessions[number % 2], 2 * number) for number in range(5)
+    ]
+
+
+def test_turn_starting_handler_tags_the_new_turn():
+    session = Session()
+    _, outputs = run(
+        TurnStartingHandler, [SessionMessage(session, number) for number in (1, -1, 2)]
+    )
+    assert [(output.payload, output.turn) for output in outputs] == [(1, 0), (-1, 1), (2, 1)]
+
+
+class TwoOutputsHandler(DoublingHandler):
+    def process(self, number):
+        yield number
+        yield 2 * number
+
+
+def test_first_output_time_observed_for_every_input_of_a_batch():
+    inputs = [SessionMessage(Session(), number, 0) for number in range(5)]
+    handler, outputs = run(TwoOutputsHandler, inputs, batch_size=3)
+    assert len(outputs) == 10
+    # the series are shared by the handlers of a class, this class is only run here
+    assert handler.metrics.first_output_seconds.count == 5
@@ -0,0 +1,113 @@
+import socket
+
+import numpy as np
+import pytest
+
+from utils.buffers import ChunkRing, SpeechBuffer
+
+
+@pytest.fixture
+def connection():
+    client, server = socket.socketpair()
+    yield client, server
+    client.close()
+    server.close()
+
+
+def send_chunk(client, value, n_samples=4):
+    client.sendall(np.full(n_samples, value, dtype=np.int16).tobytes())
+
+
+def test_chunk_ring_reuses_released_slots(connection):
+    client, server = connection
+    ring = ChunkRing(8, slots=4)
+    for value in range(10):
+        send_chunk(client, value)
+        assert ring.recv_into(server).tolist() == [value] * 4
+    assert len(ring.buffers) == 1
+
+
+def test_chunk_ring_never_overwrites_held_chunks(connection):
+    client, server = connection
+    ring = ChunkRing(8, slots=3)
+    held = []
+    for value in range(6):
+        send_chunk(client, value)
+        # a view of the view still holds the slot
+        held.append(ring.recv_into(server).reshape(-1))
+    assert [chunk.tolist() for chunk in held] == [[value] * 4 for value in range(6)]
+    assert len(ring.buffers) == 3
+    assert ring.overflows == 3
+
+
+def test_chunk_ring_partial_chunk(connection):
+    client, server = connection
+    ring = ChunkRing(8)
+    send_chunk(client, 7, n_samples=2)
+    assert ring.recv_into(server, 4).tolist() == [7, 7]
+
+
+def test_chunk_ring_closed_connection(connection):
+    client, server = connection
+    ring = ChunkRing(8)
+    client.close()
+    assert ring.recv_into(server) is None
+
+
+def samples(start, stop):
+    return np.arange(start, stop, dtype=np.float32)
+
+
+def test_speech_buffer_pre_roll():
+    buffer = SpeechBuffer(pre_roll_samples=4)
+    buffer.listen(samples(0, 3))
+    buffer.listen(samples(3, 6))
+    buffer.start()
+    buffer.append(samples(6, 8))
+    assert buffer.take().tolist() == list(range(2, 8))
+
+
+def test_speech_buffer_pre_roll_longer_chunk():
+    buffer = SpeechBuffer(pre_roll_samples=4)
+    buffer.listen(samples(0, 10))
+    buffer.start()
+    assert buffer.take().tolist() == [6, 7, 8, 9]
+
+
+def test_speech_buffer_given_pre_roll():
+    buffer = SpeechBuffer(pre_roll_samples=4)
+    buffer.listen(samples(0, 4))
+    buffer.start(pre_roll=samples(10, 12))
+    buffer.append(samples(12, 13))
+    assert buffer.take().tolist() == [10, 11, 12]
+
+
+def test_speech_buffer_trailing_silence_is_padded():
+    buffer = SpeechBuffer(pad_samples=3)
+    buffer.start()
+    buffer.append(samples(0, 4))
+    buffer.append(samples(4, 6), speech=False)
+    buffer.append(samples(6, 10), speech=False)
+    assert buffer.take().tolist() == list(range(7))
+
+
+def test_speech_buffer_grows_and_take_keeps_the_view():
+    buffer = SpeechBuffer(capacity=4)
+    buffer.start()
+    buffer.append(samples(0, 3))
+    buffer.append(samples(3, 10))
+    utterance = buffer.take()
+    buffer.start()
+    buffer.append(samples(100, 110))
+    assert utterance.tolist() == list(range(10))
+    assert len(buffer) == 10
+
+
+def test_speech_buffer_segments():
+    buffer = SpeechBuffer()
+    buffer.start()
+    buffer.append(samples(0, 3))
+    assert buffer.segment().tolist() == [0, 1, 2]
+    buffer.append(samples(3, 5))
+    assert buffer.segment().tolist() == [3, 4]
+    assert buffer.segment().tolist() == []
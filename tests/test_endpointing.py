@@ -0,0 +1,75 @@
+import pytest
+
+from VAD.endpointing import AdaptiveEndpointer, turn_completeness
+
+RATE = 16000
+LONG_UTTERANCE = 5 * RATE
+
+
+@pytest.mark.parametrize(
+    "text, completeness",
+    [
+        ("", 0),
+        ("I'd like a coffee.", 1),
+        ("Is it raining?", 1),
+        ("I'd like a coffee and", -1),
+        ("So I went there, um", -1),
+        ("I'd like a coffee", 0),
+    ],
+)
+def test_turn_completeness(text, completeness):
+    assert turn_completeness(text) == completeness
+
+
+def endpointer():
+    return AdaptiveEndpointer(
+        sampling_rate=RATE, threshold=0.3, min_silence_ms=1000, min_endpoint_ms=200, max_endpoint_ms=2000
+    )
+
+
+def test_default_wait():
+    assert endpointer().silence(0.05, LONG_UTTERANCE) == RATE
+
+
+def test_silence_probability():
+    # a clean drop shortens the wait, a probability lingering below the silence threshold lengthens it
+    assert endpointer().silence(0.0, LONG_UTTERANCE) == 0.75 * RATE
+    assert endpointer().silence(0.14, LONG_UTTERANCE) == 1.25 * RATE
+
+
+def test_short_utterance():
+    assert endpointer().silence(0.05, RATE // 2) == 0.8 * RATE
+
+
+def test_fluent_speaker():
+    stream = endpointer()
+    for _ in range(3):
+        for _ in range(10):
+            stream.resume(0.2 * RATE)
+        stream.end(RATE)
+    assert stream.silence(0.05, LONG_UTTERANCE) == pytest.approx(0.3 * RATE)
+
+
+def test_turn_ends_keep_the_wait():
+    # with a few pauses per turn, the turn ends may be long pauses: the wait does not shrink
+    stream = endpointer()
+    for _ in range(5):
+        stream.resume(0.2 * RATE)
+        stream.resume(0.3 * RATE)
+        stream.end(RATE)
+    assert stream.silence(0.05, LONG_UTTERANCE) == RATE
+
+
+def test_hesitant_speaker():
+    stream = endpointer()
+    for _ in range(4):
+        stream.resume(0.9 * RATE)
+        stream.end(RATE)
+    assert stream.silence(0.05, LONG_UTTERANCE) == pytest.approx(1.35 * RATE)
+
+
+def test_bounds():
+    stream = endpointer()
+    for _ in range(4):
+        stream.resume(1.9 * RATE)
+    assert stream.silence(0.14, LONG_UTTERANCE) == 2 * RATE
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from VAD.framing import AudioFramer, StreamingResampler, model_sampling_rate, window_size
+
+
+def test_model_sampling_rate():
+    assert model_sampling_rate(8000) == 8000
+    assert model_sampling_rate(16000) == 16000
+    assert model_sampling_rate(44100) == 16000
+    assert window_size(16000) == 512 and window_size(8000) == 256
+
+
+@pytest.mark.parametrize("chunk_samples", [100, 512, 1000, 3000])
+def test_framer_windows(chunk_samples):
+    audio = np.random.default_rng(0).integers(-32768, 32767, 10000, dtype=np.int16)
+    framer = AudioFramer()
+    windows = []
+    for start in range(0, len(audio), chunk_samples):
+        windows.extend(window.copy() for window in framer.push(audio[start : start + chunk_samples]))
+    assert len(windows) == len(audio) // 512
+    expected = audio[: len(windows) * 512].astype(np.float32) / 32768
+    np.testing.assert_array_equal(np.concatenate(windows), expected)
+
+
+def test_framer_accepts_bytes_and_float32():
+    framer = AudioFramer()
+    assert framer.push(np.ones(300, dtype=np.int16).tobytes()).shape == (0, 512)
+    windows = framer.push(np.full(300, 0.5, dtype=np.float32))
+    assert windows.shape == (1, 512)
+    assert windows[0, 0] == np.float32(1 / 32768) and windows[0, -1] == 0.5
+
+
+def test_framer_reset():
+    framer = AudioFramer()
+    framer.push(np.ones(300, dtype=np.int16))
+    framer.reset()
+    assert framer.push(np.ones(300, dtype=np.int16)).shape == (0, 512)
+
+
+def test_framer_resamples():
+    framer = AudioFramer(sampling_rate=48000, model_sampling_rate=16000)
+    n_windows = sum(len(framer.push(np.zeros(4800, dtype=np.int16))) for _ in range(10))
+    # 1 s at 48 kHz is 16000 samples once resampled
+    assert n_windows == 16000 // 512
+
+
+@pytest.mark.parametrize("orig_freq, new_freq", [(48000, 16000), (44100, 16000), (8000, 16000)])
+def test_resampler_chunking_is_seamless(orig_freq, new_freq):
+    signal = np.random.default_rng(0).standard_normal(orig_freq).astype(np.float32)
+    whole = StreamingResampler(orig_freq, new_freq)(signal)
+    resampler = StreamingResampler(orig_freq, new_freq)
+    chunked = np.concatenate([resampler(signal[start : start + 997]) for start in range(0, len(signal), 997)])
+    np.testing.assert_allclose(chunked, whole, atol=1e-5)
+    assert abs(len(whole) - new_freq) <= 1
+
+
+def test_resampler_keeps_a_tone_and_removes_aliases():
+    t = np.arange(48000) / 48000
+    resampler = StreamingResampler(48000, 16000)
+    tone = resampler(np.sin(2 * np.pi * 1000 * t).astype(np.float32))
+    alias = StreamingResampler(48000, 16000)(np.sin(2 * np.pi * 12000 * t).astype(np.float32))
+    # past the filter delay
+    assert np.abs(tone[200:]).max() == pytest.approx(1, abs=0.05)
+    assert np.abs(alias[200:]).max() < 0.05
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def imported_modules(statement):
+    """
+    Top-level packages imported by `statement` in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys\n{statement}\nprint(' '.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {module.split(".")[0] for module in result.stdout.split()}
+
+
+@pytest.mark.parametrize("module", ["VAD.vad_handler", "VAD.vad_iterator", "VAD.batched_vad", "VAD.onnx_vad"])
+def test_onnx_vad_does_not_import_torch(module):
+    assert "torch" not in imported_modules(f"import {module}")
+
+
+def test_pipeline_does_not_import_heavy_packages():
+    assert not {"torch", "transformers", "nltk"} & imported_modules("import s2s_pipeline")
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from STT.log_mel import LogMelExtractor
+
+RNG = np.random.default_rng(0)
+MEL_FILTERS = RNG.random((201, 80)).astype(np.float32) * 0.01
+
+
+def reference_log_mel(audio, mel_filters=MEL_FILTERS, n_samples=480000):
+    """
+    Features of the HF WhisperFeatureExtractor: audio zero-padded to 30 s, centered frames with reflect padding.
+    """
+    waveform = np.zeros(n_samples)
+    waveform[: min(len(audio), n_samples)] = audio[:n_samples]
+    padded = np.pad(waveform, 200, mode="reflect")
+    window = np.hanning(401)[:-1]
+    frames = np.stack([padded[i * 160 : i * 160 + 400] for i in range(n_samples // 160 + 1)])
+    power = np.abs(np.fft.rfft(frames * window, axis=-1)) ** 2
+    log_mel = np.log10(np.maximum(power @ mel_filters.astype(np.float64), 1e-10))[:-1].T
+    log_mel = np.maximum(log_mel, log_mel.max() - 8.0)
+    return (log_mel + 4.0) / 4.0
+
+
+def utterance(n_samples):
+    return ((RNG.random(n_samples) - 0.5) * 0.3).astype(np.float32)
+
+
+@pytest.mark.parametrize("n_samples", [100, 3000, 48123, 480000, 500000])
+def test_matches_reference(n_samples):
+    audio = utterance(n_samples)
+    features = LogMelExtractor(MEL_FILTERS)(audio)
+    assert features.shape == (80, 3000)
+    np.testing.assert_allclose(features, reference_log_mel(audio), atol=1e-4)
+
+
+def test_trimmed_batch():
+    extractor = LogMelExtractor(MEL_FILTERS, n_frames=None)
+    audios = [utterance(16000), utterance(8000)]
+    batch = extractor.batch(audios)
+    assert batch.shape == (2, 80, 100)
+    np.testing.assert_array_equal(batch[0], extractor(audios[0]))
+    # the shorter utterance is normalized as if followed by silence, its padding frames match its own silent frames
+    padded = np.concatenate((audios[1], np.zeros(8000, dtype=np.float32)))
+    np.testing.assert_allclose(batch[1], extractor(padded), atol=1e-6)
+    assert batch[1, :, -1].min() == batch[1].min()
+
+
+def test_matches_hf_feature_extractor():
+    transformers = pytest.importorskip("transformers")
+    feature_extractor = transformers.WhisperFeatureExtractor(feature_size=80)
+    extractor = LogMelExtractor(
+        feature_extractor.mel_filters,
+        n_fft=feature_extractor.n_fft,
+        hop_length=feature_extractor.hop_length,
+        n_frames=feature_extractor.nb_max_frames,
+    )
+    audios = [utterance(48123), utterance(16000)]
+    expected = feature_extractor(audios, sampling_rate=16000, return_tensors="np").input_features
+    np.testing.assert_allclose(extractor.batch(audios), expected, atol=1e-4)
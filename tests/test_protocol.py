@@ -0,0 +1,159 @@
+import asyncio
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from connections.protocol import (
+    HEADER,
+    FrameReader,
+    FrameType,
+    FrameWriter,
+    ProtocolError,
+    StreamState,
+    config_payload,
+    handle_client_frame,
+    parse_header,
+    read_frame,
+)
+from utils.buffers import ChunkRing
+
+
+@pytest.fixture
+def connection():
+    client, server = socket.socketpair()
+    yield client, server
+    client.close()
+    server.close()
+
+
+def audio(value, n_samples):
+    return np.full(n_samples, value, dtype=np.int16)
+
+
+def test_encode_header():
+    writer = FrameWriter()
+    writer.encode(FrameType.START)
+    frame = writer.encode(FrameType.AUDIO, audio(1, 4), timestamp=123)
+    assert len(frame) == HEADER.size + 8
+    assert parse_header(frame[: HEADER.size]) == (FrameType.AUDIO, 0, 1, 123, 8)
+
+
+def test_invalid_header():
+    with pytest.raises(ProtocolError):
+        parse_header(b"XX" + bytes(HEADER.size - 2))
+    header = bytearray(FrameWriter().encode(FrameType.STOP))
+    header[2] = 200
+    with pytest.raises(ProtocolError):
+        parse_header(bytes(header))
+
+
+@pytest.mark.parametrize("ring", [None, ChunkRing(1024)])
+def test_reader_keeps_queued_audio(connection, ring):
+    client, server = connection
+    writer = FrameWriter()
+    # frames larger than the slots of the ring
+    for value in range(4):
+        client.sendall(writer.encode(FrameType.AUDIO, audio(value, 1024), timestamp=value))
+    reader = FrameReader(server, ring=ring)
+    state = StreamState()
+    should_listen = threading.Event()
+    should_listen.set()
+    queued = []
+    for _ in range(4):
+        assert handle_client_frame(reader.read(), state, should_listen, queued.append)
+    assert [chunk.tolist() for chunk in queued] == [[value] * 1024 for value in range(4)]
+    assert state.capture_timestamp == 3
+
+
+def test_reader_payload_size_limit(connection):
+    client, server = connection
+    client.sendall(FrameWriter().encode(FrameType.AUDIO, audio(0, 64)))
+    with pytest.raises(ProtocolError):
+        FrameReader(server, max_payload_size=64).read()
+
+
+def test_reader_closed_connection(connection):
+    client, server = connection
+    client.sendall(FrameWriter().encode(FrameType.AUDIO, audio(0, 64))[:30])
+    client.close()
+    assert FrameReader(server).read() is None
+
+
+def read_frames(data, **kwargs):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        frames = []
+        while (frame := await read_frame(reader, **kwargs)) is not None:
+            frames.append(frame)
+        return frames
+
+    return asyncio.run(read())
+
+
+def test_read_frame():
+    writer = FrameWriter()
+    frames = read_frames(
+        writer.encode(FrameType.CONFIG, config_payload(codec="pcm"))
+        + writer.encode(FrameType.AUDIO, audio(5, 8), timestamp=7)
+    )
+    assert [(frame.frame_type, frame.seq) for frame in frames] == [(FrameType.CONFIG, 0), (FrameType.AUDIO, 1)]
+    assert np.frombuffer(frames[1].payload, dtype=np.int16).tolist() == [5] * 8
+
+
+def test_read_frame_payload_size_limit():
+    with pytest.raises(ProtocolError):
+        read_frames(FrameWriter().encode(FrameType.AUDIO, audio(0, 64)), max_payload_size=64)
+
+
+def test_handle_client_frame():
+    writer = FrameWriter()
+    state = StreamState()
+    should_listen = threading.Event()
+    queued = []
+
+    def handle(data):
+        frame = read_frames(data)[0]
+        return handle_client_frame(frame, state, should_listen, queued.append)
+
+    first_audio = writer.encode(FrameType.AUDIO, audio(1, 4))
+    assert handle(writer.encode(FrameType.CONFIG, config_payload(codec="pcm")))
+    # not listening yet
+    assert handle(first_audio) and queued == []
+    assert handle(writer.encode(FrameType.START)) and should_listen.is_set()
+    assert handle(writer.encode(FrameType.AUDIO, audio(2, 4)))
+    # replayed
+    assert handle(first_audio)
+    assert [chunk.tolist() for chunk in queued] == [[2] * 4]
+    assert state.dropped_frames == 1
+    assert not handle(writer.encode(FrameType.STOP))
+
+
+def test_invalid_config():
+    state = StreamState()
+    frame = read_frames(FrameWriter().encode(FrameType.CONFIG, config_payload(codec="mp3")))[0]
+    with pytest.raises(ValueError):
+        handle_client_frame(frame, state, threading.Event(), None)
+
+
+def test_stale_frames_dropped():
+    writer = FrameWriter()
+    state = StreamState(max_lag_ms=100)
+    # the client clock is 5 s ahead of the server: only the variations of the delay count
+    frames = [read_frames(writer.encode(FrameType.AUDIO, audio(1, 4), timestamp=t))[0] for t in (5_000_000, 5_020_000)]
+    assert state.accept(frames[0], arrival_us=10_000)
+    # 150 ms later than the delay of the first frame
+    assert not state.accept(frames[1], arrival_us=180_000)
+    assert state.stale_frames == 1 and state.dropped_frames == 0
+    frame = read_frames(writer.encode(FrameType.AUDIO, audio(1, 4), timestamp=5_200_000))[0]
+    assert state.accept(frame, arrival_us=250_000)
+
+
+def test_stale_frames_kept_without_max_lag():
+    writer = FrameWriter()
+    state = StreamState()
+    for timestamp, arrival_us in ((1_000, 1_000), (2_000, 9_000_000)):
+        assert state.accept(read_frames(writer.encode(FrameType.AUDIO, audio(1, 4), timestamp=timestamp))[0], arrival_us)
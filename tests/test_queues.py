@@ -0,0 +1,91 @@
+import threading
+from queue import Full
+
+import pytest
+
+from utils.queues import BoundedQueue, is_marker
+
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_is_marker():
+    assert is_marker(b"END") and is_marker(b"INTERRUPT")
+    assert not is_marker(b"\x00\x01") and not is_marker("END")
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        BoundedQueue(4, "drop_random")
+
+
+def test_drop_oldest():
+    queue = BoundedQueue(3, "drop_oldest")
+    for item in range(5):
+        queue.put(item)
+    assert drain(queue) == [2, 3, 4]
+    assert queue.dropped == 2
+    assert queue.high_water_mark == 3
+
+
+def test_drop_newest():
+    queue = BoundedQueue(3, "drop_newest")
+    for item in range(5):
+        queue.put(item)
+    assert drain(queue) == [0, 1, 2]
+    assert queue.dropped == 2
+
+
+def test_drop_oldest_keeps_markers():
+    queue = BoundedQueue(2, "drop_oldest")
+    queue.put(b"INTERRUPT")
+    queue.put(0)
+    queue.put(1)
+    assert drain(queue) == [b"INTERRUPT", 0]
+    assert queue.dropped == 1
+
+
+def test_block():
+    queue = BoundedQueue(1, "block")
+    queue.put(0)
+    with pytest.raises(Full):
+        queue.put(1, block=False)
+    with pytest.raises(Full):
+        queue.put(1, timeout=0.01)
+    producer = threading.Thread(target=queue.put, args=(1,))
+    producer.start()
+    assert queue.get() == 0
+    producer.join(1)
+    assert drain(queue) == [1]
+    assert queue.dropped == 0
+
+
+def test_markers_bypass_bound():
+    queue = BoundedQueue(1, "block")
+    queue.put(0)
+    queue.put(b"END")
+    assert queue.qsize() == 2
+
+
+def test_end_releases_blocked_producers():
+    queue = BoundedQueue(1, "block")
+    queue.put(0)
+    producer = threading.Thread(target=queue.put, args=(1,))
+    producer.start()
+    queue.put(b"END")
+    producer.join(1)
+    assert not producer.is_alive()
+    assert drain(queue) == [0, b"END"]
+    assert queue.dropped == 1
+
+
+def test_last_wait():
+    queue = BoundedQueue()
+    queue.put(0)
+    assert queue.last_wait is None
+    queue.get()
+    assert queue.last_wait >= 0
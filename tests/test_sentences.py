@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from LLM.sentences import SentenceSplitter
+
+
+def split(text):
+    splitter = SentenceSplitter()
+    sentences = splitter.push(text)
+    rest = splitter.flush()
+    return sentences + [rest] if rest else sentences
+
+
+@pytest.mark.parametrize(
+    "text, sentences",
+    [
+        ("He said no. The end.", ["He said no.", "The end."]),
+        ("Plan A. Then we go.", ["Plan A.", "Then we go."]),
+        ("Go to St. Louis. Now.", ["Go to St.", "Louis.", "Now."]),
+        ("See No. 5 for details. Next.", ["See No. 5 for details.", "Next."]),
+        ("Dr. Smith met Mrs. Jones. Yes!", ["Dr. Smith met Mrs. Jones.", "Yes!"]),
+        ("They live in the U.S. and like it. Sure.", ["They live in the U.S. and like it.", "Sure."]),
+        ("It was e.g. fine. Sure.", ["It was e.g. fine.", "Sure."]),
+        ("Pi is 3.14 today. Ok.", ["Pi is 3.14 today.", "Ok."]),
+        ("1. First item", ["1. First item"]),
+        ("I won. he lost.", ["I won. he lost."]),
+        ("Wait... What?! Ok.", ["Wait...", "What?!", "Ok."]),
+        ('He said "Stop." Then left.', ['He said "Stop."', "Then left."]),
+        ("Line one\nLine two", ["Line one", "Line two"]),
+        ("你好。我很好！", ["你好。", "我很好！"]),
+        ("「はい。」そうです。", ["「はい。」", "そうです。"]),
+    ],
+)
+def test_split(text, sentences):
+    assert split(text) == sentences
+
+
+def test_sentence_returned_once_confirmed():
+    splitter = SentenceSplitter()
+    assert splitter.push("Hello there.") == []
+    assert splitter.push(" ") == []
+    assert splitter.push("How") == ["Hello there."]
+    assert splitter.flush() == "How"
+
+
+def test_no_before_a_number_waits_for_the_digit():
+    splitter = SentenceSplitter()
+    assert splitter.push("Call no. ") == []
+    assert splitter.push("5 now.") == []
+    assert splitter.flush() == "Call no. 5 now."
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_chunking_does_not_change_the_sentences(seed):
+    text = (
+        'He said no. The end. Dr. Smith arrived at 3.14 p.m. "Really?" she asked. Plan A. Then No. 5 won!\n'
+        "1. First\n2. Second\n你好。我很好！ Wait... What?"
+    )
+    rng = random.Random(seed)
+    splitter = SentenceSplitter()
+    sentences = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 6)
+        sentences += splitter.push(text[position : position + size])
+        position += size
+    sentences.append(splitter.flush())
+    assert sentences == split(text)
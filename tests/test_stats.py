@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from utils.stats import StreamingStats
+
+
+def test_empty():
+    stats = StreamingStats()
+    assert stats.last is None and stats.mean is None and stats.quantile(0.5) is None
+    assert repr(stats) == "no values"
+    assert len(stats.recent()) == 0
+
+
+@pytest.mark.parametrize("q", [0.01, 0.25, 0.5, 0.9, 0.95, 0.99])
+def test_quantiles_within_relative_accuracy(q):
+    values = np.random.default_rng(0).lognormal(mean=-3, sigma=1.5, size=20000)
+    stats = StreamingStats(relative_accuracy=0.01)
+    for value in values:
+        stats.add(value)
+    exact = np.quantile(values, q, method="lower")
+    assert stats.quantile(q) == pytest.approx(exact, rel=0.011)
+
+
+def test_extreme_quantiles_are_exact():
+    stats = StreamingStats()
+    for value in (0.2, 0.003, 1.7, 0.05):
+        stats.add(value)
+    assert stats.quantile(0) == 0.003
+    assert stats.quantile(1) == 1.7
+    assert stats.min == 0.003 and stats.max == 1.7
+
+
+def test_summary():
+    stats = StreamingStats()
+    for value in (1.0, 2.0, 3.0):
+        stats.add(value)
+    assert stats.count == 3 and stats.mean == 2.0 and stats.last == 3.0
+    assert set(stats.percentiles()) == {"p50", "p95", "p99"}
+
+
+def test_values_out_of_range_are_clamped():
+    stats = StreamingStats(min_value=1e-3, max_value=10)
+    stats.add(0.0)
+    stats.add(100.0)
+    assert stats.buckets.sum() == 2
+    assert stats.quantile(0) == 0.0 and stats.quantile(1) == 100.0
+
+
+def test_recent_ring():
+    stats = StreamingStats(ring_size=4)
+    for value in range(6):
+        stats.add(float(value))
+    assert stats.recent().tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert stats.last == 5.0
+    assert stats.count == 6
@@ -0,0 +1,181 @@
+import logging
+import weakref
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkRing:
+    """
+    Ring of receive buffers, filled with `socket.recv_into` so that receiving audio chunks allocates no buffer once the
+    ring has grown to the lag of the consumer.
+    Each received chunk is returned as a NumPy view on its slot. A slot is only reused once the views handed out on it
+    have been released, whatever the lag of the consumer: while they are alive, a new slot is added to the ring, up to
+    `slots`, and beyond that chunks are received in buffers of their own (a warning is logged).
+    """
+
+    def __init__(self, chunk_size, slots=64, dtype=np.int16):
+        self.chunk_size = chunk_size
+        self.slots = slots
+        self.dtype = dtype
+        self.buffers = []
+        self.views = []
+        # weak reference to the array handed out on each slot, alive while the consumer holds a view on it
+        self.leases = []
+        self.index = 0
+        self.overflows = 0
+
+    def next_buffer(self):
+        """
+        Returns the index of a free slot, adding one to the ring when the next slot is still in use, or None when the
+        ring is full.
+        """
+        if self.buffers:
+            self.index %= len(self.buffers)
+            lease = self.leases[self.index]
+            if lease is None or lease() is None:
+                return self.index
+        if len(self.buffers) >= self.slots:
+            return None
+        # the new slot comes before the busy one, which is tried again once the ring has gone round
+        buffer = bytearray(self.chunk_size)
+        self.buffers.insert(self.index, buffer)
+        self.views.insert(self.index, memoryview(buffer))
+        self.leases.insert(self.index, None)
+        return self.index
+
+    def recv_into(self, conn, nbytes=None):
+        """
+        Receives exactly `nbytes` (default: one full chunk) from `conn` in a free slot.
+        Returns the NumPy view on the received data, or None when the connection is closed.
+        """
+        if nbytes is None:
+            nbytes = self.chunk_size
+        index = self.next_buffer()
+        if index is None:
+            self.overflows += 1
+            if self.overflows == 1 or self.overflows % 100 == 0:
+                logger.warning(
+                    f"The {self.slots} receive buffers hold audio not processed yet, "
+                    f"{self.overflows} chunk(s) received in new buffers so far"
+                )
+            buffer = bytearray(self.chunk_size)
+            view = memoryview(buffer)
+        else:
+            buffer = self.buffers[index]
+            view = self.views[index]
+        received = conn.recv_into(view, nbytes)
+        while 0 < received < nbytes:
+            packet_size = conn.recv_into(view[received:nbytes])
+            if packet_size == 0:
+                received = 0
+                break
+            received += packet_size
+        if received == 0:
+            # connection closed
+            return None
+        array = np.frombuffer(buffer, dtype=self.dtype)
+        if index is not None:
+            # views of the returned array, sliced or reshaped, keep it alive
+            self.leases[index] = weakref.ref(array)
+            self.index = index + 1
+        if nbytes < self.chunk_size:
+            array = array[: nbytes // array.itemsize]
+        return array
+
+
+class SpeechBuffer:
+    """
+    Accumulates the audio of an utterance in a preallocated float32 array, grown by doubling when needed.
+    While no speech is detected, the last `pre_roll_samples` samples are kept in a small ring with `listen`, and copied at
+    the start of the utterance by `start`, so that the onset of the speech is not cut. Audio appended with `speech=False`
+    (trailing silence) is only kept up to `pad_samples` after the last speech.
+    `take` hands the utterance over as a view, without copy: the buffer then starts over with a new array, so the view
+    stays valid for the consumer. Likewise, `segment` hands over the audio appended since the previous segment.
+    """
+
+    def __init__(self, pre_roll_samples=0, pad_samples=0, capacity=16000 * 10):
+        self.pre_roll = np.zeros(pre_roll_samples, dtype=np.float32)
+        self.pre_roll_pos = 0
+        self.pre_roll_filled = 0
+        self.pad_samples = pad_samples
+        self.data = np.empty(capacity, dtype=np.float32)
+        self.length = 0
+        self.speech_end = 0
+        self.segment_start = 0
+
+    def listen(self, samples):
+        """
+        Keeps the last samples heard before the speech.
+        """
+        size = len(self.pre_roll)
+        if size == 0:
+            return
+        if len(samples) >= size:
+            self.pre_roll[:] = samples[-size:]
+            self.pre_roll_pos = 0
+            self.pre_roll_filled = size
+            return
+        first = min(len(samples), size - self.pre_roll_pos)
+        self.pre_roll[self.pre_roll_pos : self.pre_roll_pos + first] = samples[:first]
+        self.pre_roll[: len(samples) - first] = samples[first:]
+        self.pre_roll_pos = (self.pre_roll_pos + len(samples)) % size
+        self.pre_roll_filled = min(size, self.pre_roll_filled + len(samples))
+
+    def start(self, pre_roll=None):
+        """
+        Starts an utterance with the pre-roll, or with the given `pre_roll` samples when the caller keeps them.
+        """
+        if pre_roll is not None:
+            self.reserve(len(pre_roll))
+            self.data[: len(pre_roll)] = pre_roll
+            self.length = self.speech_end = len(pre_roll)
+            self.segment_start = 0
+            return
+        filled = self.pre_roll_filled
+        oldest = (self.pre_roll_pos - filled) % max(len(self.pre_roll), 1)
+        first = min(filled, len(self.pre_roll) - oldest)
+        self.reserve(filled)
+        self.data[:first] = self.pre_roll[oldest : oldest + first]
+        self.data[first:filled] = self.pre_roll[: filled - first]
+        self.length = self.speech_end = filled
+        self.segment_start = 0
+        self.pre_roll_filled = 0
+
+    def reserve(self, size):
+        if size <= len(self.data):
+            return
+        data = np.empty(max(size, 2 * len(self.data)), dtype=np.float32)
+        data[: self.length] = self.data[: self.length]
+        self.data = data
+
+    def append(self, samples, speech=True):
+        if not speech and self.length >= self.speech_end + self.pad_samples:
+            return
+        end = self.length + len(samples)
+        self.reserve(end)
+        self.data[self.length : end] = samples
+        self.length = end
+        if speech:
+            self.speech_end = end
+
+    def take(self):
+        """
+        Returns the utterance, padded with at most `pad_samples` of trailing silence, as a view.
+        """
+        utterance = self.data[: min(self.length, self.speech_end + self.pad_samples)]
+        self.data = np.empty(len(self.data), dtype=np.float32)
+        self.length = self.speech_end = self.segment_start = 0
+        return utterance
+
+    def segment(self):
+        """
+        Returns the audio appended since the previous segment as a view, and starts a new segment.
+        """
+        segment = self.data[self.segment_start : self.length]
+        self.segment_start = self.length
+        return segment
+
+    def __len__(self):
+        return self.length
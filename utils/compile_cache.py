@@ -0,0 +1,217 @@
+"""
+Managed cache of the torch.compile artifacts of the models (`--compile_cache_dir`), so that a restarted pipeline skips
+the warmups compiling them.
+Each entry is keyed by the model, dtype, device, compile mode and the settings of the handler shaping the compiled
+graphs, plus the versions of torch and CUDA and the GPU model. It holds the portable artifacts of
+`torch.compiler.save_cache_artifacts` (torch >= 2.7) and a manifest used to validate them before loading. The least
+recently used entries are pruned beyond `max_bytes`.
+The TorchInductor cache is set up in the same directory: with an older torch, compilations still hit it, but the
+warmups run.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+ARTIFACTS = "artifacts.bin"
+
+# the cache of the process, set by `configure_compile_cache`
+compile_cache = None
+
+
+def configure_compile_cache(root, max_bytes=4 * 2**30):
+    global compile_cache
+    compile_cache = CompileCache(root, max_bytes)
+    return compile_cache
+
+
+def compile_cache_entry(**fields):
+    """
+    Returns the cache entry of a compiled model described by `fields`, None if there is no cache or if the installed
+    torch cannot save compile artifacts.
+    """
+    if compile_cache is None or not compile_cache.supported:
+        return None
+    return compile_cache.entry(**fields)
+
+
+def write_atomic(path, data):
+    # written aside and renamed, so that a concurrent or interrupted startup never reads a partial file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+class CompileCache:
+    def __init__(self, root, max_bytes=4 * 2**30):
+        self.root = root
+        self.entries_dir = os.path.join(root, "compile_artifacts")
+        self.max_bytes = max_bytes
+        self._supported = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        os.environ["TORCHINDUCTOR_CACHE_DIR"] = root
+        os.makedirs(self.entries_dir, exist_ok=True)
+
+    @property
+    def supported(self):
+        # torch is only imported once a handler compiles a model
+        if self._supported is None:
+            import torch
+
+            self._supported = hasattr(torch.compiler, "save_cache_artifacts")
+            if not self._supported:
+                logger.info(
+                    f"torch {torch.__version__} cannot save compile artifacts, only the TorchInductor cache is used"
+                )
+        return self._supported
+
+    def entry(self, **fields):
+        import torch
+
+        fields = dict(fields)
+        fields["torch"] = torch.__version__
+        if str(fields.get("device", "")).startswith("cuda") and torch.cuda.is_available():
+            fields["cuda"] = torch.version.cuda
+            fields["gpu"] = torch.cuda.get_device_name()
+        # round trip through json, so that the fields compare equal to the ones read from a manifest
+        fields = json.loads(json.dumps(fields, sort_keys=True, default=str))
+        digest = hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:24]
+        return CompileCacheEntry(self, os.path.join(self.entries_dir, digest), fields)
+
+    def record(self, hit, saved_seconds=0.0):
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self.saved_seconds += saved_seconds
+            else:
+                self.misses += 1
+
+    def report(self):
+        if self.hits or self.misses:
+            logger.info(
+                f"Compile cache: {self.hits} hit(s), {self.misses} miss(es), "
+                f"{self.saved_seconds:.1f} s of warmup saved"
+            )
+
+    def prune(self):
+        """
+        Removes the least recently used entries beyond `max_bytes`, and the leftovers of interrupted writes.
+        """
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.entries_dir):
+                path = os.path.join(self.entries_dir, name)
+                try:
+                    with open(os.path.join(path, MANIFEST)) as file:
+                        manifest = json.load(file)
+                    entries.append((manifest["last_used"], manifest["size"], path))
+                except (OSError, ValueError, KeyError):
+                    # no manifest: an entry being written, or an abandoned one
+                    if time.time() - os.path.getmtime(path) > 24 * 3600:
+                        shutil.rmtree(path, ignore_errors=True)
+            total = 0
+            for _, size, path in sorted(entries, reverse=True):
+                total += size
+                if total > self.max_bytes:
+                    logger.info(f"Compile cache: pruning {path}")
+                    shutil.rmtree(path, ignore_errors=True)
+
+
+class CompileCacheEntry:
+    """
+    Compile artifacts of one model. `load` loads them if the entry is valid, and the warmup is then skipped or
+    shortened. `warmed_up` is called after the warmup, skipped or not: on a miss it saves the artifacts compiled by the
+    warmup, on a hit it reports the time saved.
+    """
+
+    def __init__(self, cache, path, fields):
+        self.cache = cache
+        self.path = path
+        self.fields = fields
+        self.manifest = None
+
+    @property
+    def hit(self):
+        return self.manifest is not None
+
+    def read_manifest(self):
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format") != FORMAT_VERSION or manifest.get("fields") != self.fields:
+            return None
+        return manifest
+
+    def load(self):
+        """
+        Loads the artifacts of the entry, returns whether they were.
+        """
+        import torch
+
+        manifest = self.read_manifest()
+        if manifest is None:
+            return False
+        try:
+            with open(os.path.join(self.path, ARTIFACTS), "rb") as file:
+                artifacts = file.read()
+            if hashlib.sha256(artifacts).hexdigest() != manifest["sha256"]:
+                raise ValueError("checksum mismatch")
+            torch.compiler.load_cache_artifacts(artifacts)
+        except Exception:
+            logger.warning(f"Compile cache: invalid entry {self.path}, removing it", exc_info=True)
+            shutil.rmtree(self.path, ignore_errors=True)
+            return False
+        manifest["last_used"] = time.time()
+        try:
+            write_atomic(os.path.join(self.path, MANIFEST), json.dumps(manifest).encode())
+        except OSError:
+            pass
+        self.manifest = manifest
+        return True
+
+    def warmed_up(self, warmup_seconds):
+        import torch
+
+        model = self.fields.get("model")
+        if self.hit:
+            saved_seconds = max(self.manifest["warmup_seconds"] - warmup_seconds, 0.0)
+            self.cache.record(True, saved_seconds)
+            logger.info(f"Compile cache hit for {model}: warmup took {warmup_seconds:.1f} s, {saved_seconds:.1f} s saved")
+            return
+        self.cache.record(False)
+        artifacts = torch.compiler.save_cache_artifacts()
+        if artifacts is None:
+            return
+        artifacts, _ = artifacts
+        now = time.time()
+        manifest = {
+            "format": FORMAT_VERSION,
+            "fields": self.fields,
+            "sha256": hashlib.sha256(artifacts).hexdigest(),
+            "size": len(artifacts),
+            "warmup_seconds": warmup_seconds,
+            "created": now,
+            "last_used": now,
+        }
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            write_atomic(os.path.join(self.path, ARTIFACTS), artifacts)
+            write_atomic(os.path.join(self.path, MANIFEST), json.dumps(manifest).encode())
+        except OSError:
+            logger.warning(f"Compile cache: cannot write {self.path}", exc_info=True)
+            return
+        logger.info(f"Compile cache: saved the artifacts of {model} ({len(artifacts) / 2**20:.1f} MiB)")
+        self.cache.prune()
@@ -0,0 +1,87 @@
+import logging
+from queue import Empty
+from time import perf_counter
+
+from utils.session import SessionMessage, current_session
+
+logger = logging.getLogger(__name__)
+
+
+def drain(queue):
+    """
+    Empties `queue`, keeping the b"END" sentinel if it was queued.
+    """
+    stopped = False
+    while True:
+        try:
+            item = queue.get_nowait()
+        except Empty:
+            break
+        stopped = stopped or (isinstance(item, bytes) and item == b"END")
+    if stopped:
+        queue.put(b"END")
+
+
+class Interruption:
+    """
+    Barge-in state of a conversation.
+    Each time the user interrupts the assistant, the generation is bumped: work started for an older generation is stale
+    and should be stopped, and the queued audio is flushed.
+    The last of `flush_queues` must be the audio output queue, which receives a b"INTERRUPT" marker once flushed.
+    In multi-session mode, the queues are shared with the other sessions and are not flushed: the handlers skip the items
+    tagged with a cancelled turn instead, and the marker is tagged with the session so that the server flushes the output of
+    that session when routing it.
+    """
+
+    def __init__(self, flush_queues=()):
+        self.generation = 0
+        self.flush_queues = flush_queues
+        self.interrupted_at = None
+
+    def interrupt(self):
+        self.generation += 1
+        self.interrupted_at = perf_counter()
+        session = current_session()
+        if session is None:
+            for queue in self.flush_queues:
+                drain(queue)
+        if self.flush_queues:
+            # tells the sender to interrupt the playback of the client
+            marker = b"INTERRUPT" if session is None else SessionMessage(session, b"INTERRUPT")
+            self.flush_queues[-1].put(marker)
+        logger.debug(f"Interrupted, generation {self.generation}")
+
+    def is_interrupted(self, generation):
+        return self.generation != generation
+
+
+class CancellationToken:
+    """
+    Cancellation state of the turn being processed by a handler.
+    The token is cancelled once the turn it was issued for (`generation`, the current one by default) is interrupted, or
+    once the pipeline is stopping. Handlers check `cancelled` in their loops, and the token can be passed to `generate`
+    in a `StoppingCriteriaList` to stop the generation itself.
+    """
+
+    def __init__(self, interruption, stop_event=None, generation=None):
+        self.interruption = interruption
+        self.stop_event = stop_event
+        self.generation = interruption.generation if generation is None else generation
+
+    @property
+    def cancelled(self):
+        return self.interruption.is_interrupted(self.generation) or (
+            self.stop_event is not None and self.stop_event.is_set()
+        )
+
+    @property
+    def latency(self):
+        """
+        Time elapsed since the turn was interrupted, in seconds. None if the turn was not interrupted.
+        """
+        if not self.interruption.is_interrupted(self.generation):
+            return None
+        return perf_counter() - self.interruption.interrupted_at
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.cancelled
@@ -0,0 +1,294 @@
+"""
+Pipeline metrics, served in the Prometheus text exposition format by `MetricsServer` (`--metrics_port`).
+
+Every handler reports, labelled with its class name:
+- `s2s_handler_items_in_total` / `s2s_handler_items_out_total`: inputs processed and outputs yielded.
+- `s2s_handler_process_seconds`: time taken to yield each output.
+- `s2s_handler_first_output_seconds`: time from picking an input to yielding its first output.
+- `s2s_handler_queue_wait_seconds`: time spent by each input in the input queue.
+The pipeline also reports `s2s_time_to_first_audio_seconds`, from the end of the user's speech to the first chunk of
+generated audio of each turn, and the depth of its queues.
+"""
+import logging
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+from utils.session import PerSession
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Metric:
+    """
+    Family of time series sharing a name, one per set of label values.
+    """
+
+    type = None
+
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        key = tuple(zip(self.label_names, (str(value) for value in values)))
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = self.new_series()
+            return series
+
+    def new_series(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            series = list(self.series.items())
+        for key, values in series:
+            lines.extend(self.render_series(key, values))
+        return lines
+
+
+class CounterValue:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        # a single writer thread per series, the GIL makes the increment safe enough for metrics
+        self.value += amount
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def new_series(self):
+        return CounterValue()
+
+    def render_series(self, key, counter):
+        yield f"{self.name}{format_labels(key)} {counter.value}"
+
+
+class HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, label_names)
+        self.buckets = buckets
+
+    def new_series(self):
+        return HistogramValue(self.buckets)
+
+    def render_series(self, key, histogram):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), histogram.counts):
+            cumulative += count
+            yield f"{self.name}_bucket{format_labels((*key, ('le', bound)))} {cumulative}"
+        yield f"{self.name}_sum{format_labels(key)} {histogram.sum}"
+        yield f"{self.name}_count{format_labels(key)} {histogram.count}"
+
+
+class Gauge(Metric):
+    """
+    Gauge whose values are read when rendering: `callback` returns `(label values, value)` pairs.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, help, label_names=(), callback=None):
+        super().__init__(name, help, label_names)
+        self.callback = callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, value in self.callback():
+            key = tuple(zip(self.label_names, (str(v) for v in values)))
+            lines.append(f"{self.name}{format_labels(key)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            # registering twice returns the existing metric, e.g. when a module is reloaded
+            return self.metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+ITEMS_IN = REGISTRY.register(
+    Counter("s2s_handler_items_in_total", "Inputs processed by the handler.", ("handler",))
+)
+ITEMS_OUT = REGISTRY.register(
+    Counter("s2s_handler_items_out_total", "Outputs yielded by the handler.", ("handler",))
+)
+PROCESS_SECONDS = REGISTRY.register(
+    Histogram("s2s_handler_process_seconds", "Time taken to yield each output.", ("handler",))
+)
+FIRST_OUTPUT_SECONDS = REGISTRY.register(
+    Histogram(
+        "s2s_handler_first_output_seconds",
+        "Time from picking an input to yielding its first output.",
+        ("handler",),
+    )
+)
+QUEUE_WAIT_SECONDS = REGISTRY.register(
+    Histogram(
+        "s2s_handler_queue_wait_seconds",
+        "Time spent by the inputs in the input queue of the handler.",
+        ("handler",),
+    )
+)
+TIME_TO_FIRST_AUDIO_SECONDS = REGISTRY.register(
+    Histogram(
+        "s2s_time_to_first_audio_seconds",
+        "Time from the end of the user's speech to the first generated audio chunk of the reply.",
+    )
+)
+
+
+class HandlerMetrics:
+    """
+    Metrics series of one handler.
+    """
+
+    def __init__(self, handler_name):
+        self.items_in = ITEMS_IN.labels(handler_name)
+        self.items_out = ITEMS_OUT.labels(handler_name)
+        self.process_seconds = PROCESS_SECONDS.labels(handler_name)
+        self.first_output_seconds = FIRST_OUTPUT_SECONDS.labels(handler_name)
+        self.queue_wait_seconds = QUEUE_WAIT_SECONDS.labels(handler_name)
+
+
+class TurnClock:
+    """
+    Measures the time to first audio of the turns of a conversation.
+    """
+
+    def __init__(self):
+        self.started_at = None
+
+    def start(self):
+        """
+        Called when the user stops speaking.
+        """
+        self.started_at = perf_counter()
+
+    def first_audio(self):
+        """
+        Called for each generated audio chunk, only the first one after `start` is measured.
+        """
+        started_at, self.started_at = self.started_at, None
+        if started_at is None:
+            return
+        elapsed = perf_counter() - started_at
+        TIME_TO_FIRST_AUDIO_SECONDS.labels().observe(elapsed)
+        logger.info(f"Time to first audio: {elapsed:.3f}")
+
+
+turn_clocks = PerSession(TurnClock)
+
+
+def register_queues(queues):
+    """
+    Exposes the depth, high-water mark and dropped items of the `BoundedQueue`s of the pipeline.
+    """
+    REGISTRY.register(
+        Gauge(
+            "s2s_queue_depth",
+            "Items waiting in the queue.",
+            ("queue",),
+            lambda: [((queue.name,), queue.qsize()) for queue in queues],
+        )
+    )
+    REGISTRY.register(
+        Gauge(
+            "s2s_queue_high_water_mark",
+            "Largest depth reached by the queue.",
+            ("queue",),
+            lambda: [((queue.name,), queue.high_water_mark) for queue in queues],
+        )
+    )
+    REGISTRY.register(
+        Gauge(
+            "s2s_queue_dropped",
+            "Items dropped by the policy of the queue.",
+            ("queue",),
+            lambda: [((queue.name,), queue.dropped) for queue in queues],
+        )
+    )
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class MetricsServer:
+    """
+    Serves the metrics on http://host:port/metrics from a daemon thread.
+    """
+
+    def __init__(self, host="127.0.0.1", port=9100):
+        self.server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        host, port = self.server.server_address[:2]
+        logger.info(f"Metrics served on http://{host}:{port}/metrics")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
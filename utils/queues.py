@@ -0,0 +1,98 @@
+import logging
+from queue import Full, Queue
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+def is_marker(item):
+    """
+    Control markers (b"END", b"INTERRUPT") are the only bytes items sent between handlers.
+    """
+    return isinstance(item, bytes) and item in (b"END", b"INTERRUPT")
+
+
+class BoundedQueue(Queue):
+    """
+    Queue between two pipeline stages, holding at most `maxsize` items (0 for unbounded).
+    When the queue is full, `policy` decides what `put` does:
+    - `block`: waits for the consumer, slowing down the producer (backpressure).
+    - `drop_oldest`: drops the oldest queued item to make room.
+    - `drop_newest`: drops the item being put.
+    Control markers bypass the bound so that stopping and interrupting never block. Once b"END" is queued, the consumer
+    is stopping: items put afterwards are dropped instead of blocking.
+    `high_water_mark` is the largest depth reached, and `dropped` counts the items dropped by the policy.
+    Items are timestamped when queued: `last_wait` is the time spent in the queue by the last item taken out, which is
+    meaningful for the single consumer of the queue.
+    """
+
+    def __init__(self, maxsize=0, policy="block", name="queue"):
+        if policy not in POLICIES:
+            raise ValueError(f"The queue policy should be one of {', '.join(POLICIES)}, got {policy}")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.name = name
+        self.high_water_mark = 0
+        self.dropped = 0
+        self.closed = False
+        self.last_wait = None
+
+    def put(self, item, block=True, timeout=None):
+        if is_marker(item):
+            self.put_marker(item)
+            return
+        with self.not_full:
+            if self.policy == "block":
+                while not self.closed and 0 < self.maxsize <= self._qsize():
+                    if not block or not self.not_full.wait(timeout):
+                        raise Full
+            if self.closed:
+                self.dropped += 1
+                return
+            if 0 < self.maxsize <= self._qsize():
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 100 == 0:
+                    logger.warning(f"{self.name} is full, {self.dropped} item(s) dropped so far")
+                if self.policy == "drop_newest" or is_marker(self.queue[0][1]):
+                    return
+                self.queue.popleft()
+            self._insert(item)
+
+    def put_marker(self, item):
+        with self.not_full:
+            if item == b"END":
+                self.closed = True
+                # releases the producers blocked on a full queue
+                self.not_full.notify_all()
+            self._insert(item)
+
+    def _put(self, item):
+        self.queue.append((perf_counter(), item))
+
+    def _get(self):
+        queued_at, item = self.queue.popleft()
+        self.last_wait = perf_counter() - queued_at
+        return item
+
+    def _insert(self, item):
+        # must be called with the queue mutex held
+        self._put(item)
+        self.unfinished_tasks += 1
+        self.high_water_mark = max(self.high_water_mark, self._qsize())
+        self.not_empty.notify()
+
+    def stats(self):
+        return {
+            "depth": self.qsize(),
+            "high_water_mark": self.high_water_mark,
+            "maxsize": self.maxsize,
+            "dropped": self.dropped,
+        }
+
+    def __repr__(self):
+        return (
+            f"{self.name}: depth {self.qsize()}/{self.maxsize or 'unbounded'}, "
+            f"high-water mark {self.high_water_mark}, {self.dropped} dropped ({self.policy})"
+        )
@@ -0,0 +1,111 @@
+from utils.session import PerSession
+
+
+class SpeechSegment:
+    """
+    Part of an utterance, emitted by the VAD while the user is still speaking (`--partial_segment_ms`) so that the STT
+    transcribes the utterance progressively.
+    Segments are cut at the pauses of the speech. The last segment of an utterance is `final`: it holds the audio
+    spoken since the previous segment, empty if there was none, and `audio` is None when the utterance is discarded.
+    `utterance_samples` is the length of the utterance up to the end of the segment.
+    """
+
+    __slots__ = ("audio", "final", "utterance_samples")
+
+    def __init__(self, audio, final=False, utterance_samples=0):
+        self.audio = audio
+        self.final = final
+        self.utterance_samples = utterance_samples
+
+
+def cut_segment(buffer):
+    """
+    Returns the audio of `buffer` not sent yet as a partial segment.
+    """
+    utterance_samples = len(buffer)
+    return SpeechSegment(buffer.segment(), utterance_samples=utterance_samples)
+
+
+def end_utterance(buffer):
+    """
+    Takes the utterance of `buffer`: the whole audio if no segment was cut, the final segment otherwise.
+    """
+    segment_start = buffer.segment_start
+    has_speech = buffer.speech_end > segment_start
+    utterance = buffer.take()
+    if segment_start == 0:
+        return utterance
+    return SpeechSegment(
+        utterance[segment_start:] if has_speech else utterance[:0],
+        final=True,
+        utterance_samples=len(utterance),
+    )
+
+
+# transcripts of the segments of the utterance being spoken, shared by the STT and the VAD of a session
+utterance_transcripts = PerSession(list)
+
+
+def latest_transcript(session=None):
+    """
+    Text of the last segment transcribed in the utterance being spoken by `session`, None if there is none yet.
+    """
+    outputs = utterance_transcripts.for_session(session)[-1:]
+    if not outputs:
+        return None
+    return outputs[0][0] if isinstance(outputs[0], tuple) else outputs[0]
+
+
+class PartialTranscripts:
+    """
+    Transcripts of the segments of the utterance being spoken, kept per session by the STT handlers until the final
+    segment arrives: the transcript of the utterance is then ready as soon as the end of speech is confirmed.
+    Transcripts are either texts or (text, language_code) tuples, joined with `separator`, the language of the last
+    segment being kept. The transcripts are also read by the adaptive endpointing of the VAD, see `latest_transcript`.
+    """
+
+    def __init__(self, separator=" "):
+        self.separator = separator
+        self.segments = utterance_transcripts
+
+    @staticmethod
+    def audio(spoken_prompt):
+        """
+        Returns the audio that `process` transcribes for `spoken_prompt`, None if there is none.
+        """
+        if not isinstance(spoken_prompt, SpeechSegment):
+            return spoken_prompt
+        if spoken_prompt.audio is None or len(spoken_prompt.audio) == 0:
+            return None
+        return spoken_prompt.audio
+
+    def process(self, spoken_prompt, transcribe):
+        """
+        Transcribes `spoken_prompt`, an utterance or a `SpeechSegment`, with `transcribe` (returning None when nothing
+        was transcribed), and yields the transcript of the utterance once complete.
+        """
+        if not isinstance(spoken_prompt, SpeechSegment):
+            output = transcribe(spoken_prompt)
+            if output is not None:
+                yield output
+            return
+        segments = self.segments.get()
+        if spoken_prompt.audio is None:
+            segments.clear()
+            return
+        if len(spoken_prompt.audio):
+            output = transcribe(spoken_prompt.audio)
+            if output is not None:
+                segments.append(output)
+        if not spoken_prompt.final:
+            return
+        outputs = list(segments)
+        segments.clear()
+        if outputs:
+            yield self.join(outputs)
+
+    def join(self, outputs):
+        if isinstance(outputs[-1], tuple):
+            text = self.separator.join(text.strip() for text, _ in outputs if text.strip())
+            return (text, outputs[-1][1])
+        return self.separator.join(text.strip() for text in outputs if text.strip())
@@ -0,0 +1,129 @@
+import itertools
+import threading
+import weakref
+from queue import Queue
+
+_session_ids = itertools.count(1)
+_local = threading.local()
+
+
+class Session:
+    """
+    Per-client state of a multi-session server.
+    Each session owns its own listening event and output queue, while the models are shared by the pipeline handlers.
+    """
+
+    def __init__(self, address=None):
+        self.session_id = next(_session_ids)
+        self.address = address
+        self.should_listen = threading.Event()
+        self.send_audio_chunks_queue = Queue()
+        # receiving side bookkeeping of the framed protocol, set by the server
+        self.stream_state = None
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        self.should_listen.clear()
+        self.send_audio_chunks_queue.put(b"END")
+
+    def __repr__(self):
+        return f"Session({self.session_id}, {self.address})"
+
+
+class SessionMessage:
+    """
+    Pipeline item tagged with the session it belongs to, and with the turn (interruption generation) it was produced
+    for, None when it does not belong to a turn yet.
+    """
+
+    __slots__ = ("session", "payload", "turn")
+
+    def __init__(self, session, payload, turn=None):
+        self.session = session
+        self.payload = payload
+        self.turn = turn
+
+
+def current_session():
+    """
+    Returns the session whose item is being processed by the calling handler thread, None in single-session mode.
+    """
+    return getattr(_local, "session", None)
+
+
+def set_current_session(session):
+    _local.session = session
+
+
+class SessionQueue:
+    """
+    Write-only view of a shared queue that tags every item with `session`.
+    The b"END" sentinel is swallowed so that one client leaving does not stop the shared handlers.
+    """
+
+    def __init__(self, queue, session):
+        self.queue = queue
+        self.session = session
+
+    def put(self, item, *args, **kwargs):
+        if isinstance(item, bytes) and item == b"END":
+            return
+        self.queue.put(SessionMessage(self.session, item), *args, **kwargs)
+
+
+class PerSession:
+    """
+    Lazily creates one value per session with `factory`.
+    Outside of a session (single-session mode), a single default value is used.
+    Values are dropped together with their session.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.default = None
+        self.values = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def get(self):
+        return self.for_session(current_session())
+
+    def for_session(self, session):
+        """
+        Value of `session`, for threads handling several sessions at once.
+        """
+        with self.lock:
+            if session is None:
+                if self.default is None:
+                    self.default = self.factory()
+                return self.default
+            value = self.values.get(session)
+            if value is None:
+                value = self.values[session] = self.factory()
+            return value
+
+
+class SessionEvent:
+    """
+    Event proxy resolving to the `should_listen` event of the current session, or to `default` outside of a session.
+    Allows the shared handlers to keep calling `should_listen.set()` / `.clear()`.
+    """
+
+    def __init__(self, default):
+        self.default = default
+
+    def _event(self):
+        session = current_session()
+        return self.default if session is None else session.should_listen
+
+    def set(self):
+        self._event().set()
+
+    def clear(self):
+        self._event().clear()
+
+    def is_set(self):
+        return self._event().is_set()
+
+    def wait(self, timeout=None):
+        return self._event().wait(timeout)
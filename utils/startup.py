@@ -0,0 +1,130 @@
+"""
+Startup of the handlers: their setups run concurrently (`--parallel_startup`), so that downloading and loading a model
+overlaps with the others, while the warmups of the models sharing a device run one at a time, as they would otherwise
+compete for its compute and memory. The phases of each handler are recorded in the `startup_timeline`.
+"""
+import functools
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimeline:
+    """
+    Start and end times of the startup phases of each handler: `import` (of its module), `setup` (loading and warmup),
+    `wait` (for the device to warm up on) and `warmup`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.origin = perf_counter()
+            self.phases = []
+
+    @contextmanager
+    def phase(self, name, phase):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases.append((name, phase, start - self.origin, perf_counter() - self.origin))
+
+    def report(self, width=50):
+        """
+        Logs the timeline of the startup, one line per handler: `-` while importing, `=` while loading, `.` while
+        waiting for the device, `#` while warming up.
+        """
+        with self.lock:
+            phases = list(self.phases)
+        names = [name for name, phase, _, _ in phases if phase == "setup"]
+        if not names:
+            return
+        spans = {
+            name: (
+                min(start for phase_name, _, start, _ in phases if phase_name == name),
+                max(end for phase_name, _, _, end in phases if phase_name == name),
+            )
+            for name in names
+        }
+        ready = max(end for _, end in spans.values())
+        sequential = sum(end - start for start, end in spans.values())
+        scale = width / ready if ready > 0 else 0
+        lines = []
+        for name in names:
+            start, end = spans[name]
+            bar = [" "] * width
+            # the import and setup are drawn first, the wait and warmup within the setup over it
+            for _, phase, phase_start, phase_end in sorted(
+                (phase for phase in phases if phase[0] == name), key=lambda phase: phase[1] in ("wait", "warmup")
+            ):
+                first = min(int(phase_start * scale), width - 1)
+                last = min(max(int(phase_end * scale), first + 1), width)
+                bar[first:last] = PHASE_SYMBOLS[phase] * (last - first)
+            lines.append(f"  {name:<28} |{''.join(bar)}| {start:6.1f} - {end:6.1f} s")
+        logger.info(
+            f"Startup timeline, ready in {ready:.1f} s ({sequential:.1f} s one after another):\n" + "\n".join(lines)
+        )
+
+
+PHASE_SYMBOLS = {"import": "-", "setup": "=", "wait": ".", "warmup": "#"}
+
+startup_timeline = StartupTimeline()
+
+# one lock per device, reentrant as a warmup may call the one of its parent class
+device_locks = defaultdict(threading.RLock)
+device_locks_lock = threading.Lock()
+
+
+def device_key(device):
+    device = str(device or "cpu")
+    return "cuda:0" if device == "cuda" else device
+
+
+def device_lock(device):
+    """
+    Lock held by the warmups running on `device`.
+    """
+    with device_locks_lock:
+        return device_locks[device_key(device)]
+
+
+def scheduled_warmup(warmup):
+    """
+    Wraps the `warmup` method of a handler: it runs once no other warmup runs on the device of the handler, and its
+    phases are recorded in the timeline.
+    """
+
+    @functools.wraps(warmup)
+    def wrapper(self, *args, **kwargs):
+        name = self.__class__.__name__
+        lock = device_lock(getattr(self, "device", None))
+        with startup_timeline.phase(name, "wait"):
+            lock.acquire()
+        try:
+            with startup_timeline.phase(name, "warmup"):
+                return warmup(self, *args, **kwargs)
+        finally:
+            lock.release()
+
+    return wrapper
+
+
+def build_concurrently(builders, parallel=True):
+    """
+    Calls the handler `builders`, concurrently if `parallel`, and returns the handlers in order. An exception raised by
+    a builder is raised once all of them are done.
+    """
+    if not parallel:
+        return [builder() for builder in builders]
+    with ThreadPoolExecutor(max_workers=len(builders), thread_name_prefix="startup") as executor:
+        futures = [executor.submit(builder) for builder in builders]
+        return [future.result() for future in futures]
@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+
+
+class StreamingStats:
+    """
+    Fixed-memory statistics of a stream of durations, in seconds.
+    The last `ring_size` values are kept in a ring buffer, and all the values are counted in a log-bucketed quantile
+    sketch (as in DDSketch) whose quantiles are within `relative_accuracy` of the exact ones. Values are clamped to
+    [`min_value`, `max_value`], which bounds the number of buckets: about 1.2k buckets for the default 1 µs to 3 h range.
+    Meant for a single writer thread, readers may see slightly stale values.
+    """
+
+    def __init__(
+        self, ring_size=1024, relative_accuracy=0.01, min_value=1e-6, max_value=1e4
+    ):
+        self.ring = np.zeros(ring_size, dtype=np.float64)
+        self.ring_pos = 0
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.max_value = max_value
+        self.offset = math.ceil(math.log(min_value) / self.log_gamma)
+        n_buckets = math.ceil(math.log(max_value) / self.log_gamma) - self.offset + 1
+        self.buckets = np.zeros(n_buckets, dtype=np.int64)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.ring[self.ring_pos % len(self.ring)] = value
+        self.ring_pos += 1
+        clamped = min(max(value, self.min_value), self.max_value)
+        self.buckets[math.ceil(math.log(clamped) / self.log_gamma) - self.offset] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def last(self):
+        if self.ring_pos == 0:
+            return None
+        return self.ring[(self.ring_pos - 1) % len(self.ring)]
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def recent(self):
+        """
+        Returns a copy of the values kept in the ring buffer, oldest first.
+        """
+        if self.ring_pos <= len(self.ring):
+            return self.ring[: self.ring_pos].copy()
+        pos = self.ring_pos % len(self.ring)
+        return np.concatenate((self.ring[pos:], self.ring[:pos]))
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        # the extreme quantiles are known exactly
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        index = int(np.searchsorted(np.cumsum(self.buckets), rank, side="right"))
+        value = 2 * self.gamma ** (index + self.offset) / (self.gamma + 1)
+        return min(max(value, self.min), self.max)
+
+    def percentiles(self):
+        return {
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    def __repr__(self):
+        if self.count == 0:
+            return "no values"
+        percentiles = ", ".join(
+            f"{name} {value:.3f} s" for name, value in self.percentiles().items()
+        )
+        return f"{self.count} values, mean {self.mean:.3f} s, {percentiles}, max {self.max:.3f} s"
@@ -1,4 +1,8 @@
+import logging
 import threading
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
 
 
 class ThreadManager:
@@ -6,18 +10,32 @@ class ThreadManager:
     Manages multiple threads used to execute given handler tasks.
     """
 
-    def __init__(self, handlers):
+    def __init__(self, handlers, join_timeout=5):
         self.handlers = handlers
         self.threads = []
+        # upper bound on the time waited for each thread when stopping
+        self.join_timeout = join_timeout
 
     def start(self):
         for handler in self.handlers:
-            thread = threading.Thread(target=handler.run)
+            # daemon threads, so that a handler stuck in a blocking call cannot hang the exit
+            thread = threading.Thread(
+                target=handler.run, name=handler.__class__.__name__, daemon=True
+            )
             self.threads.append(thread)
             thread.start()
 
     def stop(self):
+        start = perf_counter()
         for handler in self.handlers:
             handler.stop_event.set()
+        for handler in self.handlers:
+            # wake up the handlers blocked on their input queue
+            queue_in = getattr(handler, "queue_in", None)
+            if queue_in is not None:
+                queue_in.put(b"END")
         for thread in self.threads:
-            thread.join()
+            thread.join(self.join_timeout)
+            if thread.is_alive():
+                logger.warning(f"{thread.name} did not stop within {self.join_timeout} s")
+        logger.info(f"Pipeline stopped in {perf_counter() - start:.3f} s")
@@ -1,6 +1,20 @@
 import numpy as np
 
 
+def ensure_nltk_data(*resources):
+    """
+    Downloads the NLTK `resources` (e.g. "tokenizers/punkt_tab") not installed yet, at the setup of the handlers using
+    them rather than at the start of every pipeline.
+    """
+    import nltk
+
+    for resource in resources:
+        try:
+            nltk.data.find(resource)
+        except (LookupError, OSError):
+            nltk.download(resource.rsplit("/", 1)[-1])
+
+
 def next_power_of_2(x):
     return 1 if x == 0 else 2 ** (x - 1).bit_length()
 